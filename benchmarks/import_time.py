@@ -0,0 +1,59 @@
+"""Measures how long importing octopus_energy takes in a fresh interpreter.
+
+Usage:
+    python benchmarks/import_time.py [--runs 20] [--statement "import octopus_energy"]
+        [--max-ms 50]
+
+Exits with a non zero status if the median import time is above --max-ms, so it can be used to
+stop startup time from creeping up again.
+"""
+import argparse
+import re
+import subprocess
+import sys
+from statistics import median
+
+_IMPORT_TIME = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)")
+
+
+def measure(statement: str) -> float:
+    """Runs a statement in a fresh interpreter and returns the time of its imports in ms.
+
+    Imports made while the interpreter starts up, which finish with site, are not counted.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME.match(line)
+        # Only count top level imports, which already include the time of their children.
+        if match and not line.split("|")[2].startswith("  "):
+            imports.append((match[2], int(match[1])))
+    names = [name for name, _ in imports]
+    start = names.index("site") + 1 if "site" in names else 0
+    return sum(cumulative for _, cumulative in imports[start:]) / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--statement", default="import octopus_energy")
+    parser.add_argument("--max-ms", type=float)
+    args = parser.parse_args()
+
+    times = [measure(args.statement) for _ in range(args.runs)]
+    result = median(times)
+    print(
+        f"{args.statement!r}: median {result:.1f}ms, min {min(times):.1f}ms over {args.runs} runs"
+    )
+    if args.max_ms is not None and result > args.max_ms:
+        print(f"Import time is above the limit of {args.max_ms}ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compares building request URLs and parsing page links with routes against furl.
+
+Usage:
+    PYTHONPATH=. python benchmarks/routes.py [--number 100000]
+
+furl is a development dependency, only needed for this comparison.
+"""
+import argparse
+from timeit import timeit
+
+from furl import furl
+
+from octopus_energy.routes import parse_page_link, Route
+
+_BASE = "https://api.octopus.energy"
+_SEGMENTS = [
+    "v1",
+    "electricity-meter-points",
+    "1200000345678",
+    "meters",
+    "21L1234567",
+    "consumption",
+]
+_QUERY = {
+    "page": None,
+    "page_size": 25000,
+    "period_from": "2021-01-01T00:00:00+00:00",
+    "period_to": "2021-02-01T00:00:00+00:00",
+    "order": None,
+    "group_by": None,
+}
+_ROUTE = Route("v1/electricity-meter-points/{mpan}/meters/{serial_number}/consumption")
+_PAGE_LINK = (
+    f"{_BASE}/v1/electricity-meter-points/1200000345678/meters/21L1234567/consumption/"
+    "?page=2&page_size=25000&period_from=2021-01-01T00%3A00%3A00%2B00%3A00"
+)
+
+
+def furl_url(base_url: furl) -> str:
+    """Builds a URL the way the rest client did before routes."""
+    url = base_url.copy()
+    url.path.segments.extend(_SEGMENTS)
+    url.query.params.update({p: v for p, v in _QUERY.items() if v is not None})
+    return str(url)
+
+
+def route_url(base_url: str) -> str:
+    return _ROUTE.url(base_url, _SEGMENTS[2], _SEGMENTS[4], query=_QUERY)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=100000)
+    args = parser.parse_args()
+
+    base_furl = furl(_BASE)
+    assert furl_url(base_furl) == route_url(_BASE)
+    assert dict(furl(_PAGE_LINK).args) == parse_page_link(_PAGE_LINK)
+
+    for name, furl_func, route_func in [
+        ("build url", lambda: furl_url(base_furl), lambda: route_url(_BASE)),
+        ("parse page link", lambda: furl(_PAGE_LINK).args, lambda: parse_page_link(_PAGE_LINK)),
+    ]:
+        furl_time = timeit(furl_func, number=args.number) / args.number * 1e6
+        route_time = timeit(route_func, number=args.number) / args.number * 1e6
+        print(
+            f"{name}: furl {furl_time:.2f}us, routes {route_time:.2f}us "
+            f"({furl_time / route_time:.1f}x faster)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,54 +1,179 @@
 """Python client for the Octopus Energy RESTful API"""
+from importlib import import_module
+from typing import TYPE_CHECKING
 
-from .models import (
-    get_tariff_at,
-    Address,
-    Aggregate,
-    Consumption,
-    EnergyType,
-    EnergyTariffType,
-    IntervalConsumption,
-    Meter,
-    MeterDirection,
-    MeterGeneration,
-    MeterPoint,
-    RateType,
-    SortOrder,
-    Tariff,
-    UnitType,
-    ElectricityMeter,
-    GasMeter,
-    PageReference,
-    TariffRate,
-)
-from .exceptions import ApiAuthenticationError, ApiError, ApiNotFoundError, ApiBadRequestError
-from .rest_client import OctopusEnergyRestClient
-from .client import OctopusEnergyConsumerClient
-
-__all__ = [
-    "OctopusEnergyRestClient",
-    "ApiAuthenticationError",
-    "ApiError",
-    "ApiNotFoundError",
-    "ApiBadRequestError",
-    "Consumption",
-    "IntervalConsumption",
-    "MeterGeneration",
-    "UnitType",
-    "Aggregate",
-    "SortOrder",
-    "RateType",
-    "Meter",
-    "EnergyType",
-    "EnergyTariffType",
-    "OctopusEnergyConsumerClient",
-    "Tariff",
-    "MeterDirection",
-    "MeterPoint",
-    "Address",
-    "ElectricityMeter",
-    "GasMeter",
-    "PageReference",
-    "TariffRate",
-    "get_tariff_at",
-]
+# Public names are loaded from their modules on first use, so that importing the package, or
+# only its models, does not import heavy dependencies such as aiohttp.
+_EXPORTS = {
+    "models": (
+        "get_tariff_at",
+        "Address",
+        "Aggregate",
+        "Consumption",
+        "EnergyType",
+        "EnergyTariffType",
+        "IntervalConsumption",
+        "Meter",
+        "MeterDirection",
+        "MeterGeneration",
+        "MeterPoint",
+        "RateType",
+        "SortOrder",
+        "Tariff",
+        "UnitType",
+        "ElectricityMeter",
+        "GasMeter",
+        "PageReference",
+        "TariffRate",
+        "PriceWindow",
+        "WindowRequest",
+        "SyncProgress",
+        "SyncReport",
+        "Product",
+        "ProductSnapshot",
+        "TariffCode",
+        "TariffCandidate",
+        "PipelineStage",
+        "PipelineStats",
+        "CircuitState",
+        "RequestPriority",
+    ),
+    "exceptions": (
+        "ApiAuthenticationError",
+        "ApiError",
+        "ApiNotFoundError",
+        "ApiBadRequestError",
+        "CircuitOpenError",
+    ),
+    "rest_client": ("OctopusEnergyRestClient",),
+    "client": ("OctopusEnergyConsumerClient",),
+    "refresher": ("FlexibleRateRefresher",),
+    "windows": ("cheapest_window", "cheapest_windows"),
+    "aggregation": ("aggregate_consumption", "aggregate_consumption_levels"),
+    "store": ("KeyValueStore", "MemoryStore", "SqliteStore"),
+    "sync": ("ConsumptionSync", "meter_key"),
+    "backfill": ("backfill_consumption", "find_gaps", "plan_backfill"),
+    "catalog": ("ProductCatalog",),
+    "meter_points": ("GspResolver",),
+    "tariff_codes": ("group_meters_by_tariff", "parse_tariff_code", "TariffIndex"),
+    "comparison": ("TariffComparison",),
+    "export": (
+        "ConsumptionWriter",
+        "CsvWriter",
+        "export_consumption",
+        "NdjsonWriter",
+        "open_writer",
+        "ParquetWriter",
+        "write_rates",
+    ),
+    "interop": (
+        "consumption_to_arrow",
+        "consumption_to_numpy",
+        "consumption_to_pandas",
+        "rates_to_arrow",
+        "rates_to_numpy",
+        "rates_to_pandas",
+    ),
+    "watch": ("ConsumptionWatcher",),
+    "pipeline": ("ConsumptionPipeline",),
+    "rate_limit": ("RateLimiter", "SqliteRateLimiter"),
+    "hedging": ("HedgePolicy",),
+    "circuit_breaker": ("CircuitBreaker",),
+    "scheduling": ("current_priority", "request_priority", "RequestScheduler"),
+}
+"""The public names of the package, keyed by the module that defines them."""
+
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+# The imports below are only seen by type checkers and IDEs, and must match _EXPORTS.
+if TYPE_CHECKING:
+    from .models import (
+        get_tariff_at,
+        Address,
+        Aggregate,
+        Consumption,
+        EnergyType,
+        EnergyTariffType,
+        IntervalConsumption,
+        Meter,
+        MeterDirection,
+        MeterGeneration,
+        MeterPoint,
+        RateType,
+        SortOrder,
+        Tariff,
+        UnitType,
+        ElectricityMeter,
+        GasMeter,
+        PageReference,
+        TariffRate,
+        PriceWindow,
+        WindowRequest,
+        SyncProgress,
+        SyncReport,
+        Product,
+        ProductSnapshot,
+        TariffCode,
+        TariffCandidate,
+        PipelineStage,
+        PipelineStats,
+        CircuitState,
+        RequestPriority,
+    )
+    from .exceptions import (
+        ApiAuthenticationError,
+        ApiError,
+        ApiNotFoundError,
+        ApiBadRequestError,
+        CircuitOpenError,
+    )
+    from .rest_client import OctopusEnergyRestClient
+    from .client import OctopusEnergyConsumerClient
+    from .refresher import FlexibleRateRefresher
+    from .windows import cheapest_window, cheapest_windows
+    from .aggregation import aggregate_consumption, aggregate_consumption_levels
+    from .store import KeyValueStore, MemoryStore, SqliteStore
+    from .sync import ConsumptionSync, meter_key
+    from .backfill import backfill_consumption, find_gaps, plan_backfill
+    from .catalog import ProductCatalog
+    from .meter_points import GspResolver
+    from .tariff_codes import group_meters_by_tariff, parse_tariff_code, TariffIndex
+    from .comparison import TariffComparison
+    from .export import (
+        ConsumptionWriter,
+        CsvWriter,
+        export_consumption,
+        NdjsonWriter,
+        open_writer,
+        ParquetWriter,
+        write_rates,
+    )
+    from .interop import (
+        consumption_to_arrow,
+        consumption_to_numpy,
+        consumption_to_pandas,
+        rates_to_arrow,
+        rates_to_numpy,
+        rates_to_pandas,
+    )
+    from .watch import ConsumptionWatcher
+    from .pipeline import ConsumptionPipeline
+    from .rate_limit import RateLimiter, SqliteRateLimiter
+    from .hedging import HedgePolicy
+    from .circuit_breaker import CircuitBreaker
+    from .scheduling import current_priority, request_priority, RequestScheduler
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name: str):
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,80 @@
+from datetime import datetime, tzinfo
+from typing import Dict, Iterable, List, Optional
+
+from .models import Aggregate, Consumption, IntervalConsumption
+from .periods import local_period_bounds
+
+
+class _Bucket:
+    """Accumulates consumption for a single aggregation level as intervals stream past."""
+
+    def __init__(self, aggregate: Aggregate, timezone: Optional[tzinfo]):
+        self.aggregate = aggregate
+        self.timezone = timezone
+        self.intervals: List[IntervalConsumption] = []
+        self.start: Optional[datetime] = None
+        self.end: Optional[datetime] = None
+        self.total = 0
+
+    def add(self, interval: IntervalConsumption):
+        if self.end is None or interval.interval_start >= self.end:
+            self.flush()
+            self.start, self.end = local_period_bounds(
+                interval.interval_start, self.aggregate, self.timezone
+            )
+        self.total += interval.consumed_units
+
+    def flush(self):
+        if self.start is not None:
+            self.intervals.append(IntervalConsumption(self.start, self.end, self.total))
+        self.start, self.end, self.total = None, None, 0
+
+
+def aggregate_consumption_levels(
+    consumption: Consumption,
+    aggregates: Iterable[Aggregate] = tuple(Aggregate),
+    timezone: Optional[tzinfo] = None,
+) -> Dict[Aggregate, Consumption]:
+    """Aggregates half hourly consumption into several aggregation levels in a single pass.
+
+    This produces the same groupings as requesting consumption from the API with a group_by, but
+    without any further API calls. Period boundaries are determined in local time, see
+    local_period_bounds for how clock changes are handled.
+
+    Args:
+        consumption: The consumption to aggregate, in ascending timestamp order.
+        aggregates: (Optional) The aggregation levels to produce. Defaults to every level.
+        timezone: (Optional) The timezone that determines period boundaries. Defaults to UK local
+                  time.
+
+    Returns:
+        The aggregated consumption keyed by aggregation level. The intervals of each aggregated
+        consumption span the whole period, even if the consumption only covers part of it.
+    """
+    buckets = [_Bucket(aggregate, timezone) for aggregate in aggregates]
+    for interval in consumption.intervals:
+        for bucket in buckets:
+            bucket.add(interval)
+    for bucket in buckets:
+        bucket.flush()
+    return {
+        bucket.aggregate: Consumption(consumption.unit_type, consumption.meter, bucket.intervals)
+        for bucket in buckets
+    }
+
+
+def aggregate_consumption(
+    consumption: Consumption, aggregate: Aggregate, timezone: Optional[tzinfo] = None
+) -> Consumption:
+    """Aggregates half hourly consumption into a coarser aggregation level.
+
+    Args:
+        consumption: The consumption to aggregate, in ascending timestamp order.
+        aggregate: The aggregation level to produce.
+        timezone: (Optional) The timezone that determines period boundaries. Defaults to UK local
+                  time.
+
+    Returns:
+        The aggregated consumption.
+    """
+    return aggregate_consumption_levels(consumption, [aggregate], timezone)[aggregate]
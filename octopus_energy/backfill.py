@@ -0,0 +1,135 @@
+from datetime import datetime, timezone
+from typing import Iterable, List, Tuple
+
+from .client import _MAX_CONSUMPTION_PAGE_SIZE, OctopusEnergyConsumerClient
+from .models import IntervalConsumption, Meter
+
+_SLOT_SECONDS = 30 * 60
+_DEFAULT_MAX_EXTRA_INTERVALS = 48
+
+Period = Tuple[datetime, datetime]
+"""A period of time as a tuple of start (inclusive) and end (exclusive) timestamps."""
+
+
+def _to_slot(timestamp: datetime) -> int:
+    """Converts a timestamp to the index of the half hour it falls within, rounding down."""
+    return int(timestamp.timestamp()) // _SLOT_SECONDS
+
+
+def _from_slot(slot: int) -> datetime:
+    return datetime.fromtimestamp(slot * _SLOT_SECONDS, tz=timezone.utc)
+
+
+def find_gaps(held: Iterable[datetime], period_from: datetime, period_to: datetime) -> List[Period]:
+    """Finds the half hours within a period that are missing from the consumption already held.
+
+    Args:
+        held: The start timestamps of the intervals of consumption already held. Timestamps
+              outside of the period are ignored.
+        period_from: The timezone aware start of the period to check, rounded down to the half
+                     hour.
+        period_to: The timezone aware end of the period to check, rounded up to the half hour.
+
+    Returns:
+        The gaps in ascending timestamp order, in UTC.
+    """
+    first = _to_slot(period_from)
+    last = -(-int(period_to.timestamp()) // _SLOT_SECONDS)
+    held_slots = sorted({slot for slot in map(_to_slot, held) if first <= slot < last})
+
+    gaps = []
+    cursor = first
+    for slot in held_slots:
+        if slot > cursor:
+            gaps.append((cursor, slot))
+        cursor = slot + 1
+    if cursor < last:
+        gaps.append((cursor, last))
+    return [(_from_slot(start), _from_slot(end)) for start, end in gaps]
+
+
+def plan_backfill(
+    gaps: List[Period],
+    max_extra_intervals: int = _DEFAULT_MAX_EXTRA_INTERVALS,
+    page_size: int = _MAX_CONSUMPTION_PAGE_SIZE,
+) -> List[Period]:
+    """Merges gaps into the smallest set of periods to request consumption for.
+
+    Neighbouring gaps are merged into a single request when the number of intervals already held
+    between them is small enough, fetching a few intervals again in exchange for fewer requests.
+    Gaps are never merged if the merged request would need more pages than requesting them
+    separately.
+
+    Args:
+        gaps: The gaps to fill, in ascending timestamp order, such as those returned by
+              find_gaps.
+        max_extra_intervals: (Optional) The most half hours already held that may be requested
+                             again to merge two gaps.
+        page_size: (Optional) The number of intervals returned per page of consumption.
+
+    Returns:
+        The periods to request, in ascending timestamp order.
+    """
+    plan: List[Period] = []
+    for start, end in gaps:
+        if plan:
+            previous_start, previous_end = plan[-1]
+            extra = _to_slot(start) - _to_slot(previous_end)
+            separate = _page_count(previous_start, previous_end, page_size) + _page_count(
+                start, end, page_size
+            )
+            if (
+                extra <= max_extra_intervals
+                and _page_count(previous_start, end, page_size) <= separate
+            ):
+                plan[-1] = (previous_start, end)
+                continue
+        plan.append((start, end))
+    return plan
+
+
+def _page_count(start: datetime, end: datetime, page_size: int) -> int:
+    intervals = _to_slot(end) - _to_slot(start)
+    return max(-(-intervals // page_size), 1)
+
+
+async def backfill_consumption(
+    client: OctopusEnergyConsumerClient,
+    meter: Meter,
+    held: Iterable[datetime],
+    period_from: datetime,
+    period_to: datetime,
+    max_extra_intervals: int = _DEFAULT_MAX_EXTRA_INTERVALS,
+    page_size: int = _MAX_CONSUMPTION_PAGE_SIZE,
+) -> List[IntervalConsumption]:
+    """Fetches the consumption missing from the intervals already held for a meter.
+
+    The gaps are found and merged using find_gaps and plan_backfill, and each planned period is
+    requested in turn.
+
+    Args:
+        client: The consumer client used to get consumption.
+        meter: The meter to backfill.
+        held: The start timestamps of the intervals of consumption already held.
+        period_from: The timezone aware start of the period to backfill.
+        period_to: The timezone aware end of the period to backfill.
+        max_extra_intervals: (Optional) The most half hours already held that may be requested
+                             again to merge two gaps.
+        page_size: (Optional) How many intervals of consumption to request per page.
+
+    Returns:
+        The intervals of consumption that fill the gaps, in ascending timestamp order. Intervals
+        that were already held are not included, even if they were requested again. Half hours
+        that octopus has no consumption for are not included either.
+    """
+    gaps = find_gaps(held, period_from, period_to)
+    missing = {slot for start, end in gaps for slot in range(_to_slot(start), _to_slot(end))}
+    intervals = []
+    for start, end in plan_backfill(gaps, max_extra_intervals, page_size):
+        async for consumption in client.iter_consumption_pages(meter, start, end, page_size):
+            intervals.extend(
+                interval
+                for interval in consumption.intervals
+                if _to_slot(interval.interval_start) in missing
+            )
+    return intervals
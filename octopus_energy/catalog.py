@@ -0,0 +1,239 @@
+from asyncio import CancelledError, ensure_future, Future, gather, Semaphore, shield
+from datetime import datetime
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .mappers import products_from_response
+from .models import Product, ProductSnapshot
+from .rest_client import OctopusEnergyRestClient
+
+_DEFAULT_PAGE_SIZE = 100
+_FLAGS = ("is_variable", "is_green", "is_tracker", "is_prepay", "is_business")
+
+
+class ProductCatalog:
+    """A local copy of the octopus energy product list, indexed by code and by each filter flag.
+
+    Every page of products is loaded concurrently once, after which any combination of filters is
+    answered from memory without calling the API. Call refresh to pick up products that have
+    been added, changed or withdrawn since the catalog was loaded.
+
+    Product details, including their tariffs, can be loaded in bulk with hydrate. Details are
+    cached in snapshots keyed by the tariffs_active_at timestamp they were requested with.
+    """
+
+    def __init__(
+        self,
+        rest_client: OctopusEnergyRestClient,
+        available_at: datetime = None,
+        page_size: int = _DEFAULT_PAGE_SIZE,
+        concurrency: int = 8,
+    ):
+        """Initializes an empty product catalog.
+
+        Args:
+            rest_client: The rest client used to get the products.
+            available_at: (Optional) Load products available for new agreements at this
+                          timestamp. Defaults to the products that are currently available.
+            page_size: (Optional) How many products to request per page.
+            concurrency: (Optional) How many pages to request at once.
+        """
+        self.rest_client = rest_client
+        self.available_at = available_at
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self._products: Dict[str, Product] = {}
+        self._flag_index: Dict[str, Dict[bool, Set[str]]] = {}
+        self._filter_cache: Dict[Tuple[Optional[bool], ...], List[Product]] = {}
+        self._snapshots: Dict[Optional[datetime], Dict[str, dict]] = {}
+        self._in_flight: Dict[Tuple[str, Optional[datetime]], Future] = {}
+        self._index([])
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def __iter__(self) -> Iterator[Product]:
+        return iter(self._products.values())
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._products
+
+    async def load(self):
+        """Loads every product into the catalog, replacing any products already loaded."""
+        first_page = await self._get_page(1)
+        products = products_from_response(first_page)
+        page_count = -(-first_page.get("count", 0) // max(len(products), 1))
+        semaphore = Semaphore(self.concurrency)
+
+        async def get_page(page: int) -> List[Product]:
+            async with semaphore:
+                return products_from_response(await self._get_page(page))
+
+        for page in await gather(*(get_page(page) for page in range(2, page_count + 1))):
+            products.extend(page)
+        self._index(products)
+
+    async def refresh(self) -> Set[str]:
+        """Updates the catalog with products that have changed since it was loaded.
+
+        Products are listed newest first, so pages are requested in order only until a page is
+        found in which every product is already known and unchanged. If the number of products
+        then differs from the number listed by the API, products have been withdrawn and the
+        whole catalog is loaded again.
+
+        Returns:
+            The codes of the products that were added, changed or withdrawn.
+        """
+        if not self._products:
+            await self.load()
+            return set(self._products)
+
+        before = self._products
+        changed: Dict[str, Product] = {}
+        page = 1
+        while True:
+            response = await self._get_page(page)
+            page_changes = [p for p in products_from_response(response) if before.get(p.code) != p]
+            changed.update((p.code, p) for p in page_changes)
+            if not page_changes or not response.get("next"):
+                break
+            page += 1
+
+        # New products are listed first, so keep them ahead of the products already known.
+        updated = {code: p for code, p in changed.items() if code not in before}
+        updated.update((code, changed.get(code, p)) for code, p in before.items())
+        if response.get("count", len(updated)) != len(updated):
+            await self.load()
+        else:
+            self._index(updated.values())
+        return {
+            code
+            for code in before.keys() | self._products.keys()
+            if before.get(code) != self._products.get(code)
+        }
+
+    def get(self, code: str) -> Optional[Product]:
+        """Gets a product by its code, or None if it is not in the catalog."""
+        return self._products.get(code)
+
+    def filter(
+        self,
+        is_variable: bool = None,
+        is_green: bool = None,
+        is_tracker: bool = None,
+        is_prepay: bool = None,
+        is_business: bool = None,
+        available_at: datetime = None,
+    ) -> List[Product]:
+        """Finds the products in the catalog that match a combination of filters.
+
+        Filters that are not specified match every product.
+
+        Args:
+            is_variable (Optional): Only include products whose is_variable flag matches.
+            is_green (Optional): Only include products whose is_green flag matches.
+            is_tracker (Optional): Only include products whose is_tracker flag matches.
+            is_prepay (Optional): Only include products whose is_prepay flag matches.
+            is_business (Optional): Only include products whose is_business flag matches.
+            available_at (Optional): Only include products available for new agreements at the
+                                     timestamp. Note that only products loaded into the catalog
+                                     are searched.
+
+        Returns:
+            The matching products, in the order they were listed by the API.
+        """
+        key = (is_variable, is_green, is_tracker, is_prepay, is_business)
+        products = self._filter_cache.get(key)
+        if products is None:
+            codes = None
+            for flag, value in zip(_FLAGS, key):
+                if value is None:
+                    continue
+                matching = self._flag_index[flag].get(bool(value), set())
+                codes = matching if codes is None else codes & matching
+            products = [p for p in self._products.values() if codes is None or p.code in codes]
+            self._filter_cache[key] = products
+        if available_at is None:
+            return list(products)
+        return [p for p in products if p.is_available_at(available_at)]
+
+    async def hydrate(
+        self, product_codes: Iterable[str] = None, tariffs_active_at: datetime = None
+    ) -> ProductSnapshot:
+        """Gets the details of many products concurrently.
+
+        Product codes are deduplicated, and details already held in the snapshot for the
+        timestamp are not requested again. Concurrent calls that need the same product share a
+        single request. Note that the snapshot for the default timestamp of None is also kept
+        until clear_snapshots is called, even though octopus treats it as the current time.
+
+        Args:
+            product_codes: (Optional) The products to get the details of. Defaults to every
+                           product in the catalog.
+            tariffs_active_at: (Optional) Include the tariffs active at this timestamp in the
+                               details.
+
+        Returns:
+            A snapshot holding the details of the requested products.
+
+        Raises:
+            ApiError: If the details of a product could not be got. The details that were got are
+                      kept in the snapshot first, so only the failed products are requested again.
+        """
+        codes = list(dict.fromkeys(self._products if product_codes is None else product_codes))
+        snapshot = self._snapshots.setdefault(tariffs_active_at, {})
+        semaphore = Semaphore(self.concurrency)
+
+        async def get_product(code: str) -> dict:
+            async with semaphore:
+                details = await self.rest_client.get_product_v1(code, tariffs_active_at)
+            # Stored by the request itself, so the details are kept even if every caller waiting
+            # for them has been cancelled.
+            snapshot[code] = details
+            return details
+
+        while True:
+            requests = []
+            for code in codes:
+                if code in snapshot:
+                    continue
+                key = (code, tariffs_active_at)
+                if key not in self._in_flight:
+                    self._in_flight[key] = ensure_future(get_product(code))
+                    self._in_flight[key].add_done_callback(partial(self._request_done, key))
+                requests.append(self._in_flight[key])
+            if not requests:
+                return ProductSnapshot(tariffs_active_at, {code: snapshot[code] for code in codes})
+
+            # Requests are shared with concurrent callers, so cancelling this call must not
+            # cancel them.
+            results = await gather(*(shield(f) for f in requests), return_exceptions=True)
+            for error in results:
+                # A shared request that was cancelled by something other than this call is made
+                # again.
+                if isinstance(error, BaseException) and not isinstance(error, CancelledError):
+                    raise error
+
+    def _request_done(self, key: Tuple[str, Optional[datetime]], future: Future):
+        self._in_flight.pop(key, None)
+        if not future.cancelled():
+            # Retrieve the error, so it is not reported as unhandled if every caller was
+            # cancelled.
+            future.exception()
+
+    def clear_snapshots(self):
+        """Discards all the product details held by the catalog."""
+        self._snapshots = {}
+
+    async def _get_page(self, page: int) -> dict:
+        return await self.rest_client.get_products_v1(
+            page=page, page_size=self.page_size, available_at=self.available_at
+        )
+
+    def _index(self, products):
+        self._products = {product.code: product for product in products}
+        self._flag_index = {flag: {True: set(), False: set()} for flag in _FLAGS}
+        for product in self._products.values():
+            for flag in _FLAGS:
+                self._flag_index[flag][bool(getattr(product, flag))].add(product.code)
+        self._filter_cache = {}
@@ -0,0 +1,167 @@
+from asyncio import CancelledError, TimeoutError
+from collections import OrderedDict
+from datetime import timedelta
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+from aiohttp import ClientError
+
+from .exceptions import ApiError, CircuitOpenError
+from .models import CircuitState
+
+_T = TypeVar("_T")
+
+_DEFAULT_RESET_TIMEOUT = timedelta(seconds=30)
+
+
+class _Circuit:
+    """The state of the circuit guarding a single endpoint."""
+
+    def __init__(self):
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trials = 0
+
+
+def _is_failure(error: Exception) -> bool:
+    """Whether an error shows the endpoint is in trouble, rather than that the request was bad."""
+    if isinstance(error, ApiError):
+        return error.response.status >= 500 or error.response.status == 429
+    return isinstance(error, (ClientError, TimeoutError))
+
+
+class CircuitBreaker:
+    """Stops calling an API endpoint that keeps failing, so callers fail fast while it recovers.
+
+    Each endpoint has its own circuit, which starts closed. Once failure_threshold requests in a
+    row fail with a server error, a rate limit response, a connection error or a timeout, the
+    circuit opens and requests to the endpoint fail straight away with a CircuitOpenError, or are
+    answered from the cache if caching is enabled. After reset_timeout the circuit is half open,
+    and a few trial requests are let through. If they succeed the circuit closes, otherwise it
+    opens again. Errors such as not found or bad request do not count as failures.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: timedelta = _DEFAULT_RESET_TIMEOUT,
+        half_open_requests: int = 1,
+        cache_size: int = 0,
+    ):
+        """Initializes the circuit breaker.
+
+        Args:
+            failure_threshold: (Optional) How many requests in a row must fail to open a circuit.
+            reset_timeout: (Optional) How long a circuit stays open before trial requests are let
+                           through.
+            half_open_requests: (Optional) How many trial requests may be made at once while a
+                                circuit is half open. Other requests fail fast.
+            cache_size: (Optional) How many successful GET responses to keep, to answer requests
+                        with while their circuit is open. Defaults to 0, which always fails fast.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout.total_seconds()
+        self.half_open_requests = half_open_requests
+        self.cache_size = cache_size
+        self._circuits: Dict[str, _Circuit] = {}
+        self._cache: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def state(self, endpoint: str) -> CircuitState:
+        """Gets the state of the circuit for an endpoint.
+
+        Args:
+            endpoint: The endpoint's path template, such as
+                      v1/products/{product_code}/{tariff_type}/{tariff_code}/{rate_type}.
+
+        Returns:
+            The state of the circuit. Endpoints that have not been called are closed.
+        """
+        circuit = self._circuits.get(endpoint)
+        if circuit is None:
+            return CircuitState.CLOSED
+        self._update(circuit)
+        return circuit.state
+
+    def states(self) -> Dict[str, CircuitState]:
+        """Gets the state of the circuit for every endpoint that has been called."""
+        return {endpoint: self.state(endpoint) for endpoint in self._circuits}
+
+    @property
+    def any_open(self) -> bool:
+        """Whether any endpoint is failing, so callers can skip work that is not essential."""
+        return any(state != CircuitState.CLOSED for state in self.states().values())
+
+    async def call(
+        self,
+        endpoint: str,
+        request: Callable[[], Awaitable[_T]],
+        cache_key: Optional[Hashable] = None,
+    ) -> _T:
+        """Makes a request to an endpoint through its circuit.
+
+        Args:
+            endpoint: The endpoint the request is for.
+            request: Makes the request.
+            cache_key: (Optional) Identifies the request, for requests whose response can be
+                       cached and used while the circuit is open.
+
+        Returns:
+            The response, or the cached response if the circuit is open.
+        """
+        circuit = self._circuits.get(endpoint)
+        if circuit is None:
+            circuit = self._circuits[endpoint] = _Circuit()
+        self._update(circuit)
+        trial = circuit.state == CircuitState.HALF_OPEN
+        if circuit.state == CircuitState.OPEN or (
+            trial and circuit.trials >= self.half_open_requests
+        ):
+            if cache_key is not None and cache_key in self._cache:
+                self._cache.move_to_end(cache_key)
+                return self._cache[cache_key]
+            raise CircuitOpenError(endpoint, self._retry_after(circuit))
+
+        if trial:
+            circuit.trials += 1
+        try:
+            response = await request()
+        except CancelledError:
+            raise
+        except Exception as e:
+            if _is_failure(e):
+                self._failed(circuit)
+            elif trial:
+                # The endpoint answered, so it has recovered even though the request was bad.
+                self._succeeded(circuit)
+            raise
+        finally:
+            if trial:
+                circuit.trials -= 1
+        self._succeeded(circuit)
+        if cache_key is not None and self.cache_size > 0:
+            self._cache[cache_key] = response
+            self._cache.move_to_end(cache_key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return response
+
+    def _update(self, circuit: _Circuit):
+        if (
+            circuit.state == CircuitState.OPEN
+            and monotonic() - circuit.opened_at >= self.reset_timeout
+        ):
+            circuit.state = CircuitState.HALF_OPEN
+
+    def _retry_after(self, circuit: _Circuit) -> float:
+        return max(0.0, circuit.opened_at + self.reset_timeout - monotonic())
+
+    def _failed(self, circuit: _Circuit):
+        circuit.failures += 1
+        if circuit.state == CircuitState.HALF_OPEN or circuit.failures >= self.failure_threshold:
+            circuit.state = CircuitState.OPEN
+            circuit.opened_at = monotonic()
+
+    def _succeeded(self, circuit: _Circuit):
+        circuit.state = CircuitState.CLOSED
+        circuit.failures = 0
@@ -0,0 +1,277 @@
+import argparse
+import os
+import sys
+from asyncio import gather, run, Semaphore
+from datetime import datetime, timedelta
+from statistics import quantiles
+from time import monotonic
+from typing import Dict, List, Optional, TextIO
+
+from .client import _MAX_CONSUMPTION_PAGE_SIZE, OctopusEnergyConsumerClient
+from .export import open_writer, write_rates
+from .mappers import from_timestamp_str
+from .models import EnergyType, Meter, MeterGeneration, MeterPoint, RateType, TariffRate
+from .periods import local_day_of, UK_TIMEZONE
+from .store import SqliteStore
+from .sync import ConsumptionSync
+from .tariff_codes import parse_tariff_code
+
+_API_KEY_VARIABLE = "OCTOPUS_ENERGY_API_KEY"
+_OUTPUT_SIZE_KEY = "output-size"
+_DEFAULT_GENERATIONS = {
+    EnergyType.ELECTRICITY: MeterGeneration.SMETS2_ELECTRICITY,
+    EnergyType.GAS: MeterGeneration.SMETS2_GAS,
+}
+
+
+def parse_meter(spec: str) -> Meter:
+    """Parses a meter given on the command line.
+
+    Args:
+        spec: The meter as energy_type:mpid:serial_number, with an optional fourth part naming
+              the meter generation, such as gas:1234567890:G4A123:SMETS1_GAS. Electricity
+              meters default to SMETS2_ELECTRICITY and gas meters to SMETS2_GAS.
+
+    Returns:
+        The meter, with no address or tariffs.
+    """
+    parts = spec.split(":")
+    if len(parts) not in (3, 4):
+        raise argparse.ArgumentTypeError(f"Invalid meter {spec}")
+    try:
+        energy_type = EnergyType(parts[0])
+        generation = (
+            MeterGeneration[parts[3]] if len(parts) == 4 else _DEFAULT_GENERATIONS[energy_type]
+        )
+    except (KeyError, ValueError):
+        raise argparse.ArgumentTypeError(f"Invalid meter {spec}")
+    return Meter(MeterPoint(parts[1], None), parts[2], energy_type, generation, [])
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parses an iso timestamp or date, treating timestamps without a timezone as UK local time."""
+    try:
+        timestamp = from_timestamp_str(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid timestamp {value}")
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=UK_TIMEZONE)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Builds the parser for the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="octopus-energy", description="Bulk download octopus energy data."
+    )
+    parser.add_argument(
+        "--api-key",
+        default=os.environ.get(_API_KEY_VARIABLE),
+        help=f"Your octopus energy API key. Defaults to the {_API_KEY_VARIABLE} variable.",
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests to make at once.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name, help in [("consumption", "Download consumption."), ("tariffs", "Download rates.")]:
+        command = commands.add_parser(name, help=help)
+        sources = command.add_mutually_exclusive_group(required=name == "consumption")
+        sources.add_argument("--account", help="Download data for every meter on an account.")
+        sources.add_argument(
+            "--meter",
+            action="append",
+            type=parse_meter,
+            help="A meter as energy_type:mpid:serial_number[:generation]. Can be repeated.",
+        )
+        command.add_argument("--from", dest="period_from", type=parse_timestamp, required=True)
+        command.add_argument("--to", dest="period_to", type=parse_timestamp)
+        command.add_argument("--output", required=True, help="The file to write to.")
+        command.add_argument("--compression", help="gzip, bz2 or xz, or a parquet codec.")
+
+    consumption = commands.choices["consumption"]
+    consumption.add_argument("--format", choices=["csv", "ndjson", "parquet"], default="csv")
+    consumption.add_argument("--page-size", type=int, default=_MAX_CONSUMPTION_PAGE_SIZE)
+    consumption.add_argument(
+        "--checkpoints",
+        help="A sqlite file to store checkpoints in, to resume interrupted runs. Resumed runs "
+        "append to --output, which is not supported for parquet.",
+    )
+
+    tariffs = commands.choices["tariffs"]
+    tariffs.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    tariffs.add_argument(
+        "--tariff",
+        action="append",
+        default=[],
+        help="A tariff code to download in addition to those of the meters. Can be repeated.",
+    )
+    tariffs.add_argument(
+        "--rate-type",
+        choices=[rate_type.value for rate_type in RateType],
+        default=RateType.STANDARD_UNIT_RATES.value,
+    )
+    return parser
+
+
+async def _get_meters(client: OctopusEnergyConsumerClient, args) -> List[Meter]:
+    return args.meter if args.meter else await client.get_meters(args.account)
+
+
+async def download_consumption(client: OctopusEnergyConsumerClient, args, out: TextIO) -> int:
+    """Downloads consumption for every meter to a single file, printing statistics at the end.
+
+    If the checkpoints file and the output already exist, the run resumes an interrupted one, and
+    consumption after each meter's checkpoint is appended to the output.
+
+    Returns:
+        The exit code, which is non zero if any meter failed.
+    """
+    # Resumed runs only fetch consumption after each meter's checkpoint, so they must add to the
+    # output of the interrupted run rather than replace it.
+    resume = args.checkpoints is not None and os.path.exists(args.checkpoints)
+    if resume and not os.path.exists(args.output):
+        print(
+            f"Cannot resume, as the checkpoints {args.checkpoints} exist but the output "
+            f"{args.output} does not. Remove the checkpoints to download everything again.",
+            file=out,
+        )
+        return 2
+    if resume and args.format == "parquet":
+        print(
+            f"Cannot resume into the existing parquet file {args.output}, as parquet files cannot "
+            "be appended to. Write to a new --output with new --checkpoints instead.",
+            file=out,
+        )
+        return 2
+    meters = await _get_meters(client, args)
+    checkpoints = SqliteStore(args.checkpoints) if args.checkpoints else None
+    try:
+        if resume:
+            # Drop anything written after the last page that was checkpointed, such as a partly
+            # written page, which would otherwise corrupt the rows appended after it.
+            size = checkpoints.get(_OUTPUT_SIZE_KEY)
+            if size is not None:
+                os.truncate(args.output, int(size))
+        with open_writer(args.output, args.format, args.compression, append=resume) as writer:
+            report = await ConsumptionSync(
+                client,
+                writer,
+                checkpoints=checkpoints,
+                concurrency=args.concurrency,
+                page_size=args.page_size,
+                # The writer flushes each page before its checkpoint is stored, so the output
+                # size stored with the checkpoint marks the end of the page.
+                checkpoint_values=(
+                    (lambda: {_OUTPUT_SIZE_KEY: str(os.path.getsize(args.output))})
+                    if checkpoints is not None
+                    else None
+                ),
+            ).run(meters, args.period_from, args.period_to)
+    finally:
+        if checkpoints is not None:
+            checkpoints.close()
+
+    progress = report.progress
+    print(
+        f"Downloaded {progress.intervals} intervals in {progress.pages} pages for "
+        f"{progress.meters_completed} of {progress.meters_total} meters in "
+        f"{progress.elapsed_seconds:.1f}s ({progress.intervals_per_second:.0f} intervals/s)",
+        file=out,
+    )
+    _print_latencies(progress.page_latencies, out)
+    for key, error in report.failures.items():
+        print(f"Failed {key}: {error!r}", file=out)
+    return 1 if report.failures else 0
+
+
+async def download_tariffs(client: OctopusEnergyConsumerClient, args, out: TextIO) -> int:
+    """Downloads the rates of every tariff to a single file, printing statistics at the end.
+
+    The tariffs of meters are included if they were in effect at any time in the period.
+
+    Returns:
+        The exit code.
+    """
+    codes = dict.fromkeys(args.tariff)
+    if args.account or args.meter:
+        for meter in await _get_meters(client, args):
+            for tariff in meter.tariffs:
+                if (tariff.valid_to is None or tariff.valid_to > args.period_from) and (
+                    args.period_to is None or tariff.valid_from < args.period_to
+                ):
+                    codes[tariff.code] = None
+
+    start = local_day_of(args.period_from)
+    # Rates for the next day are published in the afternoon, so include tomorrow by default.
+    end = (
+        local_day_of(args.period_to)
+        if args.period_to
+        else local_day_of(datetime.now(UK_TIMEZONE)) + timedelta(days=2)
+    )
+    semaphore = Semaphore(args.concurrency)
+    latencies: List[float] = []
+    started = monotonic()
+
+    async def get_rates(code: str) -> List[TariffRate]:
+        tariff_code = parse_tariff_code(code)
+        async with semaphore:
+            requested = monotonic()
+            pricing = await client.get_flexible_rate_pricing_range(
+                tariff_code.product_code,
+                code,
+                tariff_code.tariff_type,
+                RateType(args.rate_type),
+                start,
+                end,
+            )
+            latencies.append(monotonic() - requested)
+        # Rates that span several days are listed for each of them.
+        return list({rate.valid_from: rate for day in pricing.values() for rate in day}.values())
+
+    rates: Dict[str, List[TariffRate]] = dict(
+        zip(codes, await gather(*(get_rates(code) for code in codes)))
+    )
+    written = write_rates(args.output, rates, args.format, args.compression)
+    elapsed = monotonic() - started
+    print(
+        f"Downloaded {written} rates for {len(rates)} tariffs in {elapsed:.1f}s "
+        f"({written / elapsed if elapsed else 0:.0f} rates/s)",
+        file=out,
+    )
+    _print_latencies(latencies, out)
+    return 0
+
+
+def _print_latencies(latencies: List[float], out: TextIO):
+    if not latencies:
+        return
+    p50, p95 = (
+        (latencies[0], latencies[0])
+        if len(latencies) == 1
+        else [quantiles(latencies, n=100)[i] for i in (49, 94)]
+    )
+    print(
+        f"Request latency p50 {p50 * 1000:.0f}ms, p95 {p95 * 1000:.0f}ms, "
+        f"max {max(latencies) * 1000:.0f}ms",
+        file=out,
+    )
+
+
+async def _main(args, out: TextIO) -> int:
+    command = download_consumption if args.command == "consumption" else download_tariffs
+    async with OctopusEnergyConsumerClient(args.api_key) as client:
+        return await command(client, args, out)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Runs the command line bulk downloader.
+
+    Args:
+        argv: (Optional) The command line arguments. Defaults to sys.argv.
+
+    Returns:
+        The exit code.
+    """
+    args = build_parser().parse_args(argv)
+    return run(_main(args, sys.stdout))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
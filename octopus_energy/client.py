@@ -1,10 +1,16 @@
-from datetime import datetime, timedelta
-from typing import List, Optional
+import json
+from asyncio import get_running_loop, sleep
+from concurrent.futures import Executor
+from datetime import date, datetime, timedelta
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
 
+from .circuit_breaker import CircuitBreaker
+from .hedging import HedgePolicy
 from .mappers import meters_from_response, consumption_from_response, tariff_rates_from_response
-from octopus_energy import (
+from .periods import local_day_start, rates_cover_day, split_rates_by_day
+from .models import (
     Meter,
-    OctopusEnergyRestClient,
     Consumption,
     EnergyType,
     SortOrder,
@@ -13,6 +19,12 @@ from octopus_energy import (
     RateType,
     TariffRate,
 )
+from .rate_limit import RateLimiter
+from .rest_client import OctopusEnergyRestClient
+from .scheduling import RequestScheduler
+
+_MAX_PAGE_SIZE = 1500
+_MAX_CONSUMPTION_PAGE_SIZE = 25000
 
 
 class OctopusEnergyConsumerClient:
@@ -28,13 +40,53 @@ class OctopusEnergyConsumerClient:
     This client uses async i/o.
     """
 
-    def __init__(self, api_token: Optional[str] = None):
+    def __init__(
+        self,
+        api_token: Optional[str] = None,
+        executor: Optional[Executor] = None,
+        map_chunk_size: Optional[int] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        scheduler: Optional[RequestScheduler] = None,
+    ):
         """Initializes the Octopus Energy Consumer Client.
 
+        Decoding and mapping a large page of results, such as 25,000 intervals of consumption,
+        blocks the event loop for long enough to delay every other request in the process. Either
+        of executor or map_chunk_size can be used to avoid this.
+
         Args:
             api_token: Your Octopus Energy API Key.
+            executor: (Optional) A thread or process pool to decode and map responses in, instead
+                      of on the event loop. Each response is decoded and mapped in a single job,
+                      so with a process pool only its raw body is sent to a worker process.
+            map_chunk_size: (Optional) Map responses on the event loop in chunks of this many
+                            results, yielding to other tasks between chunks. Ignored if an
+                            executor is given.
+            rate_limiter: (Optional) Limits how many requests are made, including hedges.
+            hedge_policy: (Optional) Sends a second request for lookups that are slower than
+                          usual, using whichever answers first.
+            circuit_breaker: (Optional) Fails calls fast, or answers them from its cache, while
+                             the endpoint they call keeps failing.
+            scheduler: (Optional) Limits how many requests are made at once, starting waiting
+                       requests by their priority. Tag requests with request_priority.
         """
-        self.rest_client = OctopusEnergyRestClient(api_token)
+        self.rest_client = OctopusEnergyRestClient(
+            api_token,
+            executor=executor,
+            rate_limiter=rate_limiter,
+            hedge_policy=hedge_policy,
+            circuit_breaker=circuit_breaker,
+            scheduler=scheduler,
+        )
+        self.executor = executor
+        self.map_chunk_size = map_chunk_size
+        # With an executor, responses are left undecoded, so that each one is decoded and mapped
+        # in a single executor job. Without one, the rest client is called as it always was.
+        self._raw = executor is not None
+        self._raw_kwargs = {"raw": True} if self._raw else {}
+        self._daily_rate_cache: Dict[tuple, Dict[date, List[TariffRate]]] = {}
 
     def __enter__(self):
         raise TypeError("Use async context manager (async with) instead")
@@ -55,13 +107,24 @@ class OctopusEnergyConsumerClient:
         """
         await self.rest_client.close()
 
+    async def warmup(self, connections: int = 1):
+        """Opens pooled connections to the API ahead of the first real request.
+
+        See OctopusEnergyRestClient.warmup.
+
+        Args:
+            connections: (Optional) How many connections to open at once. Defaults to 1.
+        """
+        await self.rest_client.warmup(connections)
+
     async def get_meters(self, account_number: str) -> List[Meter]:
         """Gets all meters associated with your account.
 
         Args:
             account_number: Your Octopus Energy Account Number.
         """
-        return meters_from_response(await self.rest_client.get_account_details(account_number))
+        response = await self.rest_client.get_account_details(account_number, **self._raw_kwargs)
+        return (await self._map(meters_from_response, response))[0]
 
     async def get_consumption(
         self,
@@ -69,6 +132,7 @@ class OctopusEnergyConsumerClient:
         period_from: datetime = None,
         period_to: datetime = None,
         page_reference: PageReference = None,
+        page_size: int = None,
     ) -> Consumption:
         """Get the energy consumption for a meter
 
@@ -78,12 +142,52 @@ class OctopusEnergyConsumerClient:
             period_to: The timestamp for the latest period of consumption to return.
             page_reference: Get a specific page of results based on a page reference returned by
                             a previous call to get_consumption
+            page_size: (Optional) How many results per page. Ignored when a page reference is
+                       supplied, as the page size is part of the reference.
 
         Returns:
             The consumption for the meter in the time period specified. The results are returned
             in ascending timestamp order from the start of the period.
 
         """
+        response = await self._get_consumption_response(
+            meter, period_from, period_to, page_reference, page_size, self._raw
+        )
+        chunks = await self._map(consumption_from_response, response, meter)
+        for chunk in chunks[1:]:
+            chunks[0].intervals.extend(chunk.intervals)
+        return chunks[0]
+
+    async def get_consumption_response(
+        self,
+        meter: Meter,
+        period_from: datetime = None,
+        period_to: datetime = None,
+        page_reference: PageReference = None,
+        page_size: int = None,
+    ) -> dict:
+        """Gets a page of energy consumption for a meter as the raw API response.
+
+        This takes the same arguments as get_consumption, but leaves mapping the response to
+        the caller, for example with consumption_from_response.
+
+        Returns:
+            The API response for the page of consumption.
+
+        """
+        return await self._get_consumption_response(
+            meter, period_from, period_to, page_reference, page_size
+        )
+
+    async def _get_consumption_response(
+        self,
+        meter: Meter,
+        period_from: Optional[datetime],
+        period_to: Optional[datetime],
+        page_reference: Optional[PageReference],
+        page_size: Optional[int],
+        raw: bool = False,
+    ) -> Union[dict, bytes]:
         func = (
             self.rest_client.get_electricity_consumption_v1
             if meter.energy_type == EnergyType.ELECTRICITY
@@ -101,9 +205,41 @@ class OctopusEnergyConsumerClient:
                     "order": SortOrder.OLDEST_FIRST,
                 }
             )
+            if page_size is not None:
+                params["page_size"] = page_size
+
+        if raw:
+            params["raw"] = True
+
+        return await func(meter.meter_point.id, meter.serial_number, **params)
+
+    async def iter_consumption_pages(
+        self,
+        meter: Meter,
+        period_from: datetime = None,
+        period_to: datetime = None,
+        page_size: int = None,
+    ) -> AsyncIterator[Consumption]:
+        """Iterates over every page of energy consumption for a meter in a period.
+
+        Each page is requested only once the previous page has been consumed, so memory use does
+        not grow with the length of the period.
+
+        Args:
+            meter: The meter to get consumption for.
+            period_from: The timestamp for the earliest period of consumption to return.
+            period_to: The timestamp for the latest period of consumption to return.
+            page_size: (Optional) How many results per page.
 
-        response = await func(meter.meter_point.id, meter.serial_number, **params)
-        return consumption_from_response(response, meter)
+        Returns:
+            An async iterator of the consumption on each page, in ascending timestamp order.
+
+        """
+        consumption = await self.get_consumption(meter, period_from, period_to, page_size=page_size)
+        yield consumption
+        while consumption.next_page is not None:
+            consumption = await self.get_consumption(meter, page_reference=consumption.next_page)
+            yield consumption
 
     async def get_tariff_cost(
         self,
@@ -134,8 +270,9 @@ class OctopusEnergyConsumerClient:
             period_from=timestamp,
             # Add a millisecond as the API doesn't like requests with the same start and end
             period_to=timestamp + timedelta(seconds=1),
+            **self._raw_kwargs,
         )
-        rates = tariff_rates_from_response(response)
+        rates = await self._map_tariff_rates(response)
         return None if not rates else rates[0]
 
     async def get_daily_flexible_rate_pricing(
@@ -172,6 +309,143 @@ class OctopusEnergyConsumerClient:
             rate_type,
             period_from=period_from,
             period_to=period_from + timedelta(days=1),
+            **self._raw_kwargs,
         )
-        rates = tariff_rates_from_response(response)
-        return rates
+        return await self._map_tariff_rates(response)
+
+    async def get_flexible_rate_pricing_range(
+        self,
+        product_code: str,
+        tariff_code: str,
+        tariff_type: EnergyTariffType,
+        rate_type: RateType,
+        start: date,
+        end: date,
+    ) -> Dict[date, List[TariffRate]]:
+        """Gets the cost of a flexible rate tariff for each half hour interval over many days.
+
+        Days are determined using UK local time, so days on which the clocks change have 46 or
+        50 half hour intervals. Pricing for days that are fully published is cached by the client,
+        and is never requested again. Days that are not cached are requested in as few pages as
+        possible.
+
+        Args:
+            product_code: The product code.
+            tariff_code: The tariff code.
+            tariff_type: The type of energy within the tariff.
+            rate_type: The type of rate.
+            start: The first day (inclusive) to get pricing for.
+            end: The last day (exclusive) to get pricing for.
+
+        Returns:
+            The cost per unit of energy for the requested rate keyed by day. Each day's rates are
+            in ascending timestamp order. Days with no published pricing have an empty list.
+
+        """
+        cache = self._daily_rate_cache.setdefault(
+            (product_code, tariff_code, tariff_type, rate_type), {}
+        )
+        pricing = {}
+        for run_start, run_end in _uncached_day_runs(cache, start, end):
+            rates = await self._get_all_tariff_rates(
+                product_code,
+                tariff_type,
+                tariff_code,
+                rate_type,
+                period_from=local_day_start(run_start),
+                period_to=local_day_start(run_end),
+            )
+            for day, day_rates in split_rates_by_day(rates, run_start, run_end).items():
+                if rates_cover_day(day_rates, day):
+                    cache[day] = day_rates
+                pricing[day] = day_rates
+        days = (start + timedelta(days=i) for i in range((end - start).days))
+        return {day: cache[day] if day in cache else pricing.get(day, []) for day in days}
+
+    async def _get_all_tariff_rates(
+        self,
+        product_code: str,
+        tariff_type: EnergyTariffType,
+        tariff_code: str,
+        rate_type: RateType,
+        period_from: datetime,
+        period_to: datetime,
+    ) -> List[TariffRate]:
+        """Gets every tariff rate in a period, following pages using the largest page size."""
+        rates = []
+        page_num = 1
+        while True:
+            response = await self.rest_client.get_tariff_v1(
+                product_code,
+                tariff_type,
+                tariff_code,
+                rate_type,
+                page_num=page_num,
+                page_size=_MAX_PAGE_SIZE,
+                period_from=period_from,
+                period_to=period_to,
+                **self._raw_kwargs,
+            )
+            pages = await self._map(_tariff_rates_page, response)
+            rates.extend(rate for page_rates, _ in pages for rate in page_rates)
+            if not pages[0][1]:
+                return rates
+            page_num += 1
+
+    async def _map_tariff_rates(self, response: dict) -> List[TariffRate]:
+        chunks = await self._map(tariff_rates_from_response, response)
+        return chunks[0] if len(chunks) == 1 else [rate for chunk in chunks for rate in chunk]
+
+    async def _map(self, mapper: Callable, response: Union[dict, bytes], *args) -> List[Any]:
+        """Maps a response without blocking the event loop for long.
+
+        Returns:
+            The result of mapping each chunk of the response's results. There is a single chunk
+            unless the client maps in chunks and the response has more results than a chunk.
+        """
+        if self.executor is not None:
+            return [
+                await get_running_loop().run_in_executor(
+                    self.executor, partial(_decode_and_map, mapper, response, *args)
+                )
+            ]
+        results = response.get("results") if isinstance(response, dict) else None
+        if self.map_chunk_size is None or not results or len(results) <= self.map_chunk_size:
+            return [mapper(response, *args)]
+        chunks = []
+        for start in range(0, len(results), self.map_chunk_size):
+            end = start + self.map_chunk_size
+            chunks.append(mapper({**response, "results": results[start:end]}, *args))
+            await sleep(0)
+        return chunks
+
+
+def _decode_and_map(mapper: Callable, body: bytes, *args) -> Any:
+    """Decodes a raw response and maps it, as a single job for an executor."""
+    return mapper(json.loads(body), *args)
+
+
+def _tariff_rates_page(response: dict) -> Tuple[List[TariffRate], bool]:
+    """Maps a page of tariff rates, and whether there is a next page."""
+    return tariff_rates_from_response(response), bool(response.get("next"))
+
+
+def _uncached_day_runs(
+    cache: Dict[date, List[TariffRate]], start: date, end: date
+) -> List[Tuple[date, date]]:
+    """Groups the days in a range that are not cached into runs of consecutive days.
+
+    Returns:
+        A list of (start inclusive, end exclusive) tuples for each run of uncached days.
+    """
+    runs = []
+    day = start
+    while day < end:
+        if day in cache:
+            day += timedelta(days=1)
+            continue
+        run_start = day
+        while day < end and day not in cache:
+            day += timedelta(days=1)
+        runs.append((run_start, day))
+    return runs
@@ -0,0 +1,227 @@
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import islice
+from operator import mul
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from .models import IntervalConsumption, TariffCandidate, TariffRate
+from .periods import local_day_of
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+_SLOT_SECONDS = 30 * 60
+_QUANT_3DP = Decimal("0.001")
+_DEFAULT_CHUNK_SIZE = 100
+
+_UsageVector = Tuple[array, array]
+"""A customer's usage in each slot and a mask of days with data."""
+
+_TariffVector = Tuple[str, array, array, array]
+"""A tariff's name, price in each slot, slots with no price and standing charge for each day."""
+
+_worker_tariffs: List[_TariffVector] = []
+
+
+def _slot(timestamp: datetime) -> int:
+    return int(timestamp.timestamp()) // _SLOT_SECONDS
+
+
+def _price(rate: TariffRate, include_vat: bool) -> float:
+    return float(rate.cost_inc_vat if include_vat else rate.cost_exc_vat)
+
+
+def _zeros(length: int) -> array:
+    return array("d", bytes(8 * length))
+
+
+class TariffComparison:
+    """Prices the consumption of many customers against many candidate tariffs.
+
+    Each candidate's rates are expanded once into a price for every half hour of the comparison
+    period, and each customer's consumption into the units consumed in every half hour. The cost
+    of a customer on a tariff is then the dot product of the two, which is evaluated in C, by
+    numpy if it is installed, rather than by looping over intervals and rates in python. The
+    series are held in compact arrays of doubles, and customers are priced a chunk at a time, so
+    only one chunk of usage series is in memory at once. Large fleets can be spread over a pool of
+    processes.
+    """
+
+    def __init__(
+        self,
+        candidates: Iterable[TariffCandidate],
+        period_from: datetime,
+        period_to: datetime,
+        include_vat: bool = True,
+    ):
+        """Prepares the rate series of each candidate tariff.
+
+        Args:
+            candidates: The tariffs to compare.
+            period_from: The timezone aware start of the comparison period, on a half hour.
+            period_to: The timezone aware end of the comparison period, on a half hour.
+            include_vat: (Optional) Whether to compare costs including VAT.
+        """
+        self._base = _slot(period_from)
+        self._slots = _slot(period_to) - self._base
+        first_day = local_day_of(period_from)
+        self._slot_days = [
+            (local_day_of(period_from + timedelta(seconds=i * _SLOT_SECONDS)) - first_day).days
+            for i in range(self._slots)
+        ]
+        self._days = [
+            first_day + timedelta(days=i)
+            for i in range(self._slot_days[-1] + 1 if self._slot_days else 0)
+        ]
+        self._tariffs = [self._tariff_vector(c, include_vat) for c in candidates]
+
+    def _tariff_vector(self, candidate: TariffCandidate, include_vat: bool) -> _TariffVector:
+        prices: List[Optional[float]] = [None] * self._slots
+        for rate in candidate.unit_rates:
+            start = max(_slot(rate.valid_from) - self._base, 0)
+            end = self._slots if rate.valid_to is None else _slot(rate.valid_to) - self._base
+            price = _price(rate, include_vat)
+            for i in range(start, min(end, self._slots)):
+                prices[i] = price
+        return (
+            candidate.name,
+            array("d", (0.0 if price is None else price for price in prices)),
+            array("q", (i for i, price in enumerate(prices) if price is None)),
+            array(
+                "d",
+                (
+                    self._standing_charge(candidate.standing_charges, day, include_vat)
+                    for day in self._days
+                ),
+            ),
+        )
+
+    @staticmethod
+    def _standing_charge(rates: List[TariffRate], day: date, include_vat: bool) -> float:
+        for rate in rates:
+            if local_day_of(rate.valid_from) <= day and (
+                rate.valid_to is None or day < local_day_of(rate.valid_to)
+            ):
+                return _price(rate, include_vat)
+        return 0.0
+
+    def compare(
+        self,
+        consumption: Dict[str, Iterable[IntervalConsumption]],
+        processes: int = None,
+        chunk_size: int = _DEFAULT_CHUNK_SIZE,
+    ) -> Dict[str, Dict[str, Optional[Decimal]]]:
+        """Calculates the cost of every customer's consumption on every candidate tariff.
+
+        Args:
+            consumption: The half hourly consumption of each customer, keyed by a name for the
+                         customer such as their meter key. Intervals outside of the comparison
+                         period are ignored.
+            processes: (Optional) Spread the customers over this many processes. By default the
+                       comparison runs in the current process.
+            chunk_size: (Optional) How many customers' usage series are built and priced at once.
+
+        Returns:
+            The cost in pence of each customer on each tariff, keyed by customer and then by
+            tariff name. Standing charges are included for each day the customer has consumption
+            data for. The cost is None if the customer consumed energy in a half hour the tariff
+            has no rate for.
+        """
+        costs = {}
+        if processes is None:
+            for names, usages in self._usage_chunks(consumption, chunk_size):
+                costs.update(zip(names, _price_usages(self._tariffs, usages)))
+            return costs
+        with ProcessPoolExecutor(
+            processes, initializer=_init_worker, initargs=(self._tariffs,)
+        ) as executor:
+            # Only submit a chunk for each process at a time, so that the usage series of the
+            # whole fleet are not queued up waiting for a worker.
+            pending: Deque = deque()
+            for names, usages in self._usage_chunks(consumption, chunk_size):
+                if len(pending) >= processes:
+                    done_names, future = pending.popleft()
+                    costs.update(zip(done_names, future.result()))
+                pending.append((names, executor.submit(_price_chunk, usages)))
+            for names, future in pending:
+                costs.update(zip(names, future.result()))
+        return costs
+
+    def _usage_chunks(
+        self, consumption: Dict[str, Iterable[IntervalConsumption]], chunk_size: int
+    ) -> Iterable[Tuple[List[str], List[_UsageVector]]]:
+        items = iter(consumption.items())
+        while True:
+            chunk = list(islice(items, chunk_size))
+            if not chunk:
+                return
+            yield [name for name, _ in chunk], [
+                self._usage_vector(intervals) for _, intervals in chunk
+            ]
+
+    def _usage_vector(self, intervals: Iterable[IntervalConsumption]) -> _UsageVector:
+        usage = _zeros(self._slots)
+        days = _zeros(len(self._days))
+        for interval in intervals:
+            i = _slot(interval.interval_start) - self._base
+            if 0 <= i < self._slots:
+                usage[i] += float(interval.consumed_units)
+                days[self._slot_days[i]] = 1.0
+        return usage, days
+
+
+def _price_usages(
+    tariffs: List[_TariffVector], usages: List[_UsageVector]
+) -> List[Dict[str, Optional[Decimal]]]:
+    if numpy is not None:
+        # Views of the same buffers, so pricing with numpy copies nothing.
+        tariffs = [
+            (
+                name,
+                numpy.frombuffer(prices),
+                numpy.frombuffer(missing, dtype=numpy.int64),
+                numpy.frombuffer(standing),
+            )
+            for name, prices, missing, standing in tariffs
+        ]
+        usages = [(numpy.frombuffer(usage), numpy.frombuffer(days)) for usage, days in usages]
+        dot, used = numpy.dot, _numpy_used
+    else:
+        dot, used = _dot, _used
+    return [
+        {
+            name: None
+            if len(missing) and used(usage, missing)
+            else Decimal(float(dot(usage, prices)) + float(dot(days, standing))).quantize(
+                _QUANT_3DP
+            )
+            for name, prices, missing, standing in tariffs
+        }
+        for usage, days in usages
+    ]
+
+
+def _dot(a: array, b: array) -> float:
+    return sum(map(mul, a, b))
+
+
+def _used(usage: array, slots: array) -> bool:
+    return any(usage[i] for i in slots)
+
+
+def _numpy_used(usage, slots) -> bool:
+    return bool(usage[slots].any())
+
+
+def _init_worker(tariffs: List[_TariffVector]):
+    global _worker_tariffs
+    _worker_tariffs = tariffs
+
+
+def _price_chunk(usages: List[_UsageVector]) -> List[Dict[str, Optional[Decimal]]]:
+    return _price_usages(_worker_tariffs, usages)
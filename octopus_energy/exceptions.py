@@ -25,3 +25,14 @@ class ApiNotFoundError(Exception):
     """The resource requested as part of an API call does not exist."""
 
     pass
+
+
+class CircuitOpenError(Exception):
+    """The request was not made, as the circuit breaker for its endpoint is open."""
+
+    def __init__(self, endpoint: str, retry_after: float) -> None:
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+    def __str__(self) -> str:
+        return f"{self.endpoint} is unavailable, retry after {self.retry_after:.1f}s"
@@ -0,0 +1,394 @@
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from io import TextIOWrapper, UnsupportedOperation
+from os import PathLike
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
+
+from .client import _MAX_CONSUMPTION_PAGE_SIZE, OctopusEnergyConsumerClient
+from .mappers import to_timestamp_str
+from .models import Consumption, Meter, TariffRate, UnitType
+
+_COMPRESSORS = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+
+COLUMNS = (
+    "energy_type",
+    "mpid",
+    "serial_number",
+    "unit_type",
+    "interval_start",
+    "interval_end",
+    "consumed_units",
+)
+"""The columns written for each interval of consumption, in order."""
+
+RATE_COLUMNS = ("tariff_code", "valid_from", "valid_to", "cost_exc_vat", "cost_inc_vat")
+"""The columns written for each tariff rate, in order."""
+
+ExportTarget = Union[str, PathLike, BinaryIO]
+"""A path to write to, or a binary file object that is left open once writing is finished."""
+
+
+class ConsumptionWriter(ABC):
+    """Writes pages of consumption to a file as they arrive, one row per interval.
+
+    Rows are written as each page is received, so memory use does not grow with the number of
+    pages written. Writers can be used as a context manager, and as the sink of a
+    ConsumptionSync, in which case each page is flushed before the sync stores its checkpoint.
+    """
+
+    def __init__(self):
+        self.rows_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    async def __call__(self, meter: Meter, consumption: Consumption):
+        self.write(consumption)
+        self.flush()
+
+    def write(self, consumption: Consumption):
+        """Writes every interval of a page of consumption.
+
+        Args:
+            consumption: The page of consumption to write.
+        """
+        self._write_rows(consumption)
+        self.rows_written += len(consumption.intervals)
+
+    @abstractmethod
+    def _write_rows(self, consumption: Consumption):
+        pass
+
+    def flush(self):
+        """Writes every row written so far through to the target, where the format allows it.
+
+        Writers whose rows are only readable once closed, such as parquet, do nothing.
+        """
+
+    @abstractmethod
+    def close(self):
+        """Finishes writing, flushing any buffered rows."""
+
+
+class _TextWriter(ConsumptionWriter, ABC):
+    def __init__(
+        self, target: ExportTarget, compression: Optional[str] = None, append: bool = False
+    ):
+        """Initializes the writer.
+
+        Args:
+            target: The path or binary file object to write to.
+            compression: (Optional) Compress the output with gzip, bz2 or xz.
+            append: (Optional) Add to the end of an existing path instead of replacing it.
+                    Compressed output is appended as a new compressed stream.
+        """
+        super().__init__()
+        if compression is not None and compression not in _COMPRESSORS:
+            raise ValueError(f"Unsupported compression {compression}")
+        self._compression = compression
+        self._owns_target = isinstance(target, (str, PathLike))
+        self._binary = open(target, "ab" if append else "wb") if self._owns_target else target
+        self._file: Optional[TextIOWrapper] = None
+
+    def flush(self):
+        """Writes every row written so far through to the target, and syncs it to disk.
+
+        Compressed output finishes its compressed stream, and starts a new one once more rows are
+        written, so that the target can be decompressed in full wherever it was flushed.
+        """
+        if self._compression is None:
+            self._stream().flush()
+        else:
+            self._finish_stream()
+        self._binary.flush()
+        try:
+            os.fsync(self._binary.fileno())
+        except (AttributeError, UnsupportedOperation):
+            pass
+
+    def close(self):
+        self._finish_stream()
+        self._binary.flush()
+        if self._owns_target:
+            self._binary.close()
+
+    def _stream(self) -> TextIOWrapper:
+        """Gets the text stream to write rows to, opening a new one if needed."""
+        if self._file is None:
+            # Compressors wrapping a file object leave the file object open once closed. Each
+            # new compressed stream decompresses as if it were part of the first.
+            binary = (
+                self._binary
+                if self._compression is None
+                else _COMPRESSORS[self._compression](self._binary, "wb")
+            )
+            self._file = TextIOWrapper(binary, encoding="utf-8", newline="")
+        return self._file
+
+    def _finish_stream(self):
+        if self._file is None:
+            return
+        binary = self._file.detach()
+        if self._compression is not None:
+            binary.close()
+        self._file = None
+
+
+class CsvWriter(_TextWriter):
+    """Writes consumption as CSV, with a header row naming the columns."""
+
+    def __init__(
+        self, target: ExportTarget, compression: Optional[str] = None, append: bool = False
+    ):
+        """Initializes the writer.
+
+        Args:
+            target: The path or binary file object to write to.
+            compression: (Optional) Compress the output with gzip, bz2 or xz.
+            append: (Optional) Add to the end of an existing path instead of replacing it. The
+                    header row is only written when not appending.
+        """
+        super().__init__(target, compression, append)
+        if not append:
+            csv.writer(self._stream()).writerow(COLUMNS)
+
+    def _write_rows(self, consumption: Consumption):
+        # The text stream is replaced each time compressed output is flushed.
+        csv.writer(self._stream()).writerows(_rows(consumption))
+
+
+class NdjsonWriter(_TextWriter):
+    """Writes consumption as newline delimited JSON, one object per interval."""
+
+    def _write_rows(self, consumption: Consumption):
+        self._stream().writelines(
+            json.dumps(dict(zip(COLUMNS, row[:-1] + [float(row[-1])]))) + "\n"
+            for row in _rows(consumption)
+        )
+
+
+class ParquetWriter(ConsumptionWriter):
+    """Writes consumption as parquet, with one row group per page of consumption.
+
+    This requires pyarrow, which can be installed with the parquet extra.
+    """
+
+    def __init__(
+        self, target: ExportTarget, compression: Optional[str] = "snappy", append: bool = False
+    ):
+        """Initializes the writer.
+
+        Args:
+            target: The path or binary file object to write to.
+            compression: (Optional) The parquet compression codec to use, such as snappy, gzip
+                         or zstd. Defaults to snappy.
+            append: (Optional) Not supported, as parquet files cannot be added to once written.
+        """
+        if append:
+            raise ValueError("Parquet files cannot be appended to")
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("Writing parquet requires pyarrow to be installed") from e
+
+        super().__init__()
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema(
+            [
+                ("energy_type", pyarrow.string()),
+                ("mpid", pyarrow.string()),
+                ("serial_number", pyarrow.string()),
+                ("unit_type", pyarrow.string()),
+                ("interval_start", pyarrow.timestamp("s", tz="UTC")),
+                ("interval_end", pyarrow.timestamp("s", tz="UTC")),
+                ("consumed_units", pyarrow.float64()),
+            ]
+        )
+        self._writer = pyarrow.parquet.ParquetWriter(
+            str(target) if isinstance(target, (str, PathLike)) else target,
+            self._schema,
+            compression=compression or "none",
+        )
+
+    def _write_rows(self, consumption: Consumption):
+        if not consumption.intervals:
+            return
+        meter = consumption.meter
+        count = len(consumption.intervals)
+        columns = [
+            [meter.energy_type.value] * count,
+            [meter.meter_point.id] * count,
+            [meter.serial_number] * count,
+            [_unit_type(consumption).value[0]] * count,
+            [i.interval_start for i in consumption.intervals],
+            [i.interval_end for i in consumption.intervals],
+            [float(i.consumed_units) for i in consumption.intervals],
+        ]
+        self._writer.write_table(self._pyarrow.table(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def _open_text(target: ExportTarget, compression: Optional[str]) -> Tuple[TextIOWrapper, bool]:
+    """Opens a text file over a target, returning it and whether closing it closes the target."""
+    owns_target = isinstance(target, (str, PathLike))
+    if compression is None:
+        binary = open(target, "wb") if owns_target else target
+    elif compression in _COMPRESSORS:
+        # Compressors wrapping a file object leave the file object open once closed.
+        binary = _COMPRESSORS[compression](target, "wb")
+    else:
+        raise ValueError(f"Unsupported compression {compression}")
+    return (
+        TextIOWrapper(binary, encoding="utf-8", newline=""),
+        owns_target or compression is not None,
+    )
+
+
+def _close_text(file: TextIOWrapper, close_target: bool):
+    file.flush()
+    if close_target:
+        file.close()
+    else:
+        file.detach()
+
+
+_WRITERS = {"csv": CsvWriter, "ndjson": NdjsonWriter, "parquet": ParquetWriter}
+
+
+def open_writer(
+    target: ExportTarget,
+    format: str = "csv",
+    compression: Optional[str] = None,
+    append: bool = False,
+) -> ConsumptionWriter:
+    """Opens a writer for one of the supported export formats.
+
+    Args:
+        target: The path or binary file object to write to.
+        format: (Optional) One of csv, ndjson or parquet. Defaults to csv.
+        compression: (Optional) Compress the output with gzip, bz2 or xz. For parquet, this is
+                     the parquet compression codec instead.
+        append: (Optional) Add to the end of an existing path instead of replacing it, such as
+                when resuming an interrupted export. Not supported for parquet.
+
+    Returns:
+        The writer, which must be closed once every page has been written.
+    """
+    if format not in _WRITERS:
+        raise ValueError(f"Unsupported export format {format}")
+    if format == "parquet" and compression is None:
+        return ParquetWriter(target, append=append)
+    return _WRITERS[format](target, compression, append)
+
+
+async def export_consumption(
+    client: OctopusEnergyConsumerClient,
+    meters: Iterable[Meter],
+    writer: ConsumptionWriter,
+    period_from: datetime = None,
+    period_to: datetime = None,
+    page_size: int = _MAX_CONSUMPTION_PAGE_SIZE,
+) -> int:
+    """Streams the consumption of many meters to a writer, one page at a time.
+
+    Meters are exported one after another, and each page is written before the next page is
+    requested, so only a single page is held in memory at once. Use a ConsumptionSync with the
+    writer as its sink to fetch many meters concurrently instead.
+
+    Args:
+        client: The consumer client used to get consumption.
+        meters: The meters to export.
+        writer: Where to write the consumption. The writer is not closed.
+        period_from: (Optional) The timestamp for the earliest period of consumption to export.
+        period_to: (Optional) The timestamp for the latest period of consumption to export.
+        page_size: (Optional) How many intervals of consumption to request per page.
+
+    Returns:
+        The number of intervals written.
+    """
+    written = 0
+    for meter in meters:
+        async for consumption in client.iter_consumption_pages(
+            meter, period_from, period_to, page_size
+        ):
+            writer.write(consumption)
+            written += len(consumption.intervals)
+    return written
+
+
+def write_rates(
+    target: ExportTarget,
+    rates: Dict[str, Iterable[TariffRate]],
+    format: str = "csv",
+    compression: Optional[str] = None,
+) -> int:
+    """Writes the rates of many tariffs, one row per rate.
+
+    Args:
+        target: The path or binary file object to write to.
+        rates: The rates to write, keyed by tariff code.
+        format: (Optional) Either csv or ndjson. Defaults to csv.
+        compression: (Optional) Compress the output with gzip, bz2 or xz.
+
+    Returns:
+        The number of rates written.
+    """
+    if format not in ("csv", "ndjson"):
+        raise ValueError(f"Unsupported rate export format {format}")
+    file, close_target = _open_text(target, compression)
+    written = 0
+    try:
+        writer = csv.writer(file)
+        if format == "csv":
+            writer.writerow(RATE_COLUMNS)
+        for tariff_code, tariff_rates in rates.items():
+            for rate in tariff_rates:
+                row = [
+                    tariff_code,
+                    to_timestamp_str(rate.valid_from),
+                    None if rate.valid_to is None else to_timestamp_str(rate.valid_to),
+                    rate.cost_exc_vat,
+                    rate.cost_inc_vat,
+                ]
+                if format == "csv":
+                    writer.writerow(row)
+                else:
+                    row[3:] = map(float, row[3:])
+                    file.write(json.dumps(dict(zip(RATE_COLUMNS, row))) + "\n")
+                written += 1
+    finally:
+        _close_text(file, close_target)
+    return written
+
+
+def _unit_type(consumption: Consumption) -> UnitType:
+    """Gets the units of a page of consumption, which are the meter's units unless converted."""
+    return consumption.unit_type or consumption.meter.generation.unit_type
+
+
+def _rows(consumption: Consumption) -> Iterable[List]:
+    meter = consumption.meter
+    prefix = [
+        meter.energy_type.value,
+        meter.meter_point.id,
+        meter.serial_number,
+        _unit_type(consumption).value[0],
+    ]
+    for interval in consumption.intervals:
+        yield prefix + [
+            to_timestamp_str(interval.interval_start),
+            to_timestamp_str(interval.interval_end),
+            interval.consumed_units,
+        ]
@@ -0,0 +1,124 @@
+from asyncio import create_task, FIRST_COMPLETED, get_running_loop, wait
+from collections import deque
+from datetime import timedelta
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from .rate_limit import RateLimiter
+
+_T = TypeVar("_T")
+
+_DEFAULT_INITIAL_DELAY = timedelta(seconds=1)
+_DEFAULT_MIN_DELAY = timedelta(milliseconds=50)
+_MIN_SAMPLES = 20
+
+
+class HedgePolicy:
+    """Sends a second, identical request when the first is slower than usual.
+
+    The hedge is sent once the first request has been outstanding for longer than a percentile of
+    recent response times. Whichever request succeeds first is used, and the other is cancelled,
+    so the occasional slow or failed response no longer sets the tail latency. Only idempotent
+    requests are hedged.
+
+    Hedges never wait for the rate limiter. A hedge is only sent if the limiter has a token
+    available straight away, otherwise the first request is left to finish on its own.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        initial_delay: timedelta = _DEFAULT_INITIAL_DELAY,
+        min_delay: timedelta = _DEFAULT_MIN_DELAY,
+        sample_size: int = 1000,
+    ):
+        """Initializes the policy.
+
+        Args:
+            percentile: (Optional) The percentile of recent response times after which a hedge is
+                        sent. Defaults to 95, which hedges around one request in twenty.
+            initial_delay: (Optional) The delay used until enough responses have been timed.
+            min_delay: (Optional) The shortest delay before a hedge is sent.
+            sample_size: (Optional) How many recent response times to keep.
+        """
+        if not 0 < percentile < 100:
+            raise ValueError("percentile must be between 0 and 100")
+        self.percentile = percentile
+        self.initial_delay = initial_delay.total_seconds()
+        self.min_delay = min_delay.total_seconds()
+        self.requests = 0
+        self.hedges = 0
+        self.hedges_won = 0
+        self.hedges_skipped = 0
+        self._samples = deque(maxlen=sample_size)
+        self._delay: Optional[float] = None
+
+    @property
+    def delay(self) -> float:
+        """How many seconds a request may take before it is hedged."""
+        if len(self._samples) < _MIN_SAMPLES:
+            return self.initial_delay
+        if self._delay is None:
+            samples = sorted(self._samples)
+            index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+            self._delay = max(self.min_delay, samples[index])
+        return self._delay
+
+    def record(self, seconds: float):
+        """Records how long a response took."""
+        self._samples.append(seconds)
+        self._delay = None
+
+    async def run(
+        self, request: Callable[[], Awaitable[_T]], rate_limiter: Optional[RateLimiter] = None
+    ) -> _T:
+        """Makes a request, hedging it if it is slow.
+
+        Args:
+            request: Makes the request. It is called a second time to send a hedge.
+            rate_limiter: (Optional) The rate limiter to take a token from for each request.
+
+        Returns:
+            The result of whichever request succeeded first. If every request failed, the error
+            of the first request is raised.
+        """
+        if rate_limiter is not None:
+            await rate_limiter.acquire()
+        self.requests += 1
+        loop = get_running_loop()
+        started = loop.time()
+        first = create_task(request())
+        tasks = {first}
+        try:
+            done, pending = await wait(tasks, timeout=self.delay)
+            if pending:
+                if rate_limiter is None or await rate_limiter.try_acquire():
+                    self.hedges += 1
+                    hedge_started = loop.time()
+                    hedge = create_task(request())
+                    tasks.add(hedge)
+                    pending.add(hedge)
+                else:
+                    self.hedges_skipped += 1
+
+            while True:
+                # A request that failed is only given up on once no other request can succeed.
+                # If both succeed together, prefer the first request.
+                for task in sorted(done, key=lambda task: task is not first):
+                    if task.exception() is not None:
+                        continue
+                    if task is first:
+                        self.record(loop.time() - started)
+                    else:
+                        self.hedges_won += 1
+                        self.record(loop.time() - hedge_started)
+                    return task.result()
+                if not pending:
+                    return first.result()
+                done, pending = await wait(pending, return_when=FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    # Retrieve the error of a losing request, so it is not reported as unhandled.
+                    task.exception()
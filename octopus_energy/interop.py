@@ -0,0 +1,176 @@
+from array import array
+from importlib import import_module
+from typing import Dict, Iterable, Optional, Tuple
+
+from .models import IntervalConsumption, TariffRate
+
+_Columns = Dict[str, Tuple[array, Optional[array]]]
+"""Typed column buffers keyed by column name, each with an optional mask of valid values.
+
+The arrow, numpy and pandas tables share these buffers rather than copying them, so no python
+object is created per cell.
+"""
+
+
+def _import(module: str, extra: str):
+    """Imports an optional dependency, only when a conversion that needs it is used."""
+    try:
+        return import_module(module)
+    except ImportError as e:
+        raise ImportError(
+            f"{module} is required for this conversion, install it with the {extra} extra"
+        ) from e
+
+
+def _epoch(timestamp) -> int:
+    return int(timestamp.timestamp())
+
+
+def _consumption_columns(intervals: Iterable[IntervalConsumption]) -> _Columns:
+    starts, ends, units = array("q"), array("q"), array("d")
+    for interval in intervals:
+        starts.append(_epoch(interval.interval_start))
+        ends.append(_epoch(interval.interval_end))
+        units.append(float(interval.consumed_units))
+    return {
+        "interval_start": (starts, None),
+        "interval_end": (ends, None),
+        "consumed_units": (units, None),
+    }
+
+
+def _rate_columns(rates: Iterable[TariffRate]) -> _Columns:
+    valid_from, valid_to, valid_to_mask = array("q"), array("q"), array("b")
+    inc_vat, exc_vat = array("d"), array("d")
+    for rate in rates:
+        valid_from.append(_epoch(rate.valid_from))
+        valid_to.append(0 if rate.valid_to is None else _epoch(rate.valid_to))
+        valid_to_mask.append(rate.valid_to is not None)
+        inc_vat.append(float(rate.cost_inc_vat))
+        exc_vat.append(float(rate.cost_exc_vat))
+    return {
+        "valid_from": (valid_from, None),
+        "valid_to": (valid_to, None if all(valid_to_mask) else valid_to_mask),
+        "cost_inc_vat": (inc_vat, None),
+        "cost_exc_vat": (exc_vat, None),
+    }
+
+
+def _to_arrow(columns: _Columns):
+    pyarrow = _import("pyarrow", "arrow")
+    arrays = {}
+    for name, (values, mask) in columns.items():
+        data_type = pyarrow.int64() if values.typecode == "q" else pyarrow.float64()
+        validity = None
+        if mask is not None:
+            bitmap = bytearray((len(mask) + 7) // 8)
+            for i, valid in enumerate(mask):
+                if valid:
+                    bitmap[i >> 3] |= 1 << (i & 7)
+            validity = pyarrow.py_buffer(bitmap)
+        arrays[name] = pyarrow.Array.from_buffers(
+            data_type, len(values), [validity, pyarrow.py_buffer(values)]
+        )
+    return pyarrow.table(arrays)
+
+
+def _to_numpy(columns: _Columns) -> dict:
+    numpy = _import("numpy", "numpy")
+    arrays = {}
+    for name, (values, mask) in columns.items():
+        column = numpy.frombuffer(values, dtype=numpy.int64 if values.typecode == "q" else float)
+        if mask is not None:
+            column = numpy.ma.MaskedArray(column, ~numpy.frombuffer(mask, dtype=bool))
+        arrays[name] = column
+    return arrays
+
+
+def _to_pandas(columns: _Columns):
+    pandas = _import("pandas", "pandas")
+    numpy = _import("numpy", "pandas")
+    data = {}
+    for name, column in _to_numpy(columns).items():
+        if isinstance(column, numpy.ma.MaskedArray):
+            column = pandas.arrays.IntegerArray(column.data, column.mask)
+        data[name] = column
+    return pandas.DataFrame(data, copy=False)
+
+
+def consumption_to_arrow(intervals: Iterable[IntervalConsumption]):
+    """Converts intervals of consumption into an arrow table.
+
+    Args:
+        intervals: The intervals of consumption to convert, such as Consumption.intervals.
+
+    Returns:
+        A pyarrow Table with int64 interval_start and interval_end columns in seconds since the
+        unix epoch, and a float64 consumed_units column.
+    """
+    return _to_arrow(_consumption_columns(intervals))
+
+
+def consumption_to_numpy(intervals: Iterable[IntervalConsumption]) -> dict:
+    """Converts intervals of consumption into numpy arrays.
+
+    Args:
+        intervals: The intervals of consumption to convert, such as Consumption.intervals.
+
+    Returns:
+        A numpy array for each of the interval_start, interval_end and consumed_units columns,
+        keyed by column name.
+    """
+    return _to_numpy(_consumption_columns(intervals))
+
+
+def consumption_to_pandas(intervals: Iterable[IntervalConsumption]):
+    """Converts intervals of consumption into a pandas DataFrame backed by numpy arrays.
+
+    Args:
+        intervals: The intervals of consumption to convert, such as Consumption.intervals.
+
+    Returns:
+        A DataFrame with int64 interval_start and interval_end columns in seconds since the unix
+        epoch, and a float64 consumed_units column.
+    """
+    return _to_pandas(_consumption_columns(intervals))
+
+
+def rates_to_arrow(rates: Iterable[TariffRate]):
+    """Converts tariff rates into an arrow table.
+
+    Args:
+        rates: The rates to convert.
+
+    Returns:
+        A pyarrow Table with int64 valid_from and valid_to columns in seconds since the unix
+        epoch, and float64 cost_inc_vat and cost_exc_vat columns. valid_to is null for open
+        ended rates.
+    """
+    return _to_arrow(_rate_columns(rates))
+
+
+def rates_to_numpy(rates: Iterable[TariffRate]) -> dict:
+    """Converts tariff rates into numpy arrays.
+
+    Args:
+        rates: The rates to convert.
+
+    Returns:
+        A numpy array for each of the valid_from, valid_to, cost_inc_vat and cost_exc_vat
+        columns, keyed by column name. valid_to is a masked array if any rate is open ended.
+    """
+    return _to_numpy(_rate_columns(rates))
+
+
+def rates_to_pandas(rates: Iterable[TariffRate]):
+    """Converts tariff rates into a pandas DataFrame backed by numpy arrays.
+
+    Args:
+        rates: The rates to convert.
+
+    Returns:
+        A DataFrame with int64 valid_from and valid_to columns in seconds since the unix epoch,
+        and float64 cost_inc_vat and cost_exc_vat columns. valid_to is a nullable Int64 column
+        if any rate is open ended.
+    """
+    return _to_pandas(_rate_columns(rates))
@@ -4,7 +4,6 @@ from typing import List, Optional
 
 import dateutil
 from dateutil.parser import isoparse
-from furl import furl
 
 from .models import (
     IntervalConsumption,
@@ -23,7 +22,9 @@ from .models import (
     SortOrder,
     Aggregate,
     TariffRate,
+    Product,
 )
+from .routes import parse_page_link
 
 _CUBIC_METERS_TO_KWH_MULTIPLIER = 11.1868
 _KWH_TO_KWH_MULTIPLIER = 1
@@ -168,15 +169,61 @@ def tariff_rates_from_response(response: dict) -> List[TariffRate]:
     ]
 
 
+def products_from_response(response: dict) -> List[Product]:
+    """Generates the list of products from an octopus energy API response.
+
+    Args:
+        response: The API response object.
+
+    Returns:
+        The List containing the products on the page of the response.
+
+    """
+    if "results" not in response:
+        return []
+    return [
+        Product(
+            code=result["code"],
+            full_name=result["full_name"],
+            display_name=result["display_name"],
+            description=result["description"],
+            is_variable=result["is_variable"],
+            is_green=result["is_green"],
+            is_tracker=result["is_tracker"],
+            is_prepay=result["is_prepay"],
+            is_business=result["is_business"],
+            is_restricted=result.get("is_restricted", False),
+            term=result.get("term", None),
+            available_from=from_timestamp_str(result["available_from"]),
+            available_to=from_timestamp_str(result.get("available_to", None)),
+            brand=result.get("brand", None),
+            direction=result.get("direction", None),
+        )
+        for result in response["results"]
+    ]
+
+
+def next_page_from_response(response: dict) -> Optional[PageReference]:
+    """Gets a reference to the next page of results from a paged octopus energy API response.
+
+    Args:
+        response: The API response object.
+
+    Returns:
+        The reference to the next page, or None if the response is the last page.
+
+    """
+    return _get_page_reference(response, "next")
+
+
 def _get_page_reference(response: dict, page: str):
     if page not in response:
         return None
-    page_url = furl(response[page])
-    if not page_url.args:
+    args = parse_page_link(response[page])
+    if not args:
         return None
 
     # Convert all args in the page reference to the types used by the APIs
-    args = dict(page_url.args)
     if "period_from" in args:
         args["period_from"] = from_timestamp_str(args["period_from"])
     if "period_to" in args:
@@ -0,0 +1,77 @@
+from asyncio import gather, Semaphore
+from typing import Dict, Iterable, Optional
+
+from .exceptions import ApiNotFoundError
+from .rest_client import OctopusEnergyRestClient
+from .store import KeyValueStore, MemoryStore
+
+_GSP_PREFIX = "gsp:"
+
+
+class GspResolver:
+    """Resolves the grid supply point (GSP) of many electricity meter points at once.
+
+    The GSP of a meter point almost never changes, so resolved GSPs are kept in a store and never
+    requested again. Use a persistent store such as SqliteStore to keep them between runs.
+    """
+
+    def __init__(
+        self,
+        rest_client: OctopusEnergyRestClient,
+        store: Optional[KeyValueStore] = None,
+        concurrency: int = 8,
+    ):
+        """Initializes the GSP resolver.
+
+        Args:
+            rest_client: The rest client used to get meter point details.
+            store: (Optional) Where to keep resolved GSPs. Defaults to an in memory store.
+            concurrency: (Optional) How many meter points to request at once.
+        """
+        self.rest_client = rest_client
+        self.store = store if store is not None else MemoryStore()
+        self.concurrency = concurrency
+
+    async def resolve(self, mpans: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Gets the GSP for each of a list of MPANs.
+
+        MPANs are deduplicated, and only those that are not already in the store are requested.
+
+        Args:
+            mpans: The MPANs (Meter Point Administration Numbers) to resolve.
+
+        Returns:
+            The GSP of each MPAN, such as "_A", keyed by MPAN. The GSP is None for MPANs that
+            octopus does not know about. These are not stored, so they are requested again next
+            time.
+
+        Raises:
+            ApiError: If a meter point could not be looked up. The GSPs that were resolved are
+                      stored first, so only the failed MPANs are requested again next time.
+        """
+        gsps = {mpan: self.store.get(_GSP_PREFIX + mpan) for mpan in dict.fromkeys(mpans)}
+        semaphore = Semaphore(self.concurrency)
+
+        async def get_gsp(mpan: str) -> Optional[str]:
+            async with semaphore:
+                try:
+                    response = await self.rest_client.get_electricity_meter_points_v1(mpan)
+                except ApiNotFoundError:
+                    return None
+            return response.get("gsp")
+
+        unresolved = [mpan for mpan, gsp in gsps.items() if gsp is None]
+        results = await gather(*(get_gsp(m) for m in unresolved), return_exceptions=True)
+        resolved = {
+            mpan: gsp
+            for mpan, gsp in zip(unresolved, results)
+            if not isinstance(gsp, BaseException)
+        }
+        self.store.set_many(
+            {_GSP_PREFIX + mpan: gsp for mpan, gsp in resolved.items() if gsp is not None}
+        )
+        for error in results:
+            if isinstance(error, BaseException):
+                raise error
+        gsps.update(resolved)
+        return gsps
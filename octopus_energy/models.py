@@ -1,8 +1,8 @@
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence
 
 
 class _DocEnum(Enum):
@@ -30,6 +30,26 @@ class Tariff:
     valid_to: Optional[datetime]
 
 
+@dataclass(frozen=True)
+class TariffCode:
+    """The parts of an octopus energy tariff code, such as E-1R-AGILE-18-02-21-C."""
+
+    code: str
+    energy_type: "EnergyType"
+    registers: int
+    product_code: str
+    region: str
+
+    @property
+    def tariff_type(self) -> "EnergyTariffType":
+        """The type of tariff, as used by the tariff APIs."""
+        return (
+            EnergyTariffType.ELECTRICITY
+            if self.energy_type == EnergyType.ELECTRICITY
+            else EnergyTariffType.GAS
+        )
+
+
 @dataclass
 class TariffRate:
     cost_inc_vat: Decimal
@@ -38,6 +58,76 @@ class TariffRate:
     valid_to: Optional[datetime]
 
 
+@dataclass
+class Product:
+    """Represents an octopus energy product, which is a family of tariffs."""
+
+    code: str
+    full_name: str
+    display_name: str
+    description: str
+    is_variable: bool
+    is_green: bool
+    is_tracker: bool
+    is_prepay: bool
+    is_business: bool
+    is_restricted: bool
+    term: Optional[int]
+    available_from: datetime
+    available_to: Optional[datetime]
+    brand: Optional[str] = None
+    direction: Optional[str] = None
+
+    def is_available_at(self, timestamp: datetime) -> bool:
+        """Checks whether the product is available for new agreements at a point in time."""
+        return self.available_from <= timestamp and (
+            self.available_to is None or timestamp < self.available_to
+        )
+
+
+@dataclass
+class ProductSnapshot:
+    """Details of many products, with the tariffs that were active at a single point in time.
+
+    The details of each product are the get_product_v1 response, keyed by product code.
+    """
+
+    tariffs_active_at: Optional[datetime]
+    products: Dict[str, dict]
+
+
+@dataclass
+class TariffCandidate:
+    """A tariff to price consumption against, made up of its unit rates and standing charges."""
+
+    name: str
+    unit_rates: List[TariffRate]
+    standing_charges: List[TariffRate] = field(default_factory=lambda: [])
+
+
+@dataclass
+class PriceWindow:
+    """A contiguous block of time and the cost of running a load across it."""
+
+    valid_from: datetime
+    valid_to: datetime
+    cost_inc_vat: Decimal
+    cost_exc_vat: Decimal
+
+
+@dataclass
+class WindowRequest:
+    """A request for the cheapest contiguous block of time of a specific duration.
+
+    If a load profile is supplied it holds the units consumed in each half hour of the window,
+    and its length must match the duration. Without a load profile one unit is consumed in each
+    half hour.
+    """
+
+    duration: timedelta
+    load_profile: Optional[Sequence[Decimal]] = None
+
+
 class UnitType(Enum):
     """Units of energy measurement."""
 
@@ -174,6 +264,65 @@ class Consumption:
     next_page: Optional[PageReference] = None
 
 
+@dataclass
+class SyncProgress:
+    """The progress of synchronising consumption for many meters.
+
+    Page latencies hold the number of seconds each page of consumption took to be fetched.
+    """
+
+    meters_total: int
+    meters_completed: int = 0
+    meters_failed: int = 0
+    pages: int = 0
+    intervals: int = 0
+    elapsed_seconds: float = 0
+    page_latencies: List[float] = field(default_factory=lambda: [])
+
+    @property
+    def intervals_per_second(self) -> float:
+        """The number of intervals of consumption synchronised per second."""
+        return self.intervals / self.elapsed_seconds if self.elapsed_seconds else 0
+
+
+@dataclass
+class SyncReport:
+    """The outcome of synchronising consumption for many meters.
+
+    Failures are keyed by meter key, and hold the error that stopped that meter being synchronised.
+    Revised days are only reported by a resync, and hold the UK local days whose consumption
+    changed since it was last synchronised, keyed by meter key.
+    """
+
+    progress: SyncProgress
+    failures: Dict[str, Exception] = field(default_factory=lambda: {})
+    revised_days: Dict[str, List[date]] = field(default_factory=lambda: {})
+
+
+@dataclass
+class PipelineStage:
+    """How many items a stage of a pipeline has processed, is processing and has waiting."""
+
+    completed: int = 0
+    active: int = 0
+    waiting: int = 0
+
+
+@dataclass
+class PipelineStats:
+    """The progress of each stage of a consumption pipeline.
+
+    Items are pages of consumption, except that the fetch stage counts the meters waiting to be
+    fetched. Failures are keyed by meter key, and hold the first error that occurred for that
+    meter.
+    """
+
+    fetch: PipelineStage = field(default_factory=PipelineStage)
+    map: PipelineStage = field(default_factory=PipelineStage)
+    sink: PipelineStage = field(default_factory=PipelineStage)
+    failures: Dict[str, Exception] = field(default_factory=lambda: {})
+
+
 class EnergyTariffType(_DocEnum):
     """Represents a type of energy tariff."""
 
@@ -244,6 +393,22 @@ class Aggregate(_DocEnum):
     )
 
 
+class CircuitState(_DocEnum):
+    """The state of a circuit breaker guarding an API endpoint."""
+
+    CLOSED = ("closed", "Requests are made as normal")
+    OPEN = ("open", "Requests fail fast, as the endpoint has been failing")
+    HALF_OPEN = ("half_open", "A few trial requests are made to see if the endpoint has recovered")
+
+
+class RequestPriority(_DocEnum):
+    """How urgently a request to the API is needed, used to schedule it among other requests."""
+
+    INTERACTIVE = ("interactive", "A user is waiting on the result, such as a price lookup")
+    NORMAL = ("normal", "The default for requests that are not tagged")
+    BULK = ("bulk", "Background work such as a backfill, which can wait for other requests")
+
+
 def get_tariff_at(tariffs: List[Tariff], timestamp: datetime):
     """Gets the tariff in effect on a meter at a specific date/time.
 
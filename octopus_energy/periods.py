@@ -0,0 +1,140 @@
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone, tzinfo
+from typing import Dict, List, Optional, Tuple
+
+from dateutil import tz
+from dateutil.relativedelta import relativedelta
+
+from .models import Aggregate, TariffRate
+
+UK_TIMEZONE = tz.gettz("Europe/London")
+"""The timezone octopus energy uses when talking about days, such as the agile pricing day."""
+
+
+def local_day_start(day: date, timezone: Optional[tzinfo] = None) -> datetime:
+    """Gets the timestamp of midnight at the start of a day in a local timezone.
+
+    Args:
+        day: The day to get the start of.
+        timezone: (Optional) The timezone the day is in. Defaults to UK local time.
+
+    Returns:
+        A timezone aware timestamp for the start of the day.
+    """
+    return datetime.combine(day, time(), tzinfo=timezone or UK_TIMEZONE)
+
+
+def local_day_of(timestamp: datetime, timezone: Optional[tzinfo] = None) -> date:
+    """Gets the local day that a timestamp falls on.
+
+    Args:
+        timestamp: A timezone aware timestamp.
+        timezone: (Optional) The timezone the day is in. Defaults to UK local time.
+
+    Returns:
+        The day in the local timezone that the timestamp falls within.
+    """
+    return timestamp.astimezone(timezone or UK_TIMEZONE).date()
+
+
+def local_period_bounds(
+    timestamp: datetime, aggregate: Aggregate, timezone: Optional[tzinfo] = None
+) -> Tuple[datetime, datetime]:
+    """Gets the start and end of the local aggregation period that a timestamp falls within.
+
+    Hours and half hours are measured in absolute time, so the hour the clocks go back is
+    repeated. Their bounds are returned in UTC, as local times in the repeated hour are
+    ambiguous. Days, weeks, months and quarters start at local midnight, so they are shorter or
+    longer than usual when the clocks change. Weeks start on a Monday.
+
+    Args:
+        timestamp: A timezone aware timestamp.
+        aggregate: The aggregation period.
+        timezone: (Optional) The timezone that determines period boundaries. Defaults to UK local
+                  time.
+
+    Returns:
+        A tuple of the start (inclusive) and end (exclusive) of the period.
+    """
+    timezone = timezone or UK_TIMEZONE
+    local = timestamp.astimezone(timezone)
+    if aggregate in (Aggregate.HALF_HOURLY, Aggregate.HOUR):
+        length = timedelta(minutes=30 if aggregate == Aggregate.HALF_HOURLY else 60)
+        start = local.replace(
+            minute=0 if aggregate == Aggregate.HOUR else local.minute - local.minute % 30,
+            second=0,
+            microsecond=0,
+        )
+        start = start.astimezone(dt_timezone.utc)
+        return start, start + length
+
+    day = local.date()
+    if aggregate == Aggregate.DAY:
+        length = relativedelta(days=1)
+    elif aggregate == Aggregate.WEEK:
+        day -= timedelta(days=day.weekday())
+        length = relativedelta(weeks=1)
+    elif aggregate == Aggregate.MONTH:
+        day = day.replace(day=1)
+        length = relativedelta(months=1)
+    else:
+        day = day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+        length = relativedelta(months=3)
+    return local_day_start(day, timezone), local_day_start(day + length, timezone)
+
+
+def split_rates_by_day(
+    rates: List[TariffRate], start: date, end: date, timezone: Optional[tzinfo] = None
+) -> Dict[date, List[TariffRate]]:
+    """Splits a list of tariff rates into buckets for each local day they apply to.
+
+    Rates that span midnight are placed into the bucket of every day they overlap. Each bucket
+    is sorted by the time the rate becomes valid.
+
+    Args:
+        rates: The rates to split.
+        start: The first day (inclusive) to create a bucket for.
+        end: The last day (exclusive) to create a bucket for.
+        timezone: (Optional) The timezone that determines day boundaries. Defaults to UK local
+                  time.
+
+    Returns:
+        A dictionary of rates keyed by the day they apply to. Every day in the range has an
+        entry, even if it has no rates.
+    """
+    buckets: Dict[date, List[TariffRate]] = {
+        start + timedelta(days=i): [] for i in range((end - start).days)
+    }
+    for rate in sorted(rates, key=lambda r: r.valid_from):
+        day = max(local_day_of(rate.valid_from, timezone), start)
+        while day < end:
+            if rate.valid_to is not None and rate.valid_to <= local_day_start(day, timezone):
+                break
+            buckets[day].append(rate)
+            day += timedelta(days=1)
+    return buckets
+
+
+def rates_cover_day(rates: List[TariffRate], day: date, timezone: Optional[tzinfo] = None) -> bool:
+    """Checks whether a list of rates completely covers a local day.
+
+    Open ended rates (those with no valid_to) are not considered to cover the day, as their end
+    may be set at a later date.
+
+    Args:
+        rates: The rates to check, sorted by the time they become valid.
+        day: The day to check.
+        timezone: (Optional) The timezone that determines day boundaries. Defaults to UK local
+                  time.
+
+    Returns:
+        True if every instant of the day is covered by a rate with a known end, otherwise False.
+    """
+    covered_to = local_day_start(day, timezone)
+    day_end = local_day_start(day + timedelta(days=1), timezone)
+    for rate in rates:
+        if rate.valid_to is None or rate.valid_from > covered_to:
+            return False
+        covered_to = max(covered_to, rate.valid_to)
+        if covered_to >= day_end:
+            return True
+    return False
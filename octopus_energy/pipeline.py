@@ -0,0 +1,187 @@
+from asyncio import CancelledError, gather, get_running_loop, Queue, QueueEmpty
+from concurrent.futures import Executor
+from datetime import datetime
+from functools import partial
+from typing import Awaitable, Callable, List, Optional
+
+from .client import _MAX_CONSUMPTION_PAGE_SIZE, OctopusEnergyConsumerClient
+from .mappers import consumption_from_response, next_page_from_response
+from .models import Consumption, Meter, PipelineStage, PipelineStats
+from .sync import ConsumptionSink, meter_key
+
+_DONE = None
+
+
+class ConsumptionPipeline:
+    """Fetches, maps and sinks consumption for many meters with bounded memory.
+
+    Each stage runs its own pool of workers, and the stages are joined by bounded queues. When
+    the sink falls behind, the queue in front of it fills up and the mapping workers wait for
+    space, which in turn stops the fetching workers requesting more pages. At most
+    fetch_concurrency + map_concurrency + sink_concurrency + 2 * queue_size pages are held in
+    memory at once, however much consumption there is.
+
+    Pages of a meter reach the sink in order only if map_concurrency and sink_concurrency are
+    both 1.
+    """
+
+    def __init__(
+        self,
+        client: OctopusEnergyConsumerClient,
+        sink: ConsumptionSink,
+        fetch_concurrency: int = 8,
+        map_concurrency: int = 1,
+        sink_concurrency: int = 1,
+        queue_size: int = 8,
+        page_size: int = _MAX_CONSUMPTION_PAGE_SIZE,
+        executor: Optional[Executor] = None,
+    ):
+        """Initializes the pipeline.
+
+        Args:
+            client: The consumer client used to get consumption.
+            sink: Receives each page of consumption for each meter.
+            fetch_concurrency: (Optional) How many meters to fetch pages for at once.
+            map_concurrency: (Optional) How many pages to map at once.
+            sink_concurrency: (Optional) How many pages to pass to the sink at once.
+            queue_size: (Optional) How many pages may wait between one stage and the next.
+            page_size: (Optional) How many intervals of consumption to request per page.
+            executor: (Optional) A thread or process pool to map pages in, instead of on the
+                      event loop.
+        """
+        self.client = client
+        self.sink = sink
+        self.fetch_concurrency = fetch_concurrency
+        self.map_concurrency = map_concurrency
+        self.sink_concurrency = sink_concurrency
+        self.queue_size = queue_size
+        self.page_size = page_size
+        self.executor = executor
+        self.stats = PipelineStats()
+
+    async def run(
+        self, meters: List[Meter], period_from: datetime = None, period_to: datetime = None
+    ) -> PipelineStats:
+        """Passes the consumption of every meter in a period through the pipeline.
+
+        The stats attribute shows the progress of each stage while the pipeline is running.
+
+        Args:
+            meters: The meters to get consumption for.
+            period_from: (Optional) The timestamp for the earliest period of consumption.
+            period_to: (Optional) The timestamp for the latest period of consumption.
+
+        Returns:
+            The number of pages that passed through each stage, and any meters that failed.
+        """
+        self.stats = stats = PipelineStats()
+        pending = Queue()
+        for meter in meters:
+            pending.put_nowait(meter)
+        stats.fetch.waiting = pending.qsize()
+        responses = Queue(self.queue_size)
+        pages = Queue(self.queue_size)
+
+        async def fetch():
+            while True:
+                try:
+                    meter = pending.get_nowait()
+                except QueueEmpty:
+                    return
+                stats.fetch.waiting -= 1
+                page_reference = None
+                while True:
+                    stats.fetch.active += 1
+                    try:
+                        response = await self.client.get_consumption_response(
+                            meter, period_from, period_to, page_reference, self.page_size
+                        )
+                    except CancelledError:
+                        raise
+                    except Exception as e:
+                        _fail(stats, meter, e)
+                        break
+                    finally:
+                        stats.fetch.active -= 1
+                    stats.fetch.completed += 1
+                    await _put(responses, stats.map, (meter, response))
+                    page_reference = next_page_from_response(response)
+                    if page_reference is None:
+                        break
+
+        async def map_pages():
+            while True:
+                item = await _get(responses, stats.map)
+                if item is _DONE:
+                    return
+                meter, response = item
+                consumption = await _run_stage(stats, stats.map, meter, self._map, response, meter)
+                if consumption is not None:
+                    await _put(pages, stats.sink, (meter, consumption))
+
+        async def sink_pages():
+            while True:
+                item = await _get(pages, stats.sink)
+                if item is _DONE:
+                    return
+                meter, consumption = item
+                await _run_stage(stats, stats.sink, meter, self.sink, meter, consumption)
+
+        await gather(
+            _run_workers(fetch, self.fetch_concurrency, responses, self.map_concurrency),
+            _run_workers(map_pages, self.map_concurrency, pages, self.sink_concurrency),
+            _run_workers(sink_pages, self.sink_concurrency),
+        )
+        return stats
+
+    async def _map(self, response: dict, meter: Meter) -> Consumption:
+        if self.executor is None:
+            return consumption_from_response(response, meter)
+        return await get_running_loop().run_in_executor(
+            self.executor, partial(consumption_from_response, response, meter)
+        )
+
+
+async def _run_workers(
+    worker: Callable[[], Awaitable[None]],
+    count: int,
+    downstream: Optional[Queue] = None,
+    downstream_count: int = 0,
+):
+    """Runs a stage's workers, then tells each of the next stage's workers that it is done."""
+    await gather(*(worker() for _ in range(count)))
+    for _ in range(downstream_count):
+        await downstream.put(_DONE)
+
+
+async def _run_stage(
+    stats: PipelineStats, stage: PipelineStage, meter: Meter, func: Callable, *args
+):
+    stage.active += 1
+    try:
+        result = await func(*args)
+    except CancelledError:
+        raise
+    except Exception as e:
+        _fail(stats, meter, e)
+        return None
+    finally:
+        stage.active -= 1
+    stage.completed += 1
+    return result
+
+
+async def _put(queue: Queue, stage: PipelineStage, item):
+    await queue.put(item)
+    stage.waiting += 1
+
+
+async def _get(queue: Queue, stage: PipelineStage):
+    item = await queue.get()
+    if item is not _DONE:
+        stage.waiting -= 1
+    return item
+
+
+def _fail(stats: PipelineStats, meter: Meter, error: Exception):
+    stats.failures.setdefault(meter_key(meter), error)
@@ -0,0 +1,197 @@
+import sqlite3
+import threading
+from asyncio import Event, get_running_loop, sleep
+from datetime import timedelta
+from heapq import heapify, heappush
+from itertools import count
+from time import monotonic, time
+from typing import List, Optional, Tuple
+
+from .models import RequestPriority
+from .scheduling import current_priority
+
+_DEFAULT_PERIOD = timedelta(seconds=1)
+_BUSY_TIMEOUT = 0.05
+"""How many seconds to wait for another process to release the database before retrying."""
+_OPEN_TIMEOUT = 5
+"""How many seconds to wait for another process to release the database while creating tables."""
+_ORDER = {priority: i for i, priority in enumerate(RequestPriority)}
+
+
+class RateLimiter:
+    """Limits how many requests are made to the API, using a token bucket.
+
+    The bucket holds up to burst tokens, and refills at requests tokens per period. Each request
+    takes a token, waiting for one to become available if the bucket is empty. Waiting requests
+    are given tokens by their priority, set with request_priority, and then in the order they
+    started waiting, so an interactive request is never stuck behind queued bulk requests.
+    """
+
+    def __init__(
+        self, requests: int, period: timedelta = _DEFAULT_PERIOD, burst: Optional[int] = None
+    ):
+        """Initializes the rate limiter with a full bucket.
+
+        Args:
+            requests: How many requests may be made each period.
+            period: (Optional) The period the limit applies to. Defaults to one second.
+            burst: (Optional) The most requests that may be made at once after a quiet spell.
+                   Defaults to requests.
+        """
+        if requests <= 0:
+            raise ValueError("requests must be positive")
+        self.rate = requests / period.total_seconds()
+        self.burst = burst if burst is not None else requests
+        self._tokens = float(self.burst)
+        self._updated = monotonic()
+        self._waiters: List[Tuple[int, int, Event]] = []
+        self._sequence = count()
+
+    async def acquire(self):
+        """Takes a token, waiting until one is available.
+
+        Only the first waiter, by priority and then by arrival, takes tokens. The others wait
+        until they are first.
+        """
+        waiter = (_ORDER[current_priority()], next(self._sequence), Event())
+        heappush(self._waiters, waiter)
+        try:
+            while True:
+                if self._waiters[0] is not waiter:
+                    waiter[2].clear()
+                    await waiter[2].wait()
+                    continue
+                wait = await self._take_async()
+                if wait <= 0:
+                    return
+                await sleep(wait)
+        finally:
+            self._waiters.remove(waiter)
+            heapify(self._waiters)
+            if self._waiters:
+                self._waiters[0][2].set()
+
+    async def try_acquire(self) -> bool:
+        """Takes a token only if one is available now and nothing is already waiting for one.
+
+        Returns:
+            True if a token was taken.
+        """
+        if self._waiters:
+            return False
+        return await self._take_async() <= 0
+
+    async def _take_async(self) -> float:
+        """Takes a token if one is available, as _take does, from a coroutine."""
+        return self._take()
+
+    def _take(self) -> float:
+        """Takes a token if one is available.
+
+        Returns:
+            0 if a token was taken, otherwise how many seconds until one will be available.
+        """
+        now = monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.rate
+
+
+class SqliteRateLimiter(RateLimiter):
+    """A rate limiter whose token bucket is shared between processes through a SQLite file.
+
+    Every process on a host that uses the same API token can open a limiter on the same database
+    file, so that together they stay within the token's limits while still using all of it. Each
+    token is taken in its own transaction, and the bucket is refilled using the wall clock, which
+    is shared between processes. Every process should use the same limits.
+
+    The database is used from a thread, so the event loop is never blocked waiting for it. When
+    another process holds the database, acquire waits and tries again rather than failing.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        requests: int,
+        period: timedelta = _DEFAULT_PERIOD,
+        burst: Optional[int] = None,
+        key: str = "default",
+        table: str = "octopus_energy_rate_limits",
+    ):
+        """Opens or creates a rate limiter backed by a SQLite database file.
+
+        Args:
+            path: The path of the database file.
+            requests: How many requests may be made each period, by all processes together.
+            period: (Optional) The period the limit applies to. Defaults to one second.
+            burst: (Optional) The most requests that may be made at once after a quiet spell.
+                   Defaults to requests.
+            key: (Optional) The name of the bucket. Use a different key for each API token.
+            table: (Optional) The name of the table to store buckets in.
+        """
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name {table}")
+        super().__init__(requests, period, burst)
+        self.key = key
+        self.table = table
+        self._connection_lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=_OPEN_TIMEOUT, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        # Taking a token only waits briefly for the database, and retries if it is still busy.
+        self._connection.execute(f"PRAGMA busy_timeout = {int(_BUSY_TIMEOUT * 1000)}")
+
+    def close(self):
+        """Closes the underlying database connection."""
+        self._connection.close()
+
+    async def _take_async(self) -> float:
+        return await get_running_loop().run_in_executor(None, self._take)
+
+    def _take(self) -> float:
+        with self._connection_lock:
+            # An immediate transaction holds the write lock from the start, so no other process
+            # can take a token between this one reading the bucket and writing it back.
+            try:
+                self._connection.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e):
+                    raise
+                # Another process is taking a token, so try again once it is likely done.
+                return _BUSY_TIMEOUT
+            try:
+                row = self._connection.execute(
+                    f"SELECT tokens, updated FROM {self.table} WHERE key = ?", (self.key,)
+                ).fetchone()
+                now = time()
+                tokens = (
+                    float(self.burst)
+                    if row is None
+                    else min(self.burst, row[0] + max(0.0, now - row[1]) * self.rate)
+                )
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+                self._connection.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, tokens, updated) VALUES (?, ?, ?)",
+                    (self.key, tokens, now),
+                )
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+        return wait
+
+
+def _is_busy(error: sqlite3.OperationalError) -> bool:
+    message = str(error)
+    return "locked" in message or "busy" in message
@@ -0,0 +1,200 @@
+from asyncio import CancelledError, create_task, sleep, Task
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Optional
+
+from .client import OctopusEnergyConsumerClient
+from .models import EnergyTariffType, RateType, TariffRate
+from .periods import local_day_of, rates_cover_day, UK_TIMEZONE
+
+_DEFAULT_PUBLISH_TIME = time(16, 0)
+_DEFAULT_PUBLISH_CUTOFF = time(23, 0)
+_DEFAULT_INITIAL_BACKOFF = timedelta(minutes=1)
+_DEFAULT_MAX_BACKOFF = timedelta(minutes=30)
+
+
+class FlexibleRateRefresher:
+    """Keeps an in-memory index of current and upcoming flexible tariff rates.
+
+    Flexible tariffs such as agile publish the next day's pricing once a day in the afternoon.
+    Instead of every reader calling the API when the pricing is published, a single refresher
+    polls for the new rates once around the publication time, backing off until the next day's
+    rates are available. Readers then look up rates from memory without any network calls.
+
+    The refresher can operate either as an async context manager, or as a regular object. If you
+    use the latter call start to begin refreshing and stop to end it.
+    """
+
+    def __init__(
+        self,
+        client: OctopusEnergyConsumerClient,
+        product_code: str,
+        tariff_code: str,
+        tariff_type: EnergyTariffType = EnergyTariffType.ELECTRICITY,
+        rate_type: RateType = RateType.STANDARD_UNIT_RATES,
+        publish_time: time = _DEFAULT_PUBLISH_TIME,
+        publish_cutoff: time = _DEFAULT_PUBLISH_CUTOFF,
+        initial_backoff: timedelta = _DEFAULT_INITIAL_BACKOFF,
+        max_backoff: timedelta = _DEFAULT_MAX_BACKOFF,
+    ):
+        """Initializes the refresher.
+
+        Args:
+            client: The consumer client used to get the rates.
+            product_code: The product code.
+            tariff_code: The tariff code.
+            tariff_type: (Optional) The type of energy within the tariff.
+            rate_type: (Optional) The type of rate.
+            publish_time: (Optional) The UK local time the next day's rates are normally
+                          published at. Polling for new rates begins at this time.
+            publish_cutoff: (Optional) The UK local time on the next day that its published rates
+                            run up to. The next day's rates are considered published once the
+                            rates reach this time. Defaults to 23:00, as agile rates are published
+                            from 23:00 today to 23:00 tomorrow.
+            initial_backoff: (Optional) How long to wait before polling again if the next day's
+                             rates have not been published yet.
+            max_backoff: (Optional) The longest time to wait between polls.
+        """
+        self.client = client
+        self.product_code = product_code
+        self.tariff_code = tariff_code
+        self.tariff_type = tariff_type
+        self.rate_type = rate_type
+        self.publish_time = publish_time
+        self.publish_cutoff = publish_cutoff
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self._starts: List[datetime] = []
+        self._rates: List[TariffRate] = []
+        self._published_days = set()
+        self._covered_to: Optional[datetime] = None
+        self._task: Optional[Task] = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    async def start(self):
+        """Loads the current rates and begins refreshing them in the background."""
+        await self.refresh()
+        self._task = create_task(self._run())
+
+    async def stop(self):
+        """Stops refreshing rates in the background.
+
+        Rates that have already been loaded remain available.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except CancelledError:
+            pass
+        self._task = None
+
+    async def refresh(self) -> bool:
+        """Loads today's and tomorrow's rates and rebuilds the index.
+
+        Returns:
+            True if tomorrow's rates have been published, which is once the rates reach the
+            publish cutoff tomorrow, otherwise False.
+        """
+        today = local_day_of(self._now())
+        pricing = await self.client.get_flexible_rate_pricing_range(
+            self.product_code,
+            self.tariff_code,
+            self.tariff_type,
+            self.rate_type,
+            today,
+            today + timedelta(days=2),
+        )
+        rates = {}
+        for day_rates in pricing.values():
+            rates.update((rate.valid_from, rate) for rate in day_rates)
+        starts = sorted(rates)
+        # Swap in the new index in one step so concurrent readers never see a partial index.
+        self._starts, self._rates = starts, [rates[start] for start in starts]
+        self._published_days = {
+            day for day, day_rates in pricing.items() if rates_cover_day(day_rates, day)
+        }
+        self._covered_to = max(
+            (rate.valid_to for rate in self._rates if rate.valid_to is not None), default=None
+        )
+        return self._is_next_day_published(today)
+
+    def rate_at(self, timestamp: datetime) -> Optional[TariffRate]:
+        """Gets the rate in effect at a point in time from the index.
+
+        Args:
+            timestamp: A timezone aware timestamp.
+
+        Returns:
+            The rate in effect at the timestamp, or None if it is not in the index.
+        """
+        starts, rates = self._starts, self._rates
+        index = bisect_right(starts, timestamp) - 1
+        if index < 0:
+            return None
+        rate = rates[index]
+        return rate if rate.valid_to is None or timestamp < rate.valid_to else None
+
+    def current_rate(self) -> Optional[TariffRate]:
+        """Gets the rate in effect now from the index."""
+        return self.rate_at(self._now())
+
+    def upcoming_rates(self) -> List[TariffRate]:
+        """Gets the rate in effect now and all the rates after it from the index.
+
+        Returns:
+            The rates in ascending timestamp order.
+        """
+        starts, rates = self._starts, self._rates
+        current = max(bisect_right(starts, self._now()) - 1, 0)
+        return rates[current:]
+
+    def is_published(self, day: date) -> bool:
+        """Checks whether the index holds the complete set of rates for a UK local day."""
+        return day in self._published_days
+
+    async def _run(self):
+        while True:
+            await sleep(self._seconds_until_publication())
+            backoff = self.initial_backoff
+            while not await self._try_refresh():
+                await sleep(backoff.total_seconds())
+                backoff = min(backoff * 2, self.max_backoff)
+
+    async def _try_refresh(self) -> bool:
+        try:
+            return await self.refresh()
+        except CancelledError:
+            raise
+        except Exception:
+            # Any failure, including a timeout or an open circuit, is a failed poll; letting it
+            # escape would end the background task.
+            return False
+
+    def _seconds_until_publication(self) -> float:
+        """How long until the next day's rates are expected to be published."""
+        now = self._now()
+        today = local_day_of(now)
+        publication = datetime.combine(today, self.publish_time, tzinfo=UK_TIMEZONE)
+        if now >= publication and self._is_next_day_published(today):
+            publication = datetime.combine(
+                today + timedelta(days=1), self.publish_time, tzinfo=UK_TIMEZONE
+            )
+        return max((publication - now).total_seconds(), 0)
+
+    def _is_next_day_published(self, today: date) -> bool:
+        cutoff = datetime.combine(
+            today + timedelta(days=1), self.publish_cutoff, tzinfo=UK_TIMEZONE
+        )
+        return self._covered_to is not None and self._covered_to >= cutoff
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(tz=timezone.utc)
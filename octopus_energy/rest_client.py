@@ -1,10 +1,12 @@
+import json
+from asyncio import AbstractEventLoop, gather, get_running_loop
+from concurrent.futures import Executor
 from datetime import datetime
 from functools import partial
 from http import HTTPStatus
-from typing import Optional, Callable
+from typing import Awaitable, Callable, Hashable, Optional, Union
 
-from aiohttp import BasicAuth, ClientSession
-from furl import furl
+from aiohttp import BasicAuth, ClientResponse, ClientSession
 
 from .mappers import to_timestamp_str
 from .exceptions import (
@@ -13,10 +15,30 @@ from .exceptions import (
     ApiNotFoundError,
     ApiBadRequestError,
 )
+from .circuit_breaker import CircuitBreaker
+from .hedging import HedgePolicy
 from .models import RateType, EnergyTariffType, Aggregate, SortOrder
+from .rate_limit import RateLimiter
+from .routes import Route
+from .scheduling import RequestScheduler
 
 _API_BASE = "https://api.octopus.energy"
 
+_ROOT = Route("v1")
+
+_ACCOUNTS = Route("v1/accounts")
+_ACCOUNT = Route("v1/accounts/{account_number}")
+_TARIFF_RENEWAL = Route("v1/accounts/{account_number}/tariff-renewal")
+_QUOTES = Route("v1/quotes")
+_ELECTRICITY_METER_POINT = Route("v1/electricity-meter-points/{mpan}")
+_ELECTRICITY_CONSUMPTION = Route(
+    "v1/electricity-meter-points/{mpan}/meters/{serial_number}/consumption"
+)
+_GAS_CONSUMPTION = Route("v1/gas-meter-points/{mprn}/meters/{serial_number}/consumption")
+_PRODUCTS = Route("v1/products")
+_PRODUCT = Route("v1/products/{product_code}")
+_TARIFF_RATES = Route("v1/products/{product_code}/{tariff_type}/{tariff_code}/{rate_type}")
+
 
 class OctopusEnergyRestClient:
     """A client for interacting with the Octopus Energy RESTful API.
@@ -29,20 +51,49 @@ class OctopusEnergyRestClient:
     This client can operate either as an async context manager, or as a regular object.
     If you use the latter ensure that you call close at the end to release any underlying
     resources this client uses.
+
+    The underlying HTTP session is created on first use, bound to the event loop that is running
+    at the time, so the client can be created outside of a running event loop.
     """
 
-    def __init__(self, api_token: Optional[str] = None, base_url: str = _API_BASE):
+    def __init__(
+        self,
+        api_token: Optional[str] = None,
+        base_url: str = _API_BASE,
+        executor: Optional[Executor] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        scheduler: Optional[RequestScheduler] = None,
+    ):
         """Create a new instance of the Octopus API rest client.
 
         Args:
             api_token: [Optional] The API token to use to access the APIs. If not specified only
                        octopus public APIs can be called.
             base_url: The Octopus Energy API address.
+            executor: [Optional] A thread or process pool to decode response json in, instead of
+                      on the event loop.
+            rate_limiter: [Optional] Limits how many requests are made, including hedges. Share
+                          one limiter between clients using the same API token, or use a
+                          SqliteRateLimiter to share the limit between processes.
+            hedge_policy: [Optional] Sends a second request for GETs that are slower than usual,
+                          using whichever answers first.
+            circuit_breaker: [Optional] Fails calls fast, or answers them from its cache, while
+                             the endpoint they call keeps failing.
+            scheduler: [Optional] Limits how many requests are made at once, starting waiting
+                       requests by their priority. Tag requests with request_priority.
         """
-        self.base_url = furl(base_url)
-        self.session = ClientSession(
-            auth=BasicAuth(api_token, "") if api_token is not None else None
-        )
+        self.base_url = base_url.rstrip("/")
+        self.executor = executor
+        self.rate_limiter = rate_limiter
+        self.hedge_policy = hedge_policy
+        self.circuit_breaker = circuit_breaker
+        self.scheduler = scheduler
+        self._auth = BasicAuth(api_token, "") if api_token is not None else None
+        self._session: Optional[ClientSession] = None
+        self._session_loop: Optional[AbstractEventLoop] = None
+        self._closed = False
 
     def __enter__(self):
         raise TypeError("Use async context manager (async with) instead")
@@ -56,12 +107,55 @@ class OctopusEnergyRestClient:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.close()
 
+    @property
+    def session(self) -> ClientSession:
+        """The HTTP session used to call the API, created on first use in the running loop."""
+        loop = get_running_loop()
+        if self._closed:
+            raise RuntimeError("The client is closed")
+        if self._session is None:
+            self._session = ClientSession(auth=self._auth)
+            self._session_loop = loop
+        elif self._session_loop is not loop:
+            raise RuntimeError(
+                "The client can only be used from the event loop it was first used in"
+            )
+        return self._session
+
     async def close(self):
         """Clean up resources used by the client.
 
         Once the client is closed, you cannot use it to make any further calls.
         """
-        await self.session.close()
+        self._closed = True
+        if self._session is not None:
+            await self._session.close()
+
+    async def warmup(self, connections: int = 1):
+        """Opens pooled connections to the API ahead of the first real request.
+
+        Each connection is opened by a lightweight request, so its DNS lookup and TLS handshake
+        are done before latency sensitive calls, such as fetching the agile rates as soon as they
+        are published. The connections stay in the pool until they have been idle for the keep
+        alive timeout of the session, which is 15 seconds by default, so warm up shortly before
+        the calls that need it.
+
+        Each warm up request takes a token from the rate limiter, if the client has one, so that
+        it counts towards a limit shared with other clients or processes. It is not hedged,
+        scheduled or passed through the circuit breaker.
+
+        Args:
+            connections: (Optional) How many connections to open at once. Defaults to 1.
+        """
+        url = _ROOT.url(self.base_url)
+
+        async def connect():
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            async with self.session.head(url, allow_redirects=False):
+                pass
+
+        await gather(*(connect() for _ in range(connections)))
 
     async def create_account(self, account_data: dict) -> dict:
         """Creates an account.
@@ -77,7 +171,7 @@ class OctopusEnergyRestClient:
         Returns:
             A dictionary containing the account creation response.
         """
-        return await self._post(["v1", "accounts"], account_data)
+        return await self._post(_ACCOUNTS, data=account_data)
 
     async def create_quote(self, quote_data: dict) -> dict:
         """Creates an energy quote.
@@ -93,20 +187,24 @@ class OctopusEnergyRestClient:
         Returns:
             A dictionary containing the quote creation response.
         """
-        return await self._post(["v1", "quotes"], quote_data)
+        return await self._post(_QUOTES, data=quote_data)
 
-    async def get_account_details(self, account_number: str) -> dict:
+    async def get_account_details(
+        self, account_number: str, raw: bool = False
+    ) -> Union[dict, bytes]:
         """Gets account details for an account number.
 
         Note that your API key must have access to the account in order to get it's details.
 
         Args:
             account_number: The account number whose details are being requested
+            raw: (Optional) Return the response body undecoded, for callers that decode it
+                 themselves, for example together with mapping it in an executor.
 
         Returns:
             A dictionary containing the account details
         """
-        return await self._get(["v1", "accounts", account_number])
+        return await self._get(_ACCOUNT, account_number, raw=raw)
 
     async def get_electricity_consumption_v1(
         self,
@@ -118,7 +216,8 @@ class OctopusEnergyRestClient:
         period_to: datetime = None,
         order: SortOrder = None,
         group_by: Aggregate = None,
-    ) -> dict:
+        raw: bool = False,
+    ) -> Union[dict, bytes]:
         """Gets the consumption of electricity from a specific meter.
 
         Args:
@@ -132,13 +231,17 @@ class OctopusEnergyRestClient:
             group_by: (Optional) Over what period to aggregate the results. By default consumption
                        results are aggregated half hourly. You can override this setting by
                        explicitly stating an alternate aggregate.
+            raw: (Optional) Return the response body undecoded, for callers that decode it
+                 themselves, for example together with mapping it in an executor.
         Returns:
             A dictionary containing the electricity consumption response.
 
         """
         return await self._get(
-            ["v1", "electricity-meter-points", mpan, "meters", serial_number, "consumption"],
-            {
+            _ELECTRICITY_CONSUMPTION,
+            mpan,
+            serial_number,
+            query={
                 "page": page,
                 "page_size": page_size,
                 "period_from": to_timestamp_str(period_from),
@@ -146,6 +249,7 @@ class OctopusEnergyRestClient:
                 "order": order.value if order is not None else None,
                 "group_by": group_by.value if group_by is not None else None,
             },
+            raw=raw,
         )
 
     async def get_electricity_meter_points_v1(self, mpan: str) -> dict:
@@ -158,7 +262,7 @@ class OctopusEnergyRestClient:
             A dictionary containing the meters at the location.
 
         """
-        return await self._get(["v1", "electricity-meter-points", mpan])
+        return await self._get(_ELECTRICITY_METER_POINT, mpan)
 
     async def get_gas_consumption_v1(
         self,
@@ -170,7 +274,8 @@ class OctopusEnergyRestClient:
         period_to: datetime = None,
         order: SortOrder = None,
         group_by: Aggregate = None,
-    ) -> dict:
+        raw: bool = False,
+    ) -> Union[dict, bytes]:
         """Gets the consumption of gas from a specific meter.
 
         Args:
@@ -184,13 +289,17 @@ class OctopusEnergyRestClient:
             group_by: (Optional) Over what period to aggregate the results. By default consumption
                        results are aggregated half hourly. You can override this setting by
                        explicitly stating an alternate aggregate.
+            raw: (Optional) Return the response body undecoded, for callers that decode it
+                 themselves, for example together with mapping it in an executor.
         Returns:
             A dictionary containing the gas consumption response.
 
         """
         return await self._get(
-            ["v1", "gas-meter-points", mprn, "meters", serial_number, "consumption"],
-            {
+            _GAS_CONSUMPTION,
+            mprn,
+            serial_number,
+            query={
                 "page": page,
                 "page_size": page_size,
                 "period_from": to_timestamp_str(period_from),
@@ -198,6 +307,7 @@ class OctopusEnergyRestClient:
                 "order": order.value if order is not None else None,
                 "group_by": group_by.value if group_by is not None else None,
             },
+            raw=raw,
         )
 
     async def get_products_v1(
@@ -230,8 +340,8 @@ class OctopusEnergyRestClient:
 
         """
         return await self._get(
-            ["v1", "products"],
-            {
+            _PRODUCTS,
+            query={
                 "page": page,
                 "page_size": page_size,
                 "is_variable": is_variable,
@@ -256,8 +366,9 @@ class OctopusEnergyRestClient:
 
         """
         return await self._get(
-            ["v1", "products", product_code],
-            {
+            _PRODUCT,
+            product_code,
+            query={
                 "tariffs_active_at": to_timestamp_str(tariffs_active_at)
                 if tariffs_active_at is not None
                 else None
@@ -274,7 +385,8 @@ class OctopusEnergyRestClient:
         page_size: int = None,
         period_from: datetime = None,
         period_to: datetime = None,
-    ) -> dict:
+        raw: bool = False,
+    ) -> Union[dict, bytes]:
         """Gets tariff information about a specific octopus energy tariff.
 
         Args:
@@ -286,19 +398,26 @@ class OctopusEnergyRestClient:
             page_size: (Optional) How many results per page.
             period_from: (Optional) The timestamp (inclusive) from where to begin returning results.
             period_to: (Optional) The timestamp (exclusive) at which to end returning results.
+            raw: (Optional) Return the response body undecoded, for callers that decode it
+                 themselves, for example together with mapping it in an executor.
 
         Returns:
             A dictionary containing the tariff details response.
 
         """
         return await self._get(
-            ["v1", "products", product_code, tariff_type.value, tariff_code, rate_type.value],
-            {
+            _TARIFF_RATES,
+            product_code,
+            tariff_type.value,
+            tariff_code,
+            rate_type.value,
+            query={
                 "page": page_num,
                 "page_size": page_size,
                 "period_from": to_timestamp_str(period_from),
                 "period_to": to_timestamp_str(period_to),
             },
+            raw=raw,
         )
 
     async def renew_business_tariff(self, account_number: str, renewal_data: dict) -> dict:
@@ -316,25 +435,62 @@ class OctopusEnergyRestClient:
         Returns:
             A dictionary containing the account creation response.
         """
-        return await self._post(["v1", "accounts", account_number, "tariff-renewal"], renewal_data)
+        return await self._post(_TARIFF_RENEWAL, account_number, data=renewal_data)
 
-    async def _get(self, url_parts: list, query_params: dict = {}, **kwargs) -> dict:
-        return await self._execute(self.session.get, url_parts, query_params, **kwargs)
+    async def _get(
+        self, route: Route, *values: str, query: Optional[dict] = None, raw: bool = False
+    ) -> Union[dict, bytes]:
+        url = route.url(self.base_url, *values, query=query)
+        request = partial(self._send, self.session.get, url, raw=raw)
+        # Raw and decoded responses for the same URL are cached separately.
+        return await self._execute(route, request, (url, raw) if raw else url)
 
-    async def _post(self, url_parts: list, data: dict, query_params: dict = {}, **kwargs) -> dict:
-        return await self._execute(
-            partial(self.session.post, data=data), url_parts, query_params, **kwargs
-        )
+    async def _post(self, route: Route, *values: str, data: dict) -> dict:
+        url = route.url(self.base_url, *values)
+        return await self._execute(route, partial(self._send, self.session.post, url, data=data))
 
     async def _execute(
-        self, func: Callable, url_parts: list, query_params: dict = {}, **kwargs
+        self,
+        route: Route,
+        request: Callable[[], Awaitable[dict]],
+        cache_key: Optional[Hashable] = None,
     ) -> dict:
-        """Executes an API call to Octopus energy and maps the response."""
-        url = self.base_url.copy()
-        url.path.segments.extend(url_parts)
-        url.query.params.update({p: v for p, v in query_params.items() if v is not None})
-        response = await func(url=str(url), **kwargs)
+        """Executes an API call to Octopus energy through the client's request policies.
+
+        Args:
+            route: The route being called.
+            request: Makes a single attempt at the call.
+            cache_key: (Optional) Identifies a call that can safely be repeated, such as by its
+                       URL, which allows it to be hedged and its response cached.
+        """
+        if cache_key is not None and self.hedge_policy is not None:
+            request = partial(self.hedge_policy.run, request, self.rate_limiter)
+        elif self.rate_limiter is not None:
+            request = partial(self._limited, request)
+        if self.scheduler is not None:
+            request = partial(self._scheduled, request)
+        if self.circuit_breaker is not None:
+            return await self.circuit_breaker.call(route.template, request, cache_key)
+        return await request()
+
+    async def _scheduled(self, request: Callable[[], Awaitable[dict]]) -> dict:
+        async with self.scheduler.slot():
+            return await request()
+
+    async def _limited(self, request: Callable[[], Awaitable[dict]]) -> dict:
+        await self.rate_limiter.acquire()
+        return await request()
+
+    async def _send(self, func: Callable, url: str, raw: bool = False, **kwargs) -> dict:
+        """Makes a single request to Octopus energy and maps the response."""
+        async with func(url, **kwargs) as response:
+            return await self._read(response, raw)
+
+    async def _read(self, response: ClientResponse, raw: bool = False) -> Union[dict, bytes]:
         if response.status > 399:
+            # The connection is released once the request finishes, so read the body now to keep
+            # it available on the error's response.
+            await response.read()
             if response.status == HTTPStatus.UNAUTHORIZED:
                 raise ApiAuthenticationError()
             if response.status == HTTPStatus.NOT_FOUND:
@@ -342,4 +498,9 @@ class OctopusEnergyRestClient:
             if response.status == HTTPStatus.BAD_REQUEST:
                 raise ApiBadRequestError(response)
             raise ApiError(response, "API Call Failed")
-        return await response.json()
+        if raw:
+            return await response.read()
+        if self.executor is None:
+            return await response.json()
+        body = await response.read()
+        return await get_running_loop().run_in_executor(self.executor, json.loads, body)
@@ -0,0 +1,89 @@
+from functools import lru_cache
+from typing import Dict, Mapping, Optional
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit
+
+# The characters that may appear unquoted in a path segment (RFC 3986 sub-delims, ":" and "@").
+_SEGMENT_SAFE = "!$&'()*+,;=:@"
+
+
+@lru_cache(maxsize=4096)
+def _quote_segment(value: str) -> str:
+    """Quotes a value filled into a path. Cached, as the same mpans and codes recur."""
+    return quote(value, safe=_SEGMENT_SAFE)
+
+
+class Route:
+    """A path on the API, such as v1/accounts/{account_number}, compiled once up front.
+
+    The literal parts of the path are quoted and joined when the route is created, so building a
+    URL only quotes the values filled into it and joins a handful of strings.
+    """
+
+    __slots__ = ("template", "_literals")
+
+    def __init__(self, template: str):
+        """Compiles a route.
+
+        Args:
+            template: The path relative to the API address, with each value to fill in named in
+                      braces in place of a whole segment.
+        """
+        self.template = template
+        literals = [""]
+        for segment in template.strip("/").split("/"):
+            if segment.startswith("{") and segment.endswith("}"):
+                literals[-1] += "/"
+                literals.append("")
+            else:
+                literals[-1] += "/" + _quote_segment(segment)
+        self._literals = tuple(literals)
+
+    def __repr__(self):
+        return f"Route({self.template!r})"
+
+    def url(self, base_url: str, *values: str, query: Optional[Mapping] = None) -> str:
+        """Builds the URL of the route.
+
+        Args:
+            base_url: The API address, without a trailing slash.
+            values: The values to fill into the path, in the order they appear in the template.
+            query: (Optional) The query parameters. Parameters whose value is None are left out.
+
+        Returns:
+            The URL, with the path values and query parameters quoted.
+        """
+        literals = self._literals
+        if len(values) != len(literals) - 1:
+            raise ValueError(f"{self!r} needs {len(literals) - 1} values, got {len(values)}")
+        parts = [base_url, literals[0]]
+        for value, literal in zip(values, literals[1:]):
+            parts.append(_quote_segment(value))
+            parts.append(literal)
+        if query:
+            encoded = encode_query(query)
+            if encoded:
+                parts.append("?")
+                parts.append(encoded)
+        return "".join(parts)
+
+
+def encode_query(params: Mapping) -> str:
+    """Encodes query parameters, leaving out any whose value is None.
+
+    Values are converted with str, and quoted so spaces become "+" and characters such as ":"
+    and "+" in timestamps are percent encoded.
+    """
+    return urlencode([(name, value) for name, value in params.items() if value is not None])
+
+
+def parse_page_link(url: str) -> Dict[str, str]:
+    """Gets the query parameters of a page link, such as the next URL of a paged response.
+
+    Args:
+        url: The page link.
+
+    Returns:
+        The unquoted query parameters, keyed by name. If a parameter is repeated, the last value
+        is used. Parameters without a value map to an empty string.
+    """
+    return dict(parse_qsl(urlsplit(url).query, keep_blank_values=True))
@@ -0,0 +1,133 @@
+from asyncio import CancelledError, Future, get_running_loop
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Deque, Dict, Iterator, Optional
+
+from .models import RequestPriority
+
+_PRIORITY: ContextVar[RequestPriority] = ContextVar(
+    "octopus_energy_request_priority", default=RequestPriority.NORMAL
+)
+_DEFAULT_WEIGHTS = {
+    RequestPriority.INTERACTIVE: 8,
+    RequestPriority.NORMAL: 4,
+    RequestPriority.BULK: 1,
+}
+_ORDER = {priority: i for i, priority in enumerate(RequestPriority)}
+
+
+@contextmanager
+def request_priority(priority: RequestPriority) -> Iterator[None]:
+    """Tags every API request made within the block, including by tasks it starts, with a priority.
+
+    For example, wrap a backfill in request_priority(RequestPriority.BULK) so that price lookups
+    made at the same time are not stuck behind it.
+
+    Args:
+        priority: The priority of the requests.
+    """
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+def current_priority() -> RequestPriority:
+    """Gets the priority that requests made now are tagged with."""
+    return _PRIORITY.get()
+
+
+class RequestScheduler:
+    """Shares a limited number of concurrent requests between priority classes.
+
+    Requests that cannot start straight away wait in a queue for their priority class. Whenever a
+    request finishes, the next request is taken from the queues by weighted fair queueing, so
+    while every class has requests waiting, each class starts requests in proportion to its
+    weight. A share of the concurrency is reserved for interactive requests, so they can start
+    straight away however much bulk work is waiting.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 16,
+        reserved: int = 2,
+        weights: Optional[Dict[RequestPriority, int]] = None,
+    ):
+        """Initializes the scheduler.
+
+        Args:
+            concurrency: (Optional) The most requests that can be made at once.
+            reserved: (Optional) How many of those requests only interactive requests can make.
+            weights: (Optional) The share of requests each priority class starts while they are
+                     all waiting. Defaults to 8 interactive and 4 normal to every 1 bulk request.
+        """
+        if not 0 <= reserved < concurrency:
+            raise ValueError("reserved must be at least 0 and less than concurrency")
+        self.concurrency = concurrency
+        self.reserved = reserved
+        self.weights = {**_DEFAULT_WEIGHTS, **(weights or {})}
+        self.active = 0
+        self._waiters: Dict[RequestPriority, Deque[Future]] = {p: deque() for p in RequestPriority}
+        self._virtual_time = {priority: 0.0 for priority in RequestPriority}
+        self._clock = 0.0
+
+    def waiting(self, priority: RequestPriority) -> int:
+        """Gets how many requests of a priority class are waiting to start."""
+        return sum(not waiter.done() for waiter in self._waiters[priority])
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[RequestPriority] = None) -> AsyncIterator[None]:
+        """Waits until a request can be made, and holds its place until the block exits.
+
+        Args:
+            priority: (Optional) The priority of the request. Defaults to the priority set with
+                      request_priority, or normal.
+        """
+        priority = priority or current_priority()
+        waiters = self._waiters[priority]
+        if not waiters:
+            # A class that was idle starts from the current virtual time, rather than using the
+            # share it did not use while idle to starve the others.
+            self._virtual_time[priority] = max(self._virtual_time[priority], self._clock)
+        waiter = get_running_loop().create_future()
+        waiters.append(waiter)
+        self._dispatch()
+        try:
+            await waiter
+        except CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self):
+        self.active -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        while True:
+            ready = [
+                priority
+                for priority, waiters in self._waiters.items()
+                if waiters and self.active < self._limit(priority)
+            ]
+            if not ready:
+                return
+            priority = min(ready, key=lambda p: (self._virtual_time[p], _ORDER[p]))
+            waiter = self._waiters[priority].popleft()
+            if waiter.cancelled():
+                continue
+            self._clock = self._virtual_time[priority]
+            self._virtual_time[priority] += 1 / self.weights[priority]
+            self.active += 1
+            waiter.set_result(None)
+
+    def _limit(self, priority: RequestPriority) -> int:
+        if priority == RequestPriority.INTERACTIVE:
+            return self.concurrency
+        return self.concurrency - self.reserved
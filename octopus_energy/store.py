@@ -0,0 +1,105 @@
+import sqlite3
+from abc import ABC, abstractmethod
+from threading import Lock
+from typing import Dict, Iterator, Optional, Tuple
+
+
+class KeyValueStore(ABC):
+    """A simple string key value store used to persist state between runs."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Gets the value stored for a key, or None if there is no value."""
+
+    @abstractmethod
+    def set(self, key: str, value: str):
+        """Stores the value for a key, replacing any existing value."""
+
+    @abstractmethod
+    def items(self, prefix: str = "") -> Iterator[Tuple[str, str]]:
+        """Iterates over all the keys and values whose key starts with a prefix."""
+
+    def set_many(self, items: Dict[str, str]):
+        """Stores many values at once."""
+        for key, value in items.items():
+            self.set(key, value)
+
+
+class MemoryStore(KeyValueStore):
+    """A key value store that holds values in memory, so they only last as long as the process."""
+
+    def __init__(self):
+        self._values: Dict[str, str] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        return self._values.get(key)
+
+    def set(self, key: str, value: str):
+        self._values[key] = value
+
+    def items(self, prefix: str = "") -> Iterator[Tuple[str, str]]:
+        return iter([(k, v) for k, v in self._values.items() if k.startswith(prefix)])
+
+
+class SqliteStore(KeyValueStore):
+    """A key value store persisted to a SQLite database file.
+
+    The store is safe to use from multiple threads, and many processes can share the same
+    database file.
+
+    Every write is committed before it returns, on the calling thread, so writing from a
+    coroutine blocks the event loop until the commit is on disk. Prefer set_many to write many
+    values in a single commit.
+    """
+
+    def __init__(self, path: str, table: str = "octopus_energy"):
+        """Opens or creates a SQLite backed store.
+
+        Args:
+            path: The path of the database file.
+            table: (Optional) The name of the table to store values in. Use different tables to
+                   keep unrelated values in the same database file.
+        """
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name {table}")
+        self.table = table
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+
+    def close(self):
+        """Closes the underlying database connection."""
+        self._connection.close()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT value FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str):
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, str]):
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)",
+                    items.items(),
+                )
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def items(self, prefix: str = "") -> Iterator[Tuple[str, str]]:
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT key, value FROM {self.table} WHERE substr(key, 1, ?) = ? ORDER BY key",
+                (len(prefix), prefix),
+            ).fetchall()
+        return iter(rows)
@@ -0,0 +1,316 @@
+from asyncio import CancelledError, gather, Queue, QueueEmpty, wait_for
+from datetime import date, datetime
+from hashlib import sha256
+from time import monotonic
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from .client import _MAX_CONSUMPTION_PAGE_SIZE, OctopusEnergyConsumerClient
+from .mappers import from_timestamp_str, to_timestamp_str
+from .models import Consumption, IntervalConsumption, Meter, SyncProgress, SyncReport
+from .periods import local_day_of, local_day_start
+from .store import KeyValueStore, MemoryStore
+
+_CHECKPOINT_PREFIX = "consumption-checkpoint:"
+_CHECKSUM_PREFIX = "consumption-checksum:"
+
+ConsumptionSink = Callable[[Meter, Consumption], Awaitable[None]]
+"""An async callable that receives each page of consumption as it is fetched."""
+
+
+def meter_key(meter: Meter) -> str:
+    """Gets a string that uniquely identifies a meter, suitable for use as a storage key."""
+    return f"{meter.energy_type.value}/{meter.meter_point.id}/{meter.serial_number}"
+
+
+class ConsumptionSync:
+    """Synchronises consumption for many meters with bounded concurrency.
+
+    Each page of consumption is passed to a sink as soon as it is fetched, and once the sink has
+    accepted it, a checkpoint is stored for the meter. If the sync is interrupted, running it
+    again with the same checkpoint store resumes each meter from its last checkpoint.
+
+    A meter that fails is recorded in the report, and does not stop the other meters from being
+    synchronised. A slow meter only ever occupies one unit of concurrency.
+
+    Each instance runs one sync at a time.
+    """
+
+    def __init__(
+        self,
+        client: OctopusEnergyConsumerClient,
+        sink: ConsumptionSink,
+        checkpoints: Optional[KeyValueStore] = None,
+        concurrency: int = 8,
+        page_size: int = _MAX_CONSUMPTION_PAGE_SIZE,
+        page_timeout: Optional[float] = None,
+        on_progress: Optional[Callable[[SyncProgress], None]] = None,
+        checkpoint_values: Optional[Callable[[], Dict[str, str]]] = None,
+    ):
+        """Initializes the consumption sync.
+
+        Args:
+            client: The consumer client used to get consumption.
+            sink: Receives each page of consumption for each meter.
+            checkpoints: (Optional) Where to store per meter checkpoints and the checksums used by
+                         resync. Use a persistent store such as SqliteStore to be able to resume
+                         after a crash. Defaults to an in memory store.
+            concurrency: (Optional) How many meters to fetch consumption for at once.
+            page_size: (Optional) How many intervals of consumption to request per page.
+            page_timeout: (Optional) How many seconds to wait for each page before the meter is
+                          considered failed.
+            on_progress: (Optional) Called with the overall progress after every page.
+            checkpoint_values: (Optional) Called once the sink has accepted consumption, to get
+                               extra values to store in the same write as its checkpoint, such
+                               as how much of an output file has been written.
+        """
+        self.client = client
+        self.sink = sink
+        self.checkpoints = checkpoints if checkpoints is not None else MemoryStore()
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.page_timeout = page_timeout
+        self.on_progress = on_progress
+        self.checkpoint_values = checkpoint_values
+        self._started = monotonic()
+
+    def get_checkpoint(self, meter: Meter) -> Optional[datetime]:
+        """Gets the end of the last interval of consumption synchronised for a meter."""
+        return from_timestamp_str(self.checkpoints.get(_CHECKPOINT_PREFIX + meter_key(meter)))
+
+    async def run(
+        self, meters: List[Meter], period_from: datetime, period_to: datetime = None
+    ) -> SyncReport:
+        """Synchronises consumption for a list of meters.
+
+        Args:
+            meters: The meters to synchronise.
+            period_from: The timezone aware timestamp to synchronise consumption from. Meters
+                         with a later checkpoint resume from their checkpoint instead.
+            period_to: (Optional) The timezone aware timestamp to synchronise consumption up to.
+                       Defaults to the latest available consumption.
+
+        Returns:
+            A report of the progress made and any meters that failed.
+        """
+        return await self._run_all(
+            meters, lambda meter, report: self._sync_meter(meter, period_from, period_to, report)
+        )
+
+    async def resync(
+        self, meters: List[Meter], period_from: datetime, period_to: datetime = None
+    ) -> SyncReport:
+        """Synchronises consumption again for a period, only writing days that have changed.
+
+        Octopus sometimes revises consumption after it was first published. A checksum of each
+        UK local day of consumption is kept in the checkpoint store, by both run and resync, and
+        only days whose checksum differs from the stored checksum are passed to the sink, one day
+        at a time. Checkpoints are ignored when deciding what to fetch, but are moved forward if
+        newer consumption is written.
+
+        Note that a day that was only partially published when it was last synchronised is
+        reported as revised once more of it is published.
+
+        Args:
+            meters: The meters to synchronise.
+            period_from: The timezone aware timestamp to synchronise consumption from. This
+                         should be the start of a UK local day.
+            period_to: (Optional) The timezone aware timestamp to synchronise consumption up to.
+                       Defaults to the latest available consumption.
+
+        Returns:
+            A report of the progress made, any meters that failed and the days whose consumption
+            was revised.
+        """
+        return await self._run_all(
+            meters, lambda meter, report: self._resync_meter(meter, period_from, period_to, report)
+        )
+
+    async def _run_all(
+        self, meters: List[Meter], sync_meter: Callable[[Meter, SyncReport], Awaitable[None]]
+    ) -> SyncReport:
+        report = SyncReport(SyncProgress(len(meters)))
+        self._started = monotonic()
+        queue = Queue()
+        for meter in meters:
+            queue.put_nowait(meter)
+
+        async def worker():
+            while True:
+                try:
+                    meter = queue.get_nowait()
+                except QueueEmpty:
+                    return
+                try:
+                    await sync_meter(meter, report)
+                    report.progress.meters_completed += 1
+                except CancelledError:
+                    raise
+                except Exception as e:
+                    report.failures[meter_key(meter)] = e
+                    report.progress.meters_failed += 1
+                self._update_progress(report)
+
+        await gather(*(worker() for _ in range(min(self.concurrency, len(meters)))))
+        self._update_progress(report)
+        return report
+
+    async def _sync_meter(
+        self,
+        meter: Meter,
+        period_from: datetime,
+        period_to: Optional[datetime],
+        report: SyncReport,
+    ):
+        checkpoint = self.get_checkpoint(meter)
+        if checkpoint is not None and checkpoint > period_from:
+            period_from = checkpoint
+        if period_to is not None and period_from >= period_to:
+            return
+
+        # The checksum of each day is stored once the sink has accepted all of it, so that a
+        # later resync only writes days that have been revised. resync compares whole days, so
+        # a first day that is only partly synchronised, such as after resuming, is left to it.
+        partial_day = local_day_of(period_from)
+        if local_day_start(partial_day) == period_from:
+            partial_day = None
+        day: Optional[date] = None
+        day_intervals: List[IntervalConsumption] = []
+        async for consumption in self._pages(meter, period_from, period_to, report):
+            if consumption.intervals:
+                await self.sink(meter, consumption)
+                # The checksums of the days the page completes are stored with its checkpoint in a
+                # single write, as a page can cover hundreds of days.
+                updates = {}
+                for interval in consumption.intervals:
+                    interval_day = local_day_of(interval.interval_start)
+                    if interval_day != day:
+                        if day_intervals and day != partial_day:
+                            updates[_checksum_key(meter, day)] = _checksum(day_intervals)
+                        day, day_intervals = interval_day, []
+                    day_intervals.append(interval)
+                updates[_CHECKPOINT_PREFIX + meter_key(meter)] = to_timestamp_str(
+                    consumption.intervals[-1].interval_end
+                )
+                self._store_updates(updates)
+        if day_intervals and day != partial_day:
+            self._set_checksum(meter, day, day_intervals)
+
+    async def _resync_meter(
+        self,
+        meter: Meter,
+        period_from: datetime,
+        period_to: Optional[datetime],
+        report: SyncReport,
+    ):
+        key = meter_key(meter)
+        checkpoint = self.get_checkpoint(meter)
+        day: Optional[date] = None
+        day_intervals: List[IntervalConsumption] = []
+        # The checksums of the days written from each page, and the checkpoint if it moved
+        # forward, are stored together once the page has been processed.
+        updates: Dict[str, str] = {}
+        async for consumption in self._pages(meter, period_from, period_to, report):
+            for interval in consumption.intervals:
+                interval_day = local_day_of(interval.interval_start)
+                if interval_day != day and day_intervals:
+                    checkpoint = await self._write_day_if_changed(
+                        meter, day, day_intervals, consumption, checkpoint, updates, report
+                    )
+                    day_intervals = []
+                day = interval_day
+                day_intervals.append(interval)
+            self._store_updates(updates)
+        if day_intervals:
+            await self._write_day_if_changed(
+                meter, day, day_intervals, consumption, checkpoint, updates, report
+            )
+            self._store_updates(updates)
+        report.revised_days.setdefault(key, [])
+
+    async def _write_day_if_changed(
+        self,
+        meter: Meter,
+        day: date,
+        intervals: List[IntervalConsumption],
+        page: Consumption,
+        checkpoint: Optional[datetime],
+        updates: Dict[str, str],
+        report: SyncReport,
+    ) -> Optional[datetime]:
+        """Writes a day of consumption if its checksum has changed, adding what to store to updates.
+
+        Returns:
+            The meter's checkpoint once the day has been stored.
+        """
+        checksum = _checksum(intervals)
+        previous = self.checkpoints.get(_checksum_key(meter, day))
+        if previous == checksum:
+            return checkpoint
+        await self.sink(meter, Consumption(page.unit_type, meter, intervals))
+        updates[_checksum_key(meter, day)] = checksum
+        if checkpoint is None or checkpoint < intervals[-1].interval_end:
+            checkpoint = intervals[-1].interval_end
+            updates[_CHECKPOINT_PREFIX + meter_key(meter)] = to_timestamp_str(checkpoint)
+        if previous is not None:
+            report.revised_days.setdefault(meter_key(meter), []).append(day)
+        return checkpoint
+
+    def _store_updates(self, updates: Dict[str, str]):
+        if updates:
+            if self.checkpoint_values is not None:
+                updates.update(self.checkpoint_values())
+            self.checkpoints.set_many(updates)
+            updates.clear()
+
+    async def _pages(
+        self,
+        meter: Meter,
+        period_from: datetime,
+        period_to: Optional[datetime],
+        report: SyncReport,
+    ) -> AsyncIterator[Consumption]:
+        """Iterates over the pages of consumption for a meter, keeping progress up to date."""
+        requested = monotonic()
+        consumption = await self._fetch(
+            self.client.get_consumption(meter, period_from, period_to, page_size=self.page_size)
+        )
+        while True:
+            report.progress.page_latencies.append(monotonic() - requested)
+            yield consumption
+            report.progress.pages += 1
+            report.progress.intervals += len(consumption.intervals)
+            self._update_progress(report)
+            if consumption.next_page is None:
+                return
+            requested = monotonic()
+            consumption = await self._fetch(
+                self.client.get_consumption(meter, page_reference=consumption.next_page)
+            )
+
+    async def _fetch(self, request: Awaitable[Consumption]) -> Consumption:
+        if self.page_timeout is None:
+            return await request
+        return await wait_for(request, self.page_timeout)
+
+    def _set_checksum(self, meter: Meter, day: date, intervals: List[IntervalConsumption]):
+        self.checkpoints.set(_checksum_key(meter, day), _checksum(intervals))
+
+    def _update_progress(self, report: SyncReport):
+        report.progress.elapsed_seconds = monotonic() - self._started
+        if self.on_progress is not None:
+            self.on_progress(report.progress)
+
+
+def _checksum_key(meter: Meter, day: date) -> str:
+    return f"{_CHECKSUM_PREFIX}{meter_key(meter)}:{day.isoformat()}"
+
+
+def _checksum(intervals: List[IntervalConsumption]) -> str:
+    """Calculates a checksum of the consumption in a list of intervals."""
+    digest = sha256()
+    for interval in intervals:
+        digest.update(
+            f"{interval.interval_start.timestamp()}|{interval.interval_end.timestamp()}|"
+            f"{interval.consumed_units}\n".encode()
+        )
+    return digest.hexdigest()
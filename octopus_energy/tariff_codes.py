@@ -0,0 +1,114 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set
+
+from .models import EnergyType, Meter, TariffCode
+
+_TARIFF_CODE = re.compile(r"^(?P<fuel>[EG])-(?P<registers>\d+)R-(?P<product>.+)-(?P<region>[A-P])$")
+_ENERGY_TYPES = {"E": EnergyType.ELECTRICITY, "G": EnergyType.GAS}
+
+
+@lru_cache(maxsize=4096)
+def parse_tariff_code(code: str) -> TariffCode:
+    """Splits a tariff code into its fuel, number of registers, product code and region.
+
+    Args:
+        code: The tariff code, such as E-1R-AGILE-18-02-21-C.
+
+    Returns:
+        The parts of the tariff code.
+
+    Raises:
+        ValueError: If the tariff code is not in the expected format.
+    """
+    match = _TARIFF_CODE.match(code)
+    if match is None:
+        raise ValueError(f"Invalid tariff code {code}")
+    return TariffCode(
+        code,
+        _ENERGY_TYPES[match["fuel"]],
+        int(match["registers"]),
+        match["product"],
+        match["region"],
+    )
+
+
+class TariffIndex:
+    """An index of tariff codes by product code and by region.
+
+    This allows the product code of a tariff to be found without calling the API, and all the
+    tariffs for a product or a region to be found quickly.
+    """
+
+    def __init__(self, tariff_codes: Iterable[str] = ()):
+        """Initializes the index.
+
+        Args:
+            tariff_codes: (Optional) The tariff codes to add to the index.
+        """
+        self._tariffs: Dict[str, TariffCode] = {}
+        self._by_product: Dict[str, Set[str]] = {}
+        self._by_region: Dict[str, Set[str]] = {}
+        for code in tariff_codes:
+            self.add(code)
+
+    @classmethod
+    def from_meters(cls, meters: Iterable[Meter]) -> "TariffIndex":
+        """Creates an index of every tariff that has ever applied to a list of meters."""
+        return cls(tariff.code for meter in meters for tariff in meter.tariffs)
+
+    def __len__(self) -> int:
+        return len(self._tariffs)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._tariffs
+
+    def add(self, code: str) -> TariffCode:
+        """Adds a tariff code to the index.
+
+        Raises:
+            ValueError: If the tariff code is not in the expected format.
+        """
+        tariff = self._tariffs.get(code)
+        if tariff is None:
+            tariff = parse_tariff_code(code)
+            self._tariffs[code] = tariff
+            self._by_product.setdefault(tariff.product_code, set()).add(code)
+            self._by_region.setdefault(tariff.region, set()).add(code)
+        return tariff
+
+    def get(self, code: str) -> Optional[TariffCode]:
+        """Gets a tariff from the index by its code, or None if it has not been added."""
+        return self._tariffs.get(code)
+
+    def by_product(self, product_code: str) -> List[TariffCode]:
+        """Gets every tariff in the index for a product, sorted by tariff code."""
+        return [self._tariffs[c] for c in sorted(self._by_product.get(product_code, ()))]
+
+    def by_region(self, region: str) -> List[TariffCode]:
+        """Gets every tariff in the index for a region, such as "C", sorted by tariff code."""
+        return [self._tariffs[c] for c in sorted(self._by_region.get(region.lstrip("_"), ()))]
+
+
+def group_meters_by_tariff(
+    meters: Iterable[Meter], timestamp: datetime
+) -> Dict[TariffCode, List[Meter]]:
+    """Groups meters by the tariff in effect on them at a point in time.
+
+    Rates only need to be requested once for each group, instead of once for each meter.
+
+    Args:
+        meters: The meters to group.
+        timestamp: The point in time to find the tariff in effect at.
+
+    Returns:
+        The meters keyed by the tariff in effect. Meters with no tariff in effect at the
+        timestamp are not included.
+    """
+    groups: Dict[TariffCode, List[Meter]] = {}
+    for meter in meters:
+        tariff = meter.get_tariff_at(timestamp)
+        if tariff is not None:
+            groups.setdefault(parse_tariff_code(tariff.code), []).append(meter)
+    return groups
@@ -0,0 +1,219 @@
+from asyncio import (
+    CancelledError,
+    create_task,
+    Event,
+    gather,
+    get_running_loop,
+    Queue,
+    Task,
+    TimeoutError,
+    wait_for,
+)
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from heapq import heappop, heappush
+from itertools import count
+from typing import AsyncIterator, Dict, List, Optional
+
+from .client import OctopusEnergyConsumerClient
+from .models import Consumption, Meter
+from .sync import meter_key
+
+_DEFAULT_MIN_INTERVAL = timedelta(minutes=1)
+_DEFAULT_MAX_INTERVAL = timedelta(hours=6)
+_DEFAULT_REVISION_WINDOW = timedelta(days=1)
+_STOPPED = None
+
+
+class _WatchedMeter:
+    """The polling state of a single meter, shared by everything watching it."""
+
+    def __init__(self, meter: Meter, period_from: datetime, interval: float):
+        self.meter = meter
+        self.subscribers: List[Queue] = []
+        self.known: Dict[datetime, Decimal] = {}
+        self.period_from = period_from
+        self.interval = interval
+        self.due = 0.0
+
+
+class ConsumptionWatcher:
+    """Streams new and revised consumption for many meters as it is published.
+
+    Every watched meter is polled by a single scheduler and a fixed pool of workers, so watching
+    thousands of meters does not need thousands of sleeping tasks. Each poll requests the
+    consumption from a little before the last interval seen, so revisions to recent intervals
+    are noticed, and only intervals that are new or whose consumption has changed are yielded.
+
+    The polling interval adapts to each meter. It halves whenever a poll finds new consumption
+    and doubles whenever a poll finds nothing new or fails, within the minimum and maximum
+    interval.
+
+    The watcher can operate either as an async context manager, or as a regular object. If you
+    use the latter call stop once you are finished watching.
+    """
+
+    def __init__(
+        self,
+        client: OctopusEnergyConsumerClient,
+        concurrency: int = 8,
+        min_interval: timedelta = _DEFAULT_MIN_INTERVAL,
+        max_interval: timedelta = _DEFAULT_MAX_INTERVAL,
+        revision_window: timedelta = _DEFAULT_REVISION_WINDOW,
+    ):
+        """Initializes the watcher.
+
+        Args:
+            client: The consumer client used to get consumption.
+            concurrency: (Optional) How many meters to poll at once.
+            min_interval: (Optional) The shortest time between polls of a meter.
+            max_interval: (Optional) The longest time between polls of a meter. This is also
+                          the interval meters start with.
+            revision_window: (Optional) How far before the last interval seen to request
+                             consumption from, to pick up revisions.
+        """
+        self.client = client
+        self.concurrency = concurrency
+        self.min_interval = min_interval.total_seconds()
+        self.max_interval = max_interval.total_seconds()
+        self.revision_window = revision_window
+        self._meters: Dict[str, _WatchedMeter] = {}
+        self._schedule: list = []
+        self._sequence = count()
+        self._due: Optional[Queue] = None
+        self._wakeup: Optional[Event] = None
+        self._tasks: List[Task] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    async def watch(self, meter: Meter, period_from: datetime = None) -> AsyncIterator[Consumption]:
+        """Streams the new and revised consumption of a meter.
+
+        Watching a meter that is already being watched shares its polling, and starts with the
+        next consumption found rather than with the consumption from period_from.
+
+        Args:
+            meter: The meter to watch.
+            period_from: (Optional) The timestamp to start watching consumption from. Defaults to
+                         the revision window before now.
+
+        Returns:
+            An async iterator of consumption, each holding the intervals that a poll found to be
+            new or revised, in ascending timestamp order. The iterator only ends once the watcher
+            is stopped.
+        """
+        self._start()
+        key = meter_key(meter)
+        state = self._meters.get(key)
+        if state is None:
+            state = _WatchedMeter(
+                meter,
+                period_from if period_from is not None else self._now() - self.revision_window,
+                self.max_interval,
+            )
+            self._meters[key] = state
+            self._reschedule(state, 0)
+        queue = Queue()
+        state.subscribers.append(queue)
+        try:
+            while True:
+                consumption = await queue.get()
+                if consumption is _STOPPED:
+                    return
+                yield consumption
+        finally:
+            state.subscribers.remove(queue)
+            if not state.subscribers and self._meters.get(key) is state:
+                del self._meters[key]
+
+    async def stop(self):
+        """Stops polling every meter, ending every stream of consumption."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await gather(*tasks, return_exceptions=True)
+        for state in self._meters.values():
+            for queue in state.subscribers:
+                queue.put_nowait(_STOPPED)
+        self._meters, self._schedule = {}, []
+
+    def _start(self):
+        if self._tasks:
+            return
+        self._due = Queue()
+        self._wakeup = Event()
+        self._tasks = [create_task(self._run_schedule())] + [
+            create_task(self._run_worker()) for _ in range(self.concurrency)
+        ]
+
+    def _reschedule(self, state: _WatchedMeter, delay: float):
+        state.due = get_running_loop().time() + delay
+        heappush(self._schedule, (state.due, next(self._sequence), state))
+        self._wakeup.set()
+
+    async def _run_schedule(self):
+        loop = get_running_loop()
+        while True:
+            now = loop.time()
+            while self._schedule and self._schedule[0][0] <= now:
+                due, _, state = heappop(self._schedule)
+                # Meters that are no longer watched are dropped as they fall due.
+                if state.subscribers and due == state.due:
+                    self._due.put_nowait(state)
+            self._wakeup.clear()
+            timeout = self._schedule[0][0] - now if self._schedule else None
+            try:
+                await wait_for(self._wakeup.wait(), timeout)
+            except TimeoutError:
+                pass
+
+    async def _run_worker(self):
+        while True:
+            state = await self._due.get()
+            try:
+                found = await self._poll(state)
+            except CancelledError:
+                raise
+            except Exception:
+                # Any failed poll, whatever the cause, backs off and is retried later, so the
+                # meter's watchers are never left waiting on a meter that is no longer polled.
+                found = False
+            factor = 0.5 if found else 2
+            state.interval = min(max(state.interval * factor, self.min_interval), self.max_interval)
+            if state.subscribers:
+                self._reschedule(state, state.interval)
+
+    async def _poll(self, state: _WatchedMeter) -> bool:
+        """Polls a meter, passing any new or revised consumption to its subscribers.
+
+        Returns:
+            True if any new or revised consumption was found.
+        """
+        changed = []
+        unit_type = None
+        async for page in self.client.iter_consumption_pages(state.meter, state.period_from):
+            unit_type = page.unit_type
+            for interval in page.intervals:
+                if state.known.get(interval.interval_start) != interval.consumed_units:
+                    state.known[interval.interval_start] = interval.consumed_units
+                    changed.append(interval)
+        if not changed:
+            return False
+
+        latest = max(state.known)
+        state.period_from = max(state.period_from, latest - self.revision_window)
+        state.known = {
+            start: units for start, units in state.known.items() if start >= state.period_from
+        }
+        consumption = Consumption(unit_type, state.meter, changed)
+        for queue in state.subscribers:
+            queue.put_nowait(consumption)
+        return True
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(tz=timezone.utc)
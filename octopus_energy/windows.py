@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from .models import PriceWindow, TariffRate, WindowRequest
+
+_SLOT = timedelta(minutes=30)
+_ZERO = Decimal(0)
+
+
+class _RateSeries:
+    """A rate series expanded into half hour slots, with prefix sums for constant time totals."""
+
+    def __init__(self, rates: List[TariffRate]):
+        self.starts: List[datetime] = []
+        self.inc_vat: List[Decimal] = []
+        self.exc_vat: List[Decimal] = []
+        for rate in sorted(rates, key=lambda r: r.valid_from):
+            # Open ended rates have no end to search within, so they cannot hold a window.
+            if rate.valid_to is None:
+                continue
+            slot = rate.valid_from.astimezone(timezone.utc)
+            valid_to = rate.valid_to.astimezone(timezone.utc)
+            # Where rates overlap, the earlier rate keeps the slots they share, and the later
+            # rate fills the slots after them.
+            if self.starts:
+                slot = max(slot, self.starts[-1] + _SLOT)
+            while slot < valid_to:
+                self.starts.append(slot)
+                self.inc_vat.append(rate.cost_inc_vat)
+                self.exc_vat.append(rate.cost_exc_vat)
+                slot += _SLOT
+        self.inc_vat_sums = [_ZERO, *accumulate(self.inc_vat)]
+        self.exc_vat_sums = [_ZERO, *accumulate(self.exc_vat)]
+
+        # For every slot, the index one past the end of the contiguous run of slots it is in.
+        self.run_ends = [0] * len(self.starts)
+        run_end = len(self.starts)
+        for i in reversed(range(len(self.starts))):
+            if i + 1 < len(self.starts) and self.starts[i + 1] != self.starts[i] + _SLOT:
+                run_end = i + 1
+            self.run_ends[i] = run_end
+
+    def cheapest(self, slots: int) -> Optional[PriceWindow]:
+        """Finds the cheapest window of a number of slots consuming one unit per slot in O(n)."""
+        best = None
+        best_cost = None
+        for i in range(len(self.starts) - slots + 1):
+            if i + slots > self.run_ends[i]:
+                continue
+            cost = self.inc_vat_sums[i + slots] - self.inc_vat_sums[i]
+            if best_cost is None or cost < best_cost:
+                best, best_cost = i, cost
+        if best is None:
+            return None
+        return PriceWindow(
+            self.starts[best],
+            self.starts[best] + slots * _SLOT,
+            best_cost,
+            self.exc_vat_sums[best + slots] - self.exc_vat_sums[best],
+        )
+
+    def cheapest_weighted(self, load_profile: Sequence[Decimal]) -> Optional[PriceWindow]:
+        """Finds the cheapest window for a load profile in O(n * len(load_profile))."""
+        slots = len(load_profile)
+        best = None
+        best_cost = None
+        for i in range(len(self.starts) - slots + 1):
+            if i + slots > self.run_ends[i]:
+                continue
+            cost = _weighted_cost(load_profile, self.inc_vat, i)
+            if best_cost is None or cost < best_cost:
+                best, best_cost = i, cost
+        if best is None:
+            return None
+        return PriceWindow(
+            self.starts[best],
+            self.starts[best] + slots * _SLOT,
+            best_cost,
+            _weighted_cost(load_profile, self.exc_vat, best),
+        )
+
+
+def _weighted_cost(load_profile: Sequence[Decimal], prices: List[Decimal], start: int) -> Decimal:
+    return sum((units * prices[start + i] for i, units in enumerate(load_profile)), _ZERO)
+
+
+def _slot_count(request: WindowRequest) -> int:
+    slots, remainder = divmod(request.duration, _SLOT)
+    if remainder or slots < 1:
+        raise ValueError("Window duration must be a positive multiple of 30 minutes")
+    if request.load_profile is not None and len(request.load_profile) != slots:
+        raise ValueError("Load profile must have one entry for each half hour of the window")
+    return slots
+
+
+def cheapest_window(
+    rates: List[TariffRate], duration: timedelta, load_profile: Sequence[Decimal] = None
+) -> Optional[PriceWindow]:
+    """Finds the cheapest contiguous block of time of a specific duration within a rate series.
+
+    Windows never span a gap in the rates, and rates with no end are ignored. If more than one
+    window has the same cost the earliest one is returned.
+
+    Args:
+        rates: The rates to search, such as those returned by get_daily_flexible_rate_pricing.
+        duration: The length of the window, which must be a multiple of 30 minutes.
+        load_profile: (Optional) The units consumed in each half hour of the window. Defaults to
+                      one unit in each half hour.
+
+    Returns:
+        The cheapest window, or None if the rates do not contain a window long enough.
+    """
+    return cheapest_windows(rates, [WindowRequest(duration, load_profile)])[0]
+
+
+def cheapest_windows(
+    rates: List[TariffRate], requests: Iterable[WindowRequest]
+) -> List[Optional[PriceWindow]]:
+    """Finds the cheapest window for many requests against the same rate series in one pass.
+
+    The rate series is prepared once and shared by every request. Requests without a load profile
+    that share a duration are only solved once.
+
+    Args:
+        rates: The rates to search, such as those returned by get_daily_flexible_rate_pricing.
+        requests: The windows to find.
+
+    Returns:
+        The cheapest window for each request, in the same order as the requests. An entry is None
+        if the rates do not contain a window long enough for the request.
+    """
+    series = _RateSeries(rates)
+    uniform: Dict[int, Optional[PriceWindow]] = {}
+    windows = []
+    for request in requests:
+        slots = _slot_count(request)
+        if request.load_profile is not None:
+            windows.append(series.cheapest_weighted(request.load_profile))
+            continue
+        if slots not in uniform:
+            uniform[slots] = series.cheapest(slots)
+        windows.append(uniform[slots])
+    return windows
@@ -1,9 +1,23 @@
 import json
 import os
 from asyncio import get_event_loop
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest.mock import Mock
 
 import jsonpickle
 
+from octopus_energy import (
+    Consumption,
+    EnergyType,
+    IntervalConsumption,
+    MeterGeneration,
+    PageReference,
+    UnitType,
+)
+
+START = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
 
 def load_json(filename: str) -> str:
     """Load a fixture for a test from the fixtures directory.
@@ -38,3 +52,34 @@ def does_asyncio(func):
         get_event_loop().run_until_complete(func(*args, **kwargs))
 
     return wrapper
+
+
+def mock_meter(mpan: str) -> Mock:
+    """Mock a SMETS2 electricity meter with the given MPAN and serial number "sn"."""
+    meter = Mock()
+    meter.energy_type = EnergyType.ELECTRICITY
+    meter.generation = MeterGeneration.SMETS2_ELECTRICITY
+    meter.meter_point.id = mpan
+    meter.serial_number = "sn"
+    return meter
+
+
+def half_hour_interval(index: int, units: str = "1") -> IntervalConsumption:
+    """Create the consumption for the half hour a number of half hours after START."""
+    return IntervalConsumption(
+        START + timedelta(minutes=30 * index),
+        START + timedelta(minutes=30 * (index + 1)),
+        Decimal(units),
+    )
+
+
+def half_hourly_consumption(
+    meter, first: int, count: int, units: str = "1", next_page: PageReference = None
+) -> Consumption:
+    """Create a page of consumption for consecutive half hours, starting from the first index."""
+    return Consumption(
+        UnitType.KWH,
+        meter,
+        [half_hour_interval(i, units) for i in range(first, first + count)],
+        next_page=next_page,
+    )
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import TestCase
+from unittest.mock import Mock
+
+from octopus_energy import (
+    aggregate_consumption,
+    aggregate_consumption_levels,
+    Aggregate,
+    Consumption,
+    IntervalConsumption,
+    UnitType,
+)
+from octopus_energy.periods import UK_TIMEZONE
+
+
+def _half_hourly(start: datetime, end: datetime) -> Consumption:
+    start = start.astimezone(timezone.utc)
+    end = end.astimezone(timezone.utc)
+    count = int((end - start) / timedelta(minutes=30))
+    return Consumption(
+        UnitType.KWH,
+        Mock(),
+        [
+            IntervalConsumption(
+                start + timedelta(minutes=30 * i),
+                start + timedelta(minutes=30 * (i + 1)),
+                Decimal(1),
+            )
+            for i in range(count)
+        ],
+    )
+
+
+class AggregationTests(TestCase):
+    def test_clocks_going_back(self):
+        # The clocks go back on the 31st of October 2021, making the day 25 hours long.
+        consumption = _half_hourly(
+            datetime(2021, 10, 31, tzinfo=UK_TIMEZONE), datetime(2021, 11, 2, tzinfo=UK_TIMEZONE)
+        )
+        levels = aggregate_consumption_levels(consumption, [Aggregate.HOUR, Aggregate.DAY])
+        with self.subTest("days"):
+            days = levels[Aggregate.DAY].intervals
+            self.assertEqual([d.consumed_units for d in days], [50, 48])
+            self.assertEqual(days[0].interval_start, datetime(2021, 10, 31, tzinfo=UK_TIMEZONE))
+            self.assertEqual(days[1].interval_start, datetime(2021, 11, 1, tzinfo=UK_TIMEZONE))
+        with self.subTest("hours"):
+            hours = levels[Aggregate.HOUR].intervals
+            self.assertEqual(len(hours), 49)
+            self.assertTrue(all(h.consumed_units == 2 for h in hours))
+            self.assertEqual(
+                hours[2].interval_start, datetime(2021, 10, 31, 1, tzinfo=timezone.utc)
+            )
+        with self.subTest("keeps unit type and meter"):
+            self.assertEqual(levels[Aggregate.DAY].unit_type, UnitType.KWH)
+            self.assertIs(levels[Aggregate.DAY].meter, consumption.meter)
+
+    def test_clocks_going_forward(self):
+        consumption = _half_hourly(
+            datetime(2021, 3, 28, tzinfo=UK_TIMEZONE), datetime(2021, 3, 29, tzinfo=UK_TIMEZONE)
+        )
+        days = aggregate_consumption(consumption, Aggregate.DAY).intervals
+        self.assertEqual([d.consumed_units for d in days], [46])
+
+    def test_calendar_periods(self):
+        consumption = _half_hourly(
+            datetime(2021, 3, 30, tzinfo=UK_TIMEZONE), datetime(2021, 4, 2, tzinfo=UK_TIMEZONE)
+        )
+        for aggregate, expected in [
+            (Aggregate.WEEK, [(datetime(2021, 3, 29, tzinfo=UK_TIMEZONE), 144)]),
+            (
+                Aggregate.MONTH,
+                [
+                    (datetime(2021, 3, 1, tzinfo=UK_TIMEZONE), 96),
+                    (datetime(2021, 4, 1, tzinfo=UK_TIMEZONE), 48),
+                ],
+            ),
+            (
+                Aggregate.QUARTER,
+                [
+                    (datetime(2021, 1, 1, tzinfo=UK_TIMEZONE), 96),
+                    (datetime(2021, 4, 1, tzinfo=UK_TIMEZONE), 48),
+                ],
+            ),
+        ]:
+            with self.subTest(aggregate.name):
+                intervals = aggregate_consumption(consumption, aggregate).intervals
+                self.assertEqual(
+                    [(i.interval_start, i.consumed_units) for i in intervals], expected
+                )
+
+    def test_half_hourly(self):
+        consumption = _half_hourly(
+            datetime(2021, 1, 1, tzinfo=timezone.utc), datetime(2021, 1, 2, tzinfo=timezone.utc)
+        )
+        self.assertEqual(
+            aggregate_consumption(consumption, Aggregate.HALF_HOURLY).intervals,
+            consumption.intervals,
+        )
+
+    def test_no_consumption(self):
+        self.assertEqual(
+            aggregate_consumption(Consumption(UnitType.KWH, Mock()), Aggregate.DAY).intervals, []
+        )
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import TestCase
+from unittest.mock import Mock
+
+from octopus_energy import (
+    backfill_consumption,
+    Consumption,
+    find_gaps,
+    IntervalConsumption,
+    plan_backfill,
+    UnitType,
+)
+from tests import does_asyncio
+
+_START = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+
+def _half_hours(*indexes) -> list:
+    return [_START + timedelta(minutes=30 * i) for i in indexes]
+
+
+class FindGapsTests(TestCase):
+    def test_find_gaps(self):
+        end = _START + timedelta(hours=5)
+        for description, held, expected in [
+            ("nothing held", [], [(_START, end)]),
+            ("everything held", _half_hours(*range(10)), []),
+            (
+                "gaps at the start, middle and end",
+                _half_hours(2, 3, 5, 6, 7),
+                [
+                    (_half_hours(0)[0], _half_hours(2)[0]),
+                    (_half_hours(4)[0], _half_hours(5)[0]),
+                    (_half_hours(8)[0], end),
+                ],
+            ),
+            ("ignores intervals outside the period", _half_hours(-1, *range(10), 10), []),
+        ]:
+            with self.subTest(description):
+                self.assertEqual(find_gaps(held, _START, end), expected)
+
+    def test_rounds_period_to_half_hours(self):
+        self.assertEqual(
+            find_gaps([], _START + timedelta(minutes=10), _START + timedelta(minutes=40)),
+            [(_START, _START + timedelta(hours=1))],
+        )
+
+
+class PlanBackfillTests(TestCase):
+    def test_plan_backfill(self):
+        gaps = [
+            (_half_hours(0)[0], _half_hours(2)[0]),
+            (_half_hours(4)[0], _half_hours(5)[0]),
+            (_half_hours(100)[0], _half_hours(101)[0]),
+        ]
+        with self.subTest("merges nearby gaps"):
+            self.assertEqual(
+                plan_backfill(gaps),
+                [(_half_hours(0)[0], _half_hours(5)[0]), gaps[2]],
+            )
+        with self.subTest("no merging"):
+            self.assertEqual(plan_backfill(gaps, max_extra_intervals=0), gaps)
+        with self.subTest("does not merge if more pages are needed"):
+            self.assertEqual(plan_backfill(gaps[:2], page_size=2), gaps[:2])
+        with self.subTest("no gaps"):
+            self.assertEqual(plan_backfill([]), [])
+
+
+class BackfillConsumptionTests(TestCase):
+    @does_asyncio
+    async def test_backfill_consumption(self):
+        meter = Mock()
+        requests = []
+
+        async def iter_consumption_pages(meter, period_from, period_to, page_size):
+            requests.append((period_from, period_to, page_size))
+            slots = int((period_to - period_from) / timedelta(minutes=30))
+            yield Consumption(
+                UnitType.KWH,
+                meter,
+                [
+                    IntervalConsumption(
+                        period_from + timedelta(minutes=30 * i),
+                        period_from + timedelta(minutes=30 * (i + 1)),
+                        Decimal(1),
+                    )
+                    for i in range(slots)
+                ],
+            )
+
+        client = Mock()
+        client.iter_consumption_pages = iter_consumption_pages
+        intervals = await backfill_consumption(
+            client, meter, _half_hours(2, 3), _START, _START + timedelta(hours=3), page_size=10
+        )
+        with self.subTest("requests the merged plan"):
+            self.assertEqual(requests, [(_START, _START + timedelta(hours=3), 10)])
+        with self.subTest("only returns missing intervals"):
+            self.assertEqual([i.interval_start for i in intervals], _half_hours(0, 1, 4, 5))
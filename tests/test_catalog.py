@@ -0,0 +1,189 @@
+from asyncio import create_task, Event, gather, sleep
+from datetime import datetime, timezone
+from unittest import TestCase
+from unittest.mock import AsyncMock, Mock
+
+from octopus_energy import ProductCatalog
+from tests import does_asyncio
+
+
+def _product(code: str, **flags) -> dict:
+    product = {
+        "code": code,
+        "full_name": code,
+        "display_name": code,
+        "description": code,
+        "is_variable": False,
+        "is_green": False,
+        "is_tracker": False,
+        "is_prepay": False,
+        "is_business": False,
+        "is_restricted": False,
+        "term": None,
+        "available_from": "2021-01-01T00:00:00Z",
+        "available_to": None,
+    }
+    product.update(flags)
+    return product
+
+
+def _mock_rest_client(*pages) -> Mock:
+    count = sum(len(page) for page in pages)
+
+    async def get_products_v1(page, page_size, available_at):
+        return {
+            "count": count,
+            "next": "next" if page < len(pages) else None,
+            "results": pages[page - 1],
+        }
+
+    rest_client = Mock()
+    rest_client.get_products_v1 = AsyncMock(side_effect=get_products_v1)
+    return rest_client
+
+
+class ProductCatalogTests(TestCase):
+    @does_asyncio
+    async def test_load_and_filter(self):
+        rest_client = _mock_rest_client(
+            [_product("A", is_green=True), _product("B", is_green=True, is_variable=True)],
+            [
+                _product("C", is_variable=True),
+                _product("D", available_to="2021-02-01T00:00:00Z"),
+            ],
+        )
+        catalog = ProductCatalog(rest_client, page_size=2)
+        await catalog.load()
+        with self.subTest("loads every page"):
+            self.assertEqual(rest_client.get_products_v1.call_count, 2)
+            rest_client.get_products_v1.assert_called_with(page=2, page_size=2, available_at=None)
+            self.assertEqual(len(catalog), 4)
+        with self.subTest("get by code"):
+            self.assertEqual(catalog.get("C").code, "C")
+            self.assertIsNone(catalog.get("Z"))
+            self.assertIn("A", catalog)
+        for description, filters, expected in [
+            ("no filters", {}, ["A", "B", "C", "D"]),
+            ("single flag", {"is_green": True}, ["A", "B"]),
+            ("combined flags", {"is_green": True, "is_variable": True}, ["B"]),
+            ("false flag", {"is_variable": False}, ["A", "D"]),
+            ("no matches", {"is_business": True}, []),
+            (
+                "available at",
+                {"available_at": datetime(2021, 3, 1, tzinfo=timezone.utc)},
+                ["A", "B", "C"],
+            ),
+        ]:
+            with self.subTest(description):
+                self.assertEqual([p.code for p in catalog.filter(**filters)], expected)
+        with self.subTest("does not call the API when filtering"):
+            self.assertEqual(rest_client.get_products_v1.call_count, 2)
+
+    @does_asyncio
+    async def test_refresh(self):
+        catalog = ProductCatalog(
+            _mock_rest_client([_product("B"), _product("C")], [_product("D")]), page_size=2
+        )
+        with self.subTest("loads an empty catalog"):
+            self.assertEqual(await catalog.refresh(), {"B", "C", "D"})
+
+        with self.subTest("only fetches pages with changes"):
+            # The second page has no changes, so no later pages are requested.
+            catalog.rest_client = Mock()
+            catalog.rest_client.get_products_v1 = AsyncMock(
+                side_effect=[
+                    {
+                        "count": 4,
+                        "next": "next",
+                        "results": [_product("A"), _product("B", is_green=True)],
+                    },
+                    {"count": 4, "next": "next", "results": [_product("C"), _product("D")]},
+                ]
+            )
+            self.assertEqual(await catalog.refresh(), {"A", "B"})
+            self.assertEqual(catalog.rest_client.get_products_v1.call_count, 2)
+            self.assertEqual([p.code for p in catalog], ["A", "B", "C", "D"])
+            self.assertEqual([p.code for p in catalog.filter(is_green=True)], ["B"])
+
+        with self.subTest("reloads when products are withdrawn"):
+            catalog.rest_client = _mock_rest_client([_product("A"), _product("B", is_green=True)])
+            self.assertEqual(await catalog.refresh(), {"C", "D"})
+            self.assertEqual(len(catalog), 2)
+
+    @does_asyncio
+    async def test_hydrate(self):
+        running = 0
+        max_running = 0
+
+        async def get_product_v1(code, tariffs_active_at):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await sleep(0)
+            running -= 1
+            if code == "BAD":
+                raise ValueError(code)
+            return {"code": code, "tariffs_active_at": tariffs_active_at}
+
+        rest_client = _mock_rest_client([_product("A"), _product("B"), _product("C")])
+        rest_client.get_product_v1 = AsyncMock(side_effect=get_product_v1)
+        catalog = ProductCatalog(rest_client, concurrency=2)
+        await catalog.load()
+        at = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+        snapshot = await catalog.hydrate(tariffs_active_at=at)
+        with self.subTest("defaults to every product in the catalog"):
+            self.assertEqual(list(snapshot.products), ["A", "B", "C"])
+            self.assertEqual(snapshot.tariffs_active_at, at)
+            self.assertEqual(snapshot.products["A"], {"code": "A", "tariffs_active_at": at})
+        with self.subTest("bounds concurrency"):
+            self.assertEqual(max_running, 2)
+
+        rest_client.get_product_v1.reset_mock()
+        with self.subTest("uses the snapshot and deduplicates codes"):
+            snapshot = await catalog.hydrate(["B", "B", "D"], at)
+            rest_client.get_product_v1.assert_called_once_with("D", at)
+            self.assertEqual(list(snapshot.products), ["B", "D"])
+
+        rest_client.get_product_v1.reset_mock()
+        with self.subTest("concurrent calls share requests"):
+            await gather(catalog.hydrate(["E"]), catalog.hydrate(["E"]))
+            rest_client.get_product_v1.assert_called_once_with("E", None)
+
+        rest_client.get_product_v1.reset_mock()
+        with self.subTest("clearing snapshots requests details again"):
+            catalog.clear_snapshots()
+            await catalog.hydrate(["A"], at)
+            rest_client.get_product_v1.assert_called_once_with("A", at)
+
+        rest_client.get_product_v1.reset_mock()
+        with self.subTest("keeps the details that were fetched when another fails"):
+            catalog.clear_snapshots()
+            with self.assertRaises(ValueError):
+                await catalog.hydrate(["A", "BAD", "B"], at)
+            rest_client.get_product_v1.reset_mock()
+            snapshot = await catalog.hydrate(["A", "B"], at)
+            rest_client.get_product_v1.assert_not_called()
+            self.assertEqual(list(snapshot.products), ["A", "B"])
+
+    @does_asyncio
+    async def test_cancelling_one_caller_does_not_cancel_others(self):
+        released = Event()
+
+        async def get_product_v1(code, tariffs_active_at):
+            await released.wait()
+            return {"code": code}
+
+        rest_client = _mock_rest_client([_product("X")])
+        rest_client.get_product_v1 = AsyncMock(side_effect=get_product_v1)
+        catalog = ProductCatalog(rest_client)
+        first = create_task(catalog.hydrate(["X"]))
+        second = create_task(catalog.hydrate(["X"]))
+        await sleep(0)
+        first.cancel()
+        await sleep(0)
+        released.set()
+        snapshot = await second
+        self.assertTrue(first.cancelled())
+        self.assertEqual(snapshot.products, {"X": {"code": "X"}})
+        rest_client.get_product_v1.assert_called_once()
@@ -0,0 +1,124 @@
+from asyncio import create_task, Event, sleep
+from datetime import timedelta
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from aiohttp import ClientConnectionError
+
+from octopus_energy import (
+    ApiError,
+    ApiNotFoundError,
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+)
+from tests import does_asyncio
+
+_ENDPOINT = "v1/products/{product_code}"
+
+
+def _api_error(status: int) -> ApiError:
+    response = Mock()
+    response.status = status
+    return ApiError(response)
+
+
+def _request(result):
+    async def request():
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return request
+
+
+class CircuitBreakerTests(TestCase):
+    @does_asyncio
+    @patch("octopus_energy.circuit_breaker.monotonic")
+    async def test_circuit_opens_and_recovers(self, mock_monotonic: Mock):
+        mock_monotonic.return_value = 100
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=timedelta(seconds=30))
+
+        with self.subTest("closed until the threshold is reached"):
+            with self.assertRaises(ApiError):
+                await breaker.call(_ENDPOINT, _request(_api_error(503)))
+            self.assertEqual(breaker.state(_ENDPOINT), CircuitState.CLOSED)
+            with self.assertRaises(ClientConnectionError):
+                await breaker.call(_ENDPOINT, _request(ClientConnectionError()))
+            self.assertEqual(breaker.state(_ENDPOINT), CircuitState.OPEN)
+            self.assertTrue(breaker.any_open)
+
+        with self.subTest("open circuits fail fast"):
+            request = Mock(side_effect=_request("response"))
+            mock_monotonic.return_value = 110
+            with self.assertRaises(CircuitOpenError) as context:
+                await breaker.call(_ENDPOINT, request)
+            request.assert_not_called()
+            self.assertEqual(context.exception.retry_after, 20)
+
+        with self.subTest("other endpoints are unaffected"):
+            self.assertEqual(await breaker.call("v1/products", _request("products")), "products")
+
+        with self.subTest("half open after the reset timeout"):
+            mock_monotonic.return_value = 130
+            self.assertEqual(breaker.state(_ENDPOINT), CircuitState.HALF_OPEN)
+
+        with self.subTest("a failed trial opens the circuit again"):
+            with self.assertRaises(ApiError):
+                await breaker.call(_ENDPOINT, _request(_api_error(500)))
+            self.assertEqual(breaker.state(_ENDPOINT), CircuitState.OPEN)
+
+        with self.subTest("a successful trial closes the circuit"):
+            mock_monotonic.return_value = 160
+            self.assertEqual(await breaker.call(_ENDPOINT, _request("response")), "response")
+            self.assertEqual(
+                breaker.states(),
+                {_ENDPOINT: CircuitState.CLOSED, "v1/products": CircuitState.CLOSED},
+            )
+            self.assertFalse(breaker.any_open)
+
+    @does_asyncio
+    async def test_client_errors_are_not_failures(self):
+        breaker = CircuitBreaker(failure_threshold=1)
+        for error in [ApiNotFoundError(), _api_error(403)]:
+            with self.subTest(error=error):
+                with self.assertRaises(type(error)):
+                    await breaker.call(_ENDPOINT, _request(error))
+                self.assertEqual(breaker.state(_ENDPOINT), CircuitState.CLOSED)
+
+    @does_asyncio
+    @patch("octopus_energy.circuit_breaker.monotonic")
+    async def test_half_open_limits_trial_requests(self, mock_monotonic: Mock):
+        mock_monotonic.return_value = 100
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=timedelta(seconds=1))
+        with self.assertRaises(ApiError):
+            await breaker.call(_ENDPOINT, _request(_api_error(429)))
+        mock_monotonic.return_value = 200
+
+        answer = Event()
+
+        async def slow_request():
+            await answer.wait()
+            return "response"
+
+        trial = create_task(breaker.call(_ENDPOINT, slow_request))
+        await sleep(0)
+        with self.assertRaises(CircuitOpenError):
+            await breaker.call(_ENDPOINT, _request("response"))
+        answer.set()
+        self.assertEqual(await trial, "response")
+        self.assertEqual(breaker.state(_ENDPOINT), CircuitState.CLOSED)
+
+    @does_asyncio
+    async def test_open_circuits_answer_from_the_cache(self):
+        breaker = CircuitBreaker(failure_threshold=1, cache_size=1)
+        await breaker.call(_ENDPOINT, _request("old"), cache_key="a")
+        await breaker.call(_ENDPOINT, _request("cached"), cache_key="b")
+        with self.assertRaises(ApiError):
+            await breaker.call(_ENDPOINT, _request(_api_error(502)), cache_key="b")
+
+        with self.subTest("cached response"):
+            self.assertEqual(await breaker.call(_ENDPOINT, _request("new"), "b"), "cached")
+        with self.subTest("evicted response"):
+            with self.assertRaises(CircuitOpenError):
+                await breaker.call(_ENDPOINT, _request("new"), "a")
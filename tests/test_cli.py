@@ -0,0 +1,254 @@
+import csv
+import gzip
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from io import StringIO
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import AsyncMock, Mock
+
+from octopus_energy import (
+    Consumption,
+    EnergyTariffType,
+    EnergyType,
+    IntervalConsumption,
+    MeterGeneration,
+    RateType,
+    Tariff,
+    TariffRate,
+    UnitType,
+)
+from octopus_energy.cli import (
+    build_parser,
+    download_consumption,
+    download_tariffs,
+    parse_meter,
+    parse_timestamp,
+)
+from octopus_energy.export import COLUMNS
+from octopus_energy.periods import UK_TIMEZONE
+from tests import does_asyncio
+
+_START = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+
+class ParseTests(TestCase):
+    def test_parse_meter(self):
+        with self.subTest("default generation"):
+            meter = parse_meter("electricity:123:sn")
+            self.assertEqual(meter.meter_point.id, "123")
+            self.assertEqual(meter.serial_number, "sn")
+            self.assertEqual(meter.generation, MeterGeneration.SMETS2_ELECTRICITY)
+        with self.subTest("explicit generation"):
+            meter = parse_meter("gas:456:sn:SMETS1_GAS")
+            self.assertEqual(meter.energy_type, EnergyType.GAS)
+            self.assertEqual(meter.generation, MeterGeneration.SMETS1_GAS)
+        for spec in ["electricity:123", "water:1:2", "gas:1:2:SMETS9"]:
+            with self.subTest(f"invalid meter {spec}"):
+                with self.assertRaises(Exception):
+                    parse_meter(spec)
+
+    def test_parse_timestamp(self):
+        with self.subTest("naive timestamps are uk local time"):
+            self.assertEqual(parse_timestamp("2021-01-01").tzinfo, UK_TIMEZONE)
+        with self.subTest("keeps timezones"):
+            self.assertEqual(parse_timestamp("2021-01-01T00:00:00Z"), _START)
+
+    def test_parser(self):
+        args = build_parser().parse_args(
+            ["consumption", "--meter", "electricity:1:sn", "--from", "2021-01-01", "--output", "o"]
+        )
+        self.assertEqual(args.concurrency, 8)
+        self.assertEqual(args.format, "csv")
+        self.assertEqual(len(args.meter), 1)
+
+
+class DownloadTests(TestCase):
+    @does_asyncio
+    async def test_download_consumption(self):
+        async def get_consumption(meter, *args, **kwargs):
+            return Consumption(
+                UnitType.KWH,
+                meter,
+                [IntervalConsumption(_START, _START + timedelta(minutes=30), Decimal("1.5"))],
+            )
+
+        client = Mock()
+        client.get_consumption = AsyncMock(side_effect=get_consumption)
+        with TemporaryDirectory() as directory:
+            output = path.join(directory, "out.csv")
+            args = build_parser().parse_args(
+                [
+                    "consumption",
+                    "--meter",
+                    "electricity:1:sn",
+                    "--meter",
+                    "gas:2:sn",
+                    "--from",
+                    "2021-01-01",
+                    "--output",
+                    output,
+                    "--checkpoints",
+                    path.join(directory, "checkpoints.db"),
+                ]
+            )
+            out = StringIO()
+            self.assertEqual(await download_consumption(client, args, out), 0)
+            with open(output) as file:
+                rows = list(csv.reader(file))
+
+        self.assertEqual(len(rows), 3)
+        self.assertIn("Downloaded 2 intervals in 2 pages for 2 of 2 meters", out.getvalue())
+        self.assertIn("Request latency p50", out.getvalue())
+
+    @does_asyncio
+    async def test_resume_download_consumption(self):
+        published = 2
+
+        async def get_consumption(meter, period_from, *args, **kwargs):
+            starts = [_START + timedelta(minutes=30 * i) for i in range(published)]
+            return Consumption(
+                UnitType.KWH,
+                meter,
+                [
+                    IntervalConsumption(start, start + timedelta(minutes=30), Decimal("1.5"))
+                    for start in starts
+                    if start >= period_from
+                ],
+            )
+
+        client = Mock()
+        client.get_consumption = AsyncMock(side_effect=get_consumption)
+        with TemporaryDirectory() as directory:
+            for format, compression in [("csv", None), ("ndjson", "gzip")]:
+                with self.subTest(format=format, compression=compression):
+                    output = path.join(directory, f"out.{format}.{compression}")
+                    argv = [
+                        "consumption",
+                        "--meter",
+                        "electricity:1:sn",
+                        "--meter",
+                        "gas:2:sn",
+                        "--from",
+                        "2021-01-01T00:00:00Z",
+                        "--output",
+                        output,
+                        "--format",
+                        format,
+                        "--checkpoints",
+                        path.join(directory, f"{format}.db"),
+                    ] + (["--compression", compression] if compression else [])
+                    published = 2
+                    args = build_parser().parse_args(argv)
+                    self.assertEqual(await download_consumption(client, args, StringIO()), 0)
+                    published = 3
+                    self.assertEqual(await download_consumption(client, args, StringIO()), 0)
+                    opener = gzip.open if compression == "gzip" else open
+                    with opener(output, "rt") as file:
+                        lines = file.read().splitlines()
+                    if format == "csv":
+                        self.assertEqual(lines[0].split(","), list(COLUMNS))
+                        lines = lines[1:]
+                    self.assertEqual(len(lines), 6)
+                    self.assertEqual(len(set(lines)), 6)
+
+            with self.subTest("drops output written after the last checkpoint"):
+                output = path.join(directory, "partial.csv.gz")
+                argv = [
+                    "consumption",
+                    "--meter",
+                    "electricity:1:sn",
+                    "--from",
+                    "2021-01-01T00:00:00Z",
+                    "--output",
+                    output,
+                    "--compression",
+                    "gzip",
+                    "--checkpoints",
+                    path.join(directory, "partial.db"),
+                ]
+                published = 2
+                args = build_parser().parse_args(argv)
+                self.assertEqual(await download_consumption(client, args, StringIO()), 0)
+                with open(output, "ab") as file:
+                    file.write(gzip.compress(b"partly written page")[:10])
+                published = 3
+                self.assertEqual(await download_consumption(client, args, StringIO()), 0)
+                with gzip.open(output, "rt") as file:
+                    self.assertEqual(len(file.read().splitlines()), 4)
+
+            with self.subTest("cannot resume without the output"):
+                checkpoints = path.join(directory, "missing.db")
+                open(checkpoints, "wb").close()
+                args = build_parser().parse_args(
+                    ["consumption", "--meter", "electricity:1:sn", "--from", "2021-01-01"]
+                    + ["--output", path.join(directory, "missing.csv")]
+                    + ["--checkpoints", checkpoints]
+                )
+                out = StringIO()
+                self.assertEqual(await download_consumption(client, args, out), 2)
+                self.assertIn("Cannot resume", out.getvalue())
+                self.assertFalse(path.exists(path.join(directory, "missing.csv")))
+
+            with self.subTest("parquet cannot be resumed"):
+                output = path.join(directory, "out.parquet")
+                checkpoints = path.join(directory, "parquet.db")
+                for existing in [output, checkpoints]:
+                    open(existing, "wb").close()
+                args = build_parser().parse_args(
+                    ["consumption", "--meter", "electricity:1:sn", "--from", "2021-01-01"]
+                    + ["--output", output, "--format", "parquet", "--checkpoints", checkpoints]
+                )
+                out = StringIO()
+                self.assertEqual(await download_consumption(client, args, out), 2)
+                self.assertIn("Cannot resume", out.getvalue())
+
+    @does_asyncio
+    async def test_download_tariffs(self):
+        day = _START.date()
+        rate = TariffRate(Decimal("2.1"), Decimal("2"), _START, _START + timedelta(days=2))
+        meter = parse_meter("electricity:1:sn")
+        meter.tariffs = [
+            Tariff("E-1R-OLD-C", _START - timedelta(days=10), _START - timedelta(days=5)),
+            Tariff("E-1R-AGILE-18-02-21-C", _START - timedelta(days=5), None),
+        ]
+        client = Mock()
+        client.get_meters = AsyncMock(return_value=[meter])
+        client.get_flexible_rate_pricing_range = AsyncMock(
+            return_value={day: [rate], day + timedelta(days=1): [rate]}
+        )
+        with TemporaryDirectory() as directory:
+            output = path.join(directory, "out.csv")
+            args = build_parser().parse_args(
+                [
+                    "tariffs",
+                    "--account",
+                    "A-1",
+                    "--tariff",
+                    "G-1R-VAR-21-C",
+                    "--from",
+                    "2021-01-01",
+                    "--to",
+                    "2021-01-03",
+                    "--output",
+                    output,
+                ]
+            )
+            out = StringIO()
+            self.assertEqual(await download_tariffs(client, args, out), 0)
+            with open(output) as file:
+                rows = list(csv.reader(file))
+
+        with self.subTest("downloads tariffs in effect and requested"):
+            self.assertEqual([r[0] for r in rows[1:]], ["G-1R-VAR-21-C", "E-1R-AGILE-18-02-21-C"])
+            client.get_flexible_rate_pricing_range.assert_any_call(
+                "AGILE-18-02-21",
+                "E-1R-AGILE-18-02-21-C",
+                EnergyTariffType.ELECTRICITY,
+                RateType.STANDARD_UNIT_RATES,
+                day,
+                day + timedelta(days=2),
+            )
+        with self.subTest("prints statistics"):
+            self.assertIn("Downloaded 2 rates for 2 tariffs", out.getvalue())
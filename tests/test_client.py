@@ -1,4 +1,6 @@
-from datetime import datetime, timedelta
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
 from unittest import TestCase
 from unittest.mock import patch, Mock
 
@@ -11,7 +13,10 @@ from octopus_energy import (
     Aggregate,
     EnergyTariffType,
     RateType,
+    MeterGeneration,
 )
+from octopus_energy.mappers import to_timestamp_str
+from octopus_energy.periods import local_day_start
 from tests import does_asyncio
 
 
@@ -27,7 +32,21 @@ class ClientTestCase(TestCase):
         api_token = "A_BVC"
         async with OctopusEnergyConsumerClient(api_token):
             with self.subTest("passes api token to rest client"):
-                mock_rest_client.assert_called_once_with(api_token)
+                mock_rest_client.assert_called_once_with(
+                    api_token,
+                    executor=None,
+                    rate_limiter=None,
+                    hedge_policy=None,
+                    circuit_breaker=None,
+                    scheduler=None,
+                )
+
+    @does_asyncio
+    @patch("octopus_energy.client.OctopusEnergyRestClient", autospec=True)
+    async def test_warmup(self, mock_rest_client: Mock):
+        async with OctopusEnergyConsumerClient("") as client:
+            await client.warmup(4)
+        mock_rest_client.return_value.warmup.assert_called_once_with(4)
 
     @does_asyncio
     @patch("octopus_energy.client.OctopusEnergyRestClient", autospec=True)
@@ -73,6 +92,18 @@ class ClientTestCase(TestCase):
                 with self.subTest("returns the result of mapping"):
                     self.assertIsNotNone(response)
 
+        with self.subTest("page size"):
+            async with OctopusEnergyConsumerClient("") as client:
+                await client.get_consumption(meter, page_size=100)
+                mock_rest_client.return_value.get_gas_consumption_v1.assert_called_with(
+                    mpxn,
+                    sn,
+                    period_from=None,
+                    period_to=None,
+                    order=SortOrder.OLDEST_FIRST,
+                    page_size=100,
+                )
+
         with self.subTest("paging support"):
             async with OctopusEnergyConsumerClient("") as client:
                 meter.energy_type = EnergyType.GAS
@@ -151,3 +182,155 @@ class ClientTestCase(TestCase):
                 )
             with self.subTest("returns the result of mapping"):
                 self.assertIsNotNone(response)
+
+    @does_asyncio
+    @patch("octopus_energy.client.OctopusEnergyRestClient", autospec=True)
+    async def test_get_flexible_rate_pricing_range(self, mock_rest_client: Mock):
+        def half_hourly_results(period_from: datetime, period_to: datetime) -> list:
+            period_from = period_from.astimezone(timezone.utc)
+            period_to = period_to.astimezone(timezone.utc)
+            slots = int((period_to - period_from) / timedelta(minutes=30))
+            return [
+                {
+                    "valid_from": to_timestamp_str(period_from + timedelta(minutes=30 * i)),
+                    "valid_to": to_timestamp_str(period_from + timedelta(minutes=30 * (i + 1))),
+                    "value_exc_vat": 10,
+                    "value_inc_vat": 10.5,
+                }
+                for i in reversed(range(slots))
+            ]
+
+        # clocks go forward on the 28th of march 2021, which only has 46 half hours.
+        day_1_start = local_day_start(date(2021, 3, 27))
+        day_2_start = local_day_start(date(2021, 3, 28))
+        day_3_start = local_day_start(date(2021, 3, 29))
+        get_tariff = mock_rest_client.return_value.get_tariff_v1
+        get_tariff.side_effect = [
+            # the third day has only been partially published
+            {
+                "next": "https://api.octopus.energy?page=2",
+                "results": half_hourly_results(day_2_start, day_3_start + timedelta(hours=11)),
+            },
+            {"next": None, "results": half_hourly_results(day_1_start, day_2_start)},
+        ]
+        args = (
+            "pc",
+            "tc",
+            EnergyTariffType.ELECTRICITY,
+            RateType.STANDARD_UNIT_RATES,
+        )
+        async with OctopusEnergyConsumerClient("") as client:
+            pricing = await client.get_flexible_rate_pricing_range(
+                *args, date(2021, 3, 27), date(2021, 3, 30)
+            )
+            with self.subTest("follows pages using the maximum page size"):
+                self.assertEqual(get_tariff.call_count, 2)
+                get_tariff.assert_called_with(
+                    "pc",
+                    EnergyTariffType.ELECTRICITY,
+                    "tc",
+                    RateType.STANDARD_UNIT_RATES,
+                    page_num=2,
+                    page_size=1500,
+                    period_from=day_1_start,
+                    period_to=local_day_start(date(2021, 3, 30)),
+                )
+            with self.subTest("splits rates by local day"):
+                self.assertEqual(
+                    [len(rates) for rates in pricing.values()],
+                    [48, 46, 22],
+                )
+            with self.subTest("sorts rates in ascending order"):
+                self.assertEqual(pricing[date(2021, 3, 28)][0].valid_from, day_2_start)
+
+            get_tariff.reset_mock()
+            get_tariff.side_effect = [
+                {"next": None, "results": []},
+                {
+                    "next": None,
+                    "results": half_hourly_results(day_3_start, day_3_start + timedelta(days=1)),
+                },
+            ]
+            pricing = await client.get_flexible_rate_pricing_range(
+                *args, date(2021, 3, 26), date(2021, 3, 30)
+            )
+            with self.subTest("only requests days that are not cached"):
+                self.assertEqual(
+                    [call.kwargs["period_from"] for call in get_tariff.call_args_list],
+                    [local_day_start(date(2021, 3, 26)), day_3_start],
+                )
+            with self.subTest("returns cached and fetched days"):
+                self.assertEqual(
+                    [len(rates) for rates in pricing.values()],
+                    [0, 48, 46, 48],
+                )
+
+    @does_asyncio
+    @patch("octopus_energy.client.OctopusEnergyRestClient", autospec=True)
+    @patch("octopus_energy.client.consumption_from_response", autospec=True)
+    async def test_iter_consumption_pages(self, mock_mapper: Mock, mock_rest_client: Mock):
+        meter: Meter = Mock()
+        meter.energy_type = EnergyType.ELECTRICITY
+        next_page = PageReference({"page": 2})
+        mock_mapper.side_effect = [Mock(next_page=next_page), Mock(next_page=None)]
+        async with OctopusEnergyConsumerClient("") as client:
+            pages = [page async for page in client.iter_consumption_pages(meter, page_size=10)]
+            with self.subTest("yields every page"):
+                self.assertEqual(len(pages), 2)
+            with self.subTest("requests the next page"):
+                mock_rest_client.return_value.get_electricity_consumption_v1.assert_called_with(
+                    meter.meter_point.id, meter.serial_number, page=2
+                )
+
+    @does_asyncio
+    @patch("octopus_energy.client.OctopusEnergyRestClient", autospec=True)
+    async def test_mapping_off_the_event_loop(self, mock_rest_client: Mock):
+        meter: Meter = Mock()
+        meter.energy_type = EnergyType.ELECTRICITY
+        meter.generation = MeterGeneration.SMETS2_ELECTRICITY
+        start = datetime(2021, 1, 1, tzinfo=timezone.utc)
+        page = {
+            "next": None,
+            "results": [
+                {
+                    "consumption": i,
+                    "interval_start": to_timestamp_str(start + timedelta(minutes=30 * i)),
+                    "interval_end": to_timestamp_str(start + timedelta(minutes=30 * (i + 1))),
+                }
+                for i in range(5)
+            ],
+        }
+
+        async def get_electricity_consumption_v1(*args, raw: bool = False, **kwargs):
+            return json.dumps(page).encode() if raw else page
+
+        mock_rest_client.return_value.get_electricity_consumption_v1.side_effect = (
+            get_electricity_consumption_v1
+        )
+        async with OctopusEnergyConsumerClient("") as client:
+            expected = await client.get_consumption(meter)
+        self.assertEqual(len(expected.intervals), 5)
+
+        with ThreadPoolExecutor(1) as executor:
+            for description, kwargs in [
+                ("executor", {"executor": executor}),
+                ("chunked", {"map_chunk_size": 2}),
+            ]:
+                with self.subTest(description), patch.object(
+                    executor, "submit", wraps=executor.submit
+                ) as submit:
+                    async with OctopusEnergyConsumerClient("", **kwargs) as client:
+                        self.assertEqual(await client.get_consumption(meter), expected)
+                    # The page is decoded and mapped in a single executor job.
+                    self.assertEqual(submit.call_count, 1 if "executor" in kwargs else 0)
+                    # Only an executor needs the page's undecoded body.
+                    get_page = mock_rest_client.return_value.get_electricity_consumption_v1
+                    self.assertEqual("raw" in get_page.call_args.kwargs, "executor" in kwargs)
+                    mock_rest_client.assert_called_with(
+                        "",
+                        executor=kwargs.get("executor"),
+                        rate_limiter=None,
+                        hedge_policy=None,
+                        circuit_breaker=None,
+                        scheduler=None,
+                    )
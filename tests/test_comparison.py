@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import TestCase
+from unittest.mock import patch
+
+from octopus_energy import (
+    IntervalConsumption,
+    TariffCandidate,
+    TariffComparison,
+    TariffRate,
+)
+
+_START = datetime(2021, 1, 1, tzinfo=timezone.utc)
+_SLOT = timedelta(minutes=30)
+
+
+def _usage(*units, start: datetime = _START) -> list:
+    return [
+        IntervalConsumption(start + _SLOT * i, start + _SLOT * (i + 1), Decimal(str(u)))
+        for i, u in enumerate(units)
+    ]
+
+
+def _rate(price: str, valid_from: datetime, valid_to: datetime = None) -> TariffRate:
+    return TariffRate(Decimal(price), Decimal(price) / 2, valid_from, valid_to)
+
+
+_FLAT = TariffCandidate(
+    "flat",
+    [_rate("10", _START - timedelta(days=1))],
+    [_rate("20", _START - timedelta(days=1))],
+)
+_PEAKY = TariffCandidate(
+    "peaky",
+    [_rate("5", _START, _START + _SLOT), _rate("30", _START + _SLOT, _START + _SLOT * 4)],
+)
+_PARTIAL = TariffCandidate("partial", [_rate("1", _START, _START + _SLOT)])
+
+
+class TariffComparisonTests(TestCase):
+    def setUp(self) -> None:
+        self.comparison = TariffComparison(
+            [_FLAT, _PEAKY, _PARTIAL], _START, _START + timedelta(hours=2)
+        )
+
+    def test_compare(self):
+        costs = self.comparison.compare(
+            {
+                "night owl": _usage(2, 0, 0, 0),
+                "daytime": _usage(0, 1, 1, 0),
+                "outside period": _usage(5, start=_START + timedelta(days=1)),
+            }
+        )
+        with self.subTest("unit rates and standing charges"):
+            self.assertEqual(costs["night owl"]["flat"], Decimal("40.000"))
+            self.assertEqual(costs["night owl"]["peaky"], Decimal("10.000"))
+        with self.subTest("tariffs with missing rates"):
+            self.assertEqual(costs["night owl"]["partial"], Decimal("2.000"))
+            self.assertIsNone(costs["daytime"]["partial"])
+        with self.subTest("daytime usage"):
+            self.assertEqual(costs["daytime"]["flat"], Decimal("40.000"))
+            self.assertEqual(costs["daytime"]["peaky"], Decimal("60.000"))
+        with self.subTest("no usage in the period costs nothing"):
+            self.assertEqual(costs["outside period"]["flat"], Decimal("0.000"))
+
+    def test_exc_vat(self):
+        comparison = TariffComparison(
+            [_PEAKY], _START, _START + timedelta(hours=2), include_vat=False
+        )
+        self.assertEqual(comparison.compare({"c": _usage(2)})["c"]["peaky"], Decimal("5.000"))
+
+    def test_process_pool(self):
+        consumption = {str(i): _usage(i, 1, 0, 1) for i in range(5)}
+        self.assertEqual(
+            self.comparison.compare(consumption, processes=2, chunk_size=2),
+            self.comparison.compare(consumption),
+        )
+
+    def test_chunks(self):
+        consumption = {str(i): _usage(i, 1, 0, 1) for i in range(5)}
+        expected = self.comparison.compare(consumption)
+        for chunk_size in [1, 2, 5, 10]:
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(
+                    self.comparison.compare(consumption, chunk_size=chunk_size), expected
+                )
+        with self.subTest("without numpy"), patch("octopus_energy.comparison.numpy", None):
+            self.assertEqual(self.comparison.compare(consumption, chunk_size=2), expected)
@@ -0,0 +1,154 @@
+import bz2
+import csv
+import gzip
+import json
+import lzma
+from decimal import Decimal
+from io import BytesIO, TextIOWrapper
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import skipUnless, TestCase
+from unittest.mock import Mock
+
+from octopus_energy import (
+    CsvWriter,
+    export_consumption,
+    NdjsonWriter,
+    open_writer,
+    TariffRate,
+    write_rates,
+)
+from tests import does_asyncio, half_hourly_consumption, mock_meter, START
+
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class WriterTests(TestCase):
+    def test_csv(self):
+        target = BytesIO()
+        with CsvWriter(target) as writer:
+            writer.write(half_hourly_consumption(mock_meter("1"), 0, 2, "0.125"))
+            writer.write(half_hourly_consumption(mock_meter("1"), 2, 1, "0.125"))
+        with self.subTest("leaves file objects open"):
+            self.assertFalse(target.closed)
+        rows = list(csv.reader(TextIOWrapper(BytesIO(target.getvalue()), encoding="utf-8")))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(writer.rows_written, 3)
+        self.assertEqual(
+            rows[1],
+            [
+                "electricity",
+                "1",
+                "sn",
+                "kWh",
+                "2021-01-01T00:00:00+00:00",
+                "2021-01-01T00:30:00+00:00",
+                "0.125",
+            ],
+        )
+
+    def test_ndjson_compressed(self):
+        with TemporaryDirectory() as directory:
+            file_path = path.join(directory, "consumption.ndjson.gz")
+            with NdjsonWriter(file_path, compression="gzip") as writer:
+                writer.write(half_hourly_consumption(mock_meter("1"), 0, 2, "0.125"))
+            with gzip.open(file_path, "rt", encoding="utf-8") as file:
+                rows = [json.loads(line) for line in file]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1]["interval_start"], "2021-01-01T00:30:00+00:00")
+        self.assertEqual(rows[1]["consumed_units"], 0.125)
+
+    def test_append(self):
+        with TemporaryDirectory() as directory:
+            for format, compression in [("csv", None), ("csv", "bz2"), ("ndjson", "xz")]:
+                with self.subTest(format=format, compression=compression):
+                    target = path.join(directory, f"{format}.{compression}")
+                    for start in [0, 2]:
+                        with open_writer(target, format, compression, append=start > 0) as writer:
+                            writer.write(
+                                half_hourly_consumption(mock_meter("1"), start, 2, "0.125")
+                            )
+                    with open_writer(target, format, compression, append=True):
+                        pass
+                    opener = {None: open, "bz2": bz2.open, "xz": lzma.open}[compression]
+                    with opener(target, "rt") as file:
+                        lines = file.read().splitlines()
+                    self.assertEqual(len(lines), 5 if format == "csv" else 4)
+
+    def test_flush(self):
+        with TemporaryDirectory() as directory:
+            for compression in [None, "gzip"]:
+                with self.subTest(compression=compression):
+                    target = path.join(directory, f"flushed.{compression}")
+                    opener = gzip.open if compression else open
+                    writer = CsvWriter(target, compression)
+                    for start in [0, 2]:
+                        writer.write(half_hourly_consumption(mock_meter("1"), start, 2, "0.125"))
+                        writer.flush()
+                        with self.subTest("every flushed row can be read before closing"):
+                            with opener(target, "rt") as file:
+                                self.assertEqual(len(file.read().splitlines()), start + 3)
+                    writer.close()
+                    with opener(target, "rt") as file:
+                        self.assertEqual(len(file.read().splitlines()), 5)
+
+    def test_open_writer(self):
+        with self.subTest("unsupported format"):
+            with self.assertRaises(ValueError):
+                open_writer(BytesIO(), "xml")
+        with self.subTest("unsupported compression"):
+            with self.assertRaises(ValueError):
+                open_writer(BytesIO(), "csv", "zip")
+        with self.subTest("opens the writer for the format"):
+            self.assertIsInstance(open_writer(BytesIO(), "ndjson"), NdjsonWriter)
+
+    def test_write_rates(self):
+        target = BytesIO()
+        rates = [TariffRate(Decimal("2.1"), Decimal("2"), START, None)]
+        self.assertEqual(write_rates(target, {"E-1R-VAR-C": rates}, "ndjson"), 1)
+        self.assertEqual(
+            json.loads(target.getvalue()),
+            {
+                "tariff_code": "E-1R-VAR-C",
+                "valid_from": "2021-01-01T00:00:00+00:00",
+                "valid_to": None,
+                "cost_exc_vat": 2.0,
+                "cost_inc_vat": 2.1,
+            },
+        )
+
+    @skipUnless(pyarrow, "pyarrow is not installed")
+    def test_parquet(self):
+        with TemporaryDirectory() as directory:
+            file_path = path.join(directory, "consumption.parquet")
+            with open_writer(file_path, "parquet") as writer:
+                writer.write(half_hourly_consumption(mock_meter("1"), 0, 2, "0.125"))
+                writer.write(half_hourly_consumption(mock_meter("2"), 0, 3, "0.125"))
+            table = pyarrow.parquet.read_table(file_path)
+        self.assertEqual(table.num_rows, 5)
+        self.assertEqual(table.column("mpid").to_pylist(), ["1", "1", "2", "2", "2"])
+
+
+class ExportConsumptionTests(TestCase):
+    @does_asyncio
+    async def test_export_consumption(self):
+        meters = [mock_meter("1"), mock_meter("2")]
+        requested = []
+
+        async def iter_consumption_pages(meter, period_from, period_to, page_size):
+            requested.append((meter, period_from, period_to, page_size))
+            yield half_hourly_consumption(meter, 0, 2, "0.125")
+            yield half_hourly_consumption(meter, 2, 2, "0.125")
+
+        client = Mock()
+        client.iter_consumption_pages = iter_consumption_pages
+        target = BytesIO()
+        with CsvWriter(target) as writer:
+            written = await export_consumption(client, meters, writer, START, page_size=10)
+
+        self.assertEqual(written, 8)
+        self.assertEqual(requested, [(m, START, None, 10) for m in meters])
+        self.assertEqual(len(target.getvalue().decode().splitlines()), 9)
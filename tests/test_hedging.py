@@ -0,0 +1,105 @@
+from asyncio import CancelledError, sleep
+from datetime import timedelta
+from typing import Collection
+from unittest import TestCase
+
+from octopus_energy import HedgePolicy, RateLimiter
+from tests import does_asyncio
+
+
+def _requests(*durations: float, failing: Collection[int] = ()):
+    """Makes requests that take each of the durations in turn, recording what happened to them."""
+    calls = []
+
+    async def request():
+        index = len(calls)
+        calls.append("started")
+        try:
+            await sleep(durations[index])
+        except CancelledError:
+            calls[index] = "cancelled"
+            raise
+        calls[index] = "finished"
+        if index in failing:
+            raise ValueError(index)
+        return index
+
+    return request, calls
+
+
+class HedgePolicyTests(TestCase):
+    @does_asyncio
+    async def test_fast_request_is_not_hedged(self):
+        policy = HedgePolicy(initial_delay=timedelta(seconds=0.05))
+        request, calls = _requests(0.001)
+        self.assertEqual(await policy.run(request), 0)
+        self.assertEqual(calls, ["finished"])
+        self.assertEqual((policy.requests, policy.hedges), (1, 0))
+
+    @does_asyncio
+    async def test_slow_request_is_hedged(self):
+        policy = HedgePolicy(initial_delay=timedelta(seconds=0.01))
+        request, calls = _requests(1.0, 0.001)
+        self.assertEqual(await policy.run(request), 1)
+        with self.subTest("the slow request is cancelled"):
+            await sleep(0)
+            self.assertEqual(calls, ["cancelled", "finished"])
+        with self.subTest("counts the hedge"):
+            self.assertEqual((policy.hedges, policy.hedges_won), (1, 1))
+
+    @does_asyncio
+    async def test_first_request_can_still_win(self):
+        policy = HedgePolicy(initial_delay=timedelta(seconds=0.01))
+        request, calls = _requests(0.02, 1.0)
+        self.assertEqual(await policy.run(request), 0)
+        await sleep(0)
+        self.assertEqual(calls, ["finished", "cancelled"])
+        self.assertEqual((policy.hedges, policy.hedges_won), (1, 0))
+
+    @does_asyncio
+    async def test_error_of_first_response_is_raised(self):
+        policy = HedgePolicy(initial_delay=timedelta(seconds=0.01))
+        request, _ = _requests(0.001, failing=[0])
+        with self.assertRaises(ValueError):
+            await policy.run(request)
+
+    @does_asyncio
+    async def test_hedge_is_awaited_when_first_request_fails(self):
+        policy = HedgePolicy(initial_delay=timedelta(seconds=0.01))
+        request, calls = _requests(0.02, 0.05, failing=[0])
+        self.assertEqual(await policy.run(request), 1)
+        self.assertEqual(calls, ["finished", "finished"])
+        self.assertEqual((policy.hedges_won, len(policy._samples)), (1, 1))
+
+    @does_asyncio
+    async def test_error_of_first_request_is_raised_when_all_fail(self):
+        policy = HedgePolicy(initial_delay=timedelta(seconds=0.01))
+        request, _ = _requests(0.05, 0.02, failing=[0, 1])
+        with self.assertRaises(ValueError) as raised:
+            await policy.run(request)
+        self.assertEqual(raised.exception.args, (0,))
+        self.assertEqual(len(policy._samples), 0)
+
+    @does_asyncio
+    async def test_hedges_respect_the_rate_limiter(self):
+        limiter = RateLimiter(1, timedelta(hours=1))
+        policy = HedgePolicy(initial_delay=timedelta(seconds=0.01))
+        request, calls = _requests(0.05, 0.001)
+        self.assertEqual(await policy.run(request, limiter), 0)
+        self.assertEqual(calls, ["finished"])
+        self.assertEqual((policy.hedges, policy.hedges_skipped), (0, 1))
+
+    def test_delay(self):
+        policy = HedgePolicy(
+            percentile=90, initial_delay=timedelta(seconds=2), min_delay=timedelta(seconds=0.1)
+        )
+        with self.subTest("initial delay until enough responses are timed"):
+            self.assertEqual(policy.delay, 2)
+        with self.subTest("percentile of recent responses"):
+            for i in range(100):
+                policy.record(i / 100)
+            self.assertEqual(policy.delay, 0.9)
+        with self.subTest("minimum delay"):
+            for _ in range(1000):
+                policy.record(0.01)
+            self.assertEqual(policy.delay, 0.1)
@@ -0,0 +1,57 @@
+import ast
+import inspect
+import subprocess
+import sys
+from unittest import TestCase
+
+import octopus_energy
+
+_HEAVY_MODULES = ("aiohttp", "furl", "dateutil")
+
+
+def _loaded_modules(statement: str) -> list:
+    """Runs a statement in a fresh interpreter and lists the heavy modules it loaded."""
+    report = f"print(','.join(m for m in {_HEAVY_MODULES} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys\n{statement}\n{report}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return [module for module in result.stdout.strip().split(",") if module]
+
+
+class LazyImportTests(TestCase):
+    def test_heavy_modules_are_loaded_on_first_use(self):
+        for statement, expected in [
+            ("import octopus_energy", []),
+            ("from octopus_energy import Meter, TariffRate, ApiError", []),
+            ("from octopus_energy import OctopusEnergyRestClient", ["aiohttp", "dateutil"]),
+        ]:
+            with self.subTest(statement):
+                self.assertEqual(_loaded_modules(statement), expected)
+
+    def test_public_names(self):
+        with self.subTest("every public name can be loaded"):
+            for name in octopus_energy.__all__:
+                self.assertIsNotNone(getattr(octopus_energy, name))
+        with self.subTest("public names are listed"):
+            self.assertTrue(set(octopus_energy.__all__) <= set(dir(octopus_energy)))
+        with self.subTest("unknown names raise attribute errors"):
+            with self.assertRaises(AttributeError):
+                octopus_energy.NotAName
+
+    def test_type_checking_imports_match_exports(self):
+        tree = ast.parse(inspect.getsource(octopus_energy))
+        block = next(
+            node
+            for node in tree.body
+            if isinstance(node, ast.If) and getattr(node.test, "id", None) == "TYPE_CHECKING"
+        )
+        imported = {
+            node.module: {alias.name for alias in node.names}
+            for node in block.body
+            if isinstance(node, ast.ImportFrom)
+        }
+        exported = {module: set(names) for module, names in octopus_energy._EXPORTS.items()}
+        self.assertEqual(imported, exported)
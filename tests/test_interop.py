@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import skipUnless, TestCase
+
+from octopus_energy import (
+    consumption_to_arrow,
+    consumption_to_numpy,
+    consumption_to_pandas,
+    IntervalConsumption,
+    rates_to_arrow,
+    rates_to_numpy,
+    rates_to_pandas,
+    TariffRate,
+)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+try:
+    import pandas
+except ImportError:
+    pandas = None
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+_START = datetime(2021, 1, 1, tzinfo=timezone.utc)
+_EPOCH = 1609459200
+_INTERVALS = [
+    IntervalConsumption(
+        _START + timedelta(minutes=30 * i), _START + timedelta(minutes=30 * (i + 1)), Decimal(i)
+    )
+    for i in range(3)
+]
+_RATES = [
+    TariffRate(Decimal("2.1"), Decimal("2"), _START, _START + timedelta(days=1)),
+    TariffRate(Decimal("3.15"), Decimal("3"), _START + timedelta(days=1), None),
+]
+
+
+class InteropTests(TestCase):
+    @skipUnless(pyarrow, "pyarrow is not installed")
+    def test_arrow(self):
+        with self.subTest("consumption"):
+            table = consumption_to_arrow(_INTERVALS)
+            self.assertEqual(str(table.schema.field("interval_start").type), "int64")
+            self.assertEqual(
+                table.column("interval_start").to_pylist(), [_EPOCH, _EPOCH + 1800, _EPOCH + 3600]
+            )
+            self.assertEqual(table.column("consumed_units").to_pylist(), [0.0, 1.0, 2.0])
+        with self.subTest("rates"):
+            table = rates_to_arrow(_RATES)
+            self.assertEqual(table.column("valid_to").to_pylist(), [_EPOCH + 86400, None])
+            self.assertEqual(table.column("cost_inc_vat").to_pylist(), [2.1, 3.15])
+        with self.subTest("empty"):
+            self.assertEqual(rates_to_arrow([]).num_rows, 0)
+
+    @skipUnless(numpy, "numpy is not installed")
+    def test_numpy(self):
+        with self.subTest("consumption"):
+            arrays = consumption_to_numpy(_INTERVALS)
+            self.assertEqual(arrays["interval_end"].dtype, numpy.int64)
+            self.assertEqual(
+                arrays["interval_end"].tolist(), [_EPOCH + 1800, _EPOCH + 3600, _EPOCH + 5400]
+            )
+            self.assertEqual(arrays["consumed_units"].tolist(), [0.0, 1.0, 2.0])
+        with self.subTest("open ended rates are masked"):
+            arrays = rates_to_numpy(_RATES)
+            self.assertEqual(arrays["valid_to"].tolist(), [_EPOCH + 86400, None])
+        with self.subTest("closed rates are not masked"):
+            arrays = rates_to_numpy(_RATES[:1])
+            self.assertNotIsInstance(arrays["valid_to"], numpy.ma.MaskedArray)
+
+    @skipUnless(pandas, "pandas is not installed")
+    def test_pandas(self):
+        with self.subTest("consumption"):
+            frame = consumption_to_pandas(_INTERVALS)
+            self.assertEqual(
+                list(frame.columns), ["interval_start", "interval_end", "consumed_units"]
+            )
+            self.assertEqual(frame["interval_start"].dtype, numpy.int64)
+            self.assertEqual(frame["consumed_units"].sum(), 3.0)
+        with self.subTest("rates"):
+            frame = rates_to_pandas(_RATES)
+            self.assertEqual(str(frame["valid_to"].dtype), "Int64")
+            self.assertTrue(frame["valid_to"].isna().tolist()[1])
@@ -4,7 +4,7 @@ from unittest import TestCase
 from unittest.mock import Mock
 
 import jsonpickle
-from dateutil.tz import tzoffset
+from dateutil.tz import tzoffset, tzutc
 
 from octopus_energy.mappers import (
     _calculate_unit,
@@ -12,7 +12,9 @@ from octopus_energy.mappers import (
     to_timestamp_str,
     meters_from_response,
     _get_page_reference,
+    next_page_from_response,
     tariff_rates_from_response,
+    products_from_response,
 )
 from octopus_energy.models import UnitType, MeterGeneration, SortOrder, Aggregate
 from tests import load_fixture_json, load_json
@@ -53,6 +55,24 @@ class TestTariffMappers(TestCase):
         self.assertEqual([], tariff_rates_from_response({}))
 
 
+class TestProductMappers(TestCase):
+    def test_product_mapping(self):
+        products = products_from_response(load_fixture_json("get_products_response.json"))
+        with self.subTest("product count"):
+            self.assertEqual(len(products), 2)
+        with self.subTest("code"):
+            self.assertEqual(products[0].code, "AFFECT-FIX-12M-20-12-31")
+        with self.subTest("flags"):
+            self.assertFalse(products[0].is_green)
+            self.assertTrue(products[1].is_green)
+        with self.subTest("availability"):
+            self.assertEqual(products[0].available_from, datetime(2020, 12, 31, tzinfo=tzutc()))
+            self.assertIsNone(products[0].available_to)
+
+    def test_no_results(self):
+        self.assertEqual([], products_from_response({}))
+
+
 class TestConsumptionMappers(TestCase):
     def test_smets1_gas_mapping_kwh(self):
         response = load_fixture_json("consumption_response.json")
@@ -250,6 +270,12 @@ class TestConsumptionMappers(TestCase):
                 _get_page_reference(response, "next").options["order"], SortOrder.NEWEST_FIRST
             )
 
+        with self.subTest("next page reference"):
+            response = {"previous": "http://octopus.energy?page=1"}
+            self.assertIsNone(next_page_from_response(response))
+            response = {"next": "http://octopus.energy?page=3"}
+            self.assertEqual(next_page_from_response(response).options, {"page": "3"})
+
         with self.subTest("group by extracted from url"):
             response = {
                 "next": f"http://octopus.energy?group_by={Aggregate.QUARTER.value}",
@@ -0,0 +1,61 @@
+from unittest import TestCase
+from unittest.mock import AsyncMock, call, Mock
+
+from octopus_energy import ApiError, ApiNotFoundError, GspResolver, MemoryStore
+from tests import does_asyncio
+
+
+class GspResolverTests(TestCase):
+    @does_asyncio
+    async def test_resolve(self):
+        async def get_electricity_meter_points_v1(mpan):
+            if mpan == "unknown":
+                raise ApiNotFoundError()
+            return {"gsp": f"_{mpan}", "mpan": mpan, "profile_class": 1}
+
+        rest_client = Mock()
+        rest_client.get_electricity_meter_points_v1 = AsyncMock(
+            side_effect=get_electricity_meter_points_v1
+        )
+        store = MemoryStore()
+        store.set("gsp:C", "_C")
+        resolver = GspResolver(rest_client, store)
+
+        gsps = await resolver.resolve(["A", "B", "A", "C", "unknown"])
+        with self.subTest("resolves every mpan"):
+            self.assertEqual(gsps, {"A": "_A", "B": "_B", "C": "_C", "unknown": None})
+        with self.subTest("deduplicates and skips stored mpans"):
+            self.assertEqual(
+                rest_client.get_electricity_meter_points_v1.call_args_list,
+                [call("A"), call("B"), call("unknown")],
+            )
+        with self.subTest("stores resolved gsps"):
+            self.assertEqual(store.get("gsp:A"), "_A")
+            self.assertIsNone(store.get("gsp:unknown"))
+
+        rest_client.get_electricity_meter_points_v1.reset_mock()
+        with self.subTest("does not request stored mpans again"):
+            await resolver.resolve(["A", "B", "C"])
+            rest_client.get_electricity_meter_points_v1.assert_not_called()
+
+    @does_asyncio
+    async def test_resolve_stores_partial_results(self):
+        async def get_electricity_meter_points_v1(mpan):
+            if mpan == "broken":
+                raise ApiError(Mock())
+            return {"gsp": f"_{mpan}", "mpan": mpan, "profile_class": 1}
+
+        rest_client = Mock()
+        rest_client.get_electricity_meter_points_v1 = AsyncMock(
+            side_effect=get_electricity_meter_points_v1
+        )
+        store = MemoryStore()
+        resolver = GspResolver(rest_client, store)
+
+        with self.subTest("raises the failure"):
+            with self.assertRaises(ApiError):
+                await resolver.resolve(["A", "broken", "B"])
+        with self.subTest("stores the gsps that were resolved"):
+            self.assertEqual(store.get("gsp:A"), "_A")
+            self.assertEqual(store.get("gsp:B"), "_B")
+            self.assertIsNone(store.get("gsp:broken"))
@@ -0,0 +1,74 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import TestCase
+
+from octopus_energy.models import TariffRate
+from octopus_energy.periods import (
+    local_day_start,
+    local_day_of,
+    rates_cover_day,
+    split_rates_by_day,
+    UK_TIMEZONE,
+)
+
+
+def _rate(valid_from: datetime, valid_to: datetime = None) -> TariffRate:
+    return TariffRate(Decimal("1"), Decimal("1"), valid_from, valid_to)
+
+
+class LocalDayTests(TestCase):
+    def test_local_day_start(self):
+        with self.subTest("winter"):
+            self.assertEqual(
+                local_day_start(date(2021, 1, 1)), datetime(2021, 1, 1, tzinfo=timezone.utc)
+            )
+        with self.subTest("summer"):
+            self.assertEqual(
+                local_day_start(date(2021, 7, 1)), datetime(2021, 6, 30, 23, tzinfo=timezone.utc)
+            )
+        with self.subTest("custom timezone"):
+            self.assertEqual(local_day_start(date(2021, 7, 1), timezone.utc).tzinfo, timezone.utc)
+
+    def test_local_day_of(self):
+        self.assertEqual(
+            local_day_of(datetime(2021, 6, 30, 23, 30, tzinfo=timezone.utc)), date(2021, 7, 1)
+        )
+
+    def test_uk_timezone(self):
+        self.assertEqual(datetime(2021, 7, 1, tzinfo=UK_TIMEZONE).utcoffset(), timedelta(hours=1))
+
+
+class SplitRatesByDayTests(TestCase):
+    def test_split(self):
+        day_start = local_day_start(date(2021, 1, 2))
+        rates = [
+            _rate(day_start + timedelta(hours=1), day_start + timedelta(hours=2)),
+            _rate(day_start - timedelta(hours=1), day_start + timedelta(hours=1)),
+            _rate(day_start + timedelta(hours=2)),
+        ]
+        buckets = split_rates_by_day(rates, date(2021, 1, 1), date(2021, 1, 4))
+        with self.subTest("creates a bucket for every day"):
+            self.assertEqual(list(buckets), [date(2021, 1, 1), date(2021, 1, 2), date(2021, 1, 3)])
+        with self.subTest("places rates spanning midnight in both days"):
+            self.assertEqual(buckets[date(2021, 1, 1)], [rates[1]])
+        with self.subTest("sorts rates"):
+            self.assertEqual(buckets[date(2021, 1, 2)], [rates[1], rates[0], rates[2]])
+        with self.subTest("open ended rates extend to the end of the range"):
+            self.assertEqual(buckets[date(2021, 1, 3)], [rates[2]])
+
+
+class RatesCoverDayTests(TestCase):
+    def test_rates_cover_day(self):
+        day_start = local_day_start(date(2021, 1, 1))
+        day_end = local_day_start(date(2021, 1, 2))
+        middle = day_start + timedelta(hours=12)
+        for description, rates, expected in [
+            ("no rates", [], False),
+            ("single rate", [_rate(day_start, day_end)], True),
+            ("contiguous rates", [_rate(day_start, middle), _rate(middle, day_end)], True),
+            ("partial", [_rate(day_start, middle)], False),
+            ("gap", [_rate(day_start, middle), _rate(middle + timedelta(hours=1), day_end)], False),
+            ("open ended", [_rate(day_start)], False),
+        ]:
+            with self.subTest(description):
+                self.assertEqual(rates_cover_day(rates, date(2021, 1, 1)), expected)
@@ -0,0 +1,97 @@
+from asyncio import sleep
+from datetime import timedelta
+from unittest import TestCase
+from unittest.mock import AsyncMock, Mock
+
+from octopus_energy import ConsumptionPipeline
+from octopus_energy.mappers import to_timestamp_str
+from tests import does_asyncio, mock_meter, START
+
+
+def _response(page: int, pages: int) -> dict:
+    start = START + timedelta(minutes=30 * page)
+    return {
+        "next": f"https://api.octopus.energy/v1/?page={page + 2}" if page + 1 < pages else None,
+        "results": [
+            {
+                "consumption": 1,
+                "interval_start": to_timestamp_str(start),
+                "interval_end": to_timestamp_str(start + timedelta(minutes=30)),
+            }
+        ],
+    }
+
+
+def _mock_client(pages: int, failing=()) -> Mock:
+    async def get_consumption_response(meter, period_from, period_to, page_reference, page_size):
+        if meter.meter_point.id in failing:
+            raise ValueError("failed")
+        page = 0 if page_reference is None else int(page_reference.options["page"]) - 1
+        return _response(page, pages)
+
+    client = Mock()
+    client.get_consumption_response = get_consumption_response
+    return client
+
+
+class ConsumptionPipelineTests(TestCase):
+    @does_asyncio
+    async def test_run(self):
+        received = []
+
+        async def sink(meter, consumption):
+            received.append((meter.meter_point.id, consumption.intervals[0].interval_start))
+
+        meters = [mock_meter("1"), mock_meter("bad"), mock_meter("2")]
+        pipeline = ConsumptionPipeline(_mock_client(3, failing={"bad"}), sink, page_size=1)
+        stats = await pipeline.run(meters, START)
+
+        with self.subTest("passes every page to the sink in order"):
+            self.assertEqual(
+                sorted(received),
+                [(m, START + timedelta(minutes=30 * i)) for m in "12" for i in range(3)],
+            )
+            self.assertEqual(
+                [r for r in received if r[0] == "1"], sorted(r for r in received if r[0] == "1")
+            )
+        with self.subTest("counts pages at each stage"):
+            self.assertEqual(
+                (stats.fetch.completed, stats.map.completed, stats.sink.completed), (6, 6, 6)
+            )
+            self.assertEqual((stats.map.waiting, stats.sink.waiting, stats.sink.active), (0, 0, 0))
+        with self.subTest("records failures"):
+            self.assertEqual(list(stats.failures), ["electricity/bad/sn"])
+
+    @does_asyncio
+    async def test_backpressure(self):
+        max_held = 0
+
+        async def slow_sink(meter, consumption):
+            nonlocal max_held
+            stats = pipeline.stats
+            held = stats.fetch.active + stats.map.waiting + stats.sink.waiting + stats.sink.active
+            max_held = max(max_held, held)
+            await sleep(0.001)
+
+        pipeline = ConsumptionPipeline(
+            _mock_client(20), slow_sink, fetch_concurrency=4, queue_size=2
+        )
+        stats = await pipeline.run([mock_meter(str(i)) for i in range(4)])
+        self.assertEqual(stats.sink.completed, 80)
+        self.assertLessEqual(max_held, 4 + 1 + 1 + 2 * 2)
+
+    @does_asyncio
+    async def test_counts_meters_waiting_to_be_fetched(self):
+        waiting = {}
+        client = _mock_client(2)
+        get_consumption_response = client.get_consumption_response
+
+        async def counting_get_consumption_response(meter, *args):
+            waiting.setdefault(meter.meter_point.id, pipeline.stats.fetch.waiting)
+            return await get_consumption_response(meter, *args)
+
+        client.get_consumption_response = counting_get_consumption_response
+        pipeline = ConsumptionPipeline(client, AsyncMock(), fetch_concurrency=1)
+        stats = await pipeline.run([mock_meter(str(i)) for i in range(3)])
+        self.assertEqual(waiting, {"0": 2, "1": 1, "2": 0})
+        self.assertEqual((stats.fetch.waiting, stats.sink.completed), (0, 6))
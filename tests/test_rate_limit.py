@@ -0,0 +1,139 @@
+import os
+import sqlite3
+import tempfile
+from asyncio import create_task, gather, run, sleep
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from time import monotonic
+from unittest import TestCase
+
+from octopus_energy import RateLimiter, request_priority, RequestPriority, SqliteRateLimiter
+from tests import does_asyncio
+
+
+class RateLimiterTests(TestCase):
+    @does_asyncio
+    async def test_acquire(self):
+        limiter = RateLimiter(10, timedelta(seconds=0.1), burst=2)
+        started = monotonic()
+        await gather(*(limiter.acquire() for _ in range(6)))
+        elapsed = monotonic() - started
+        with self.subTest("the burst is available straight away, then tokens refill at the rate"):
+            # 2 burst tokens, then 4 more at 100 per second.
+            self.assertGreaterEqual(elapsed, 0.035)
+            self.assertLess(elapsed, 0.5)
+
+    @does_asyncio
+    async def test_acquire_by_priority(self):
+        limiter = RateLimiter(100, timedelta(seconds=1), burst=1)
+        order = []
+
+        async def acquire(name: str, priority: RequestPriority):
+            with request_priority(priority):
+                await limiter.acquire()
+            order.append(name)
+
+        tasks = [create_task(acquire(f"bulk {i}", RequestPriority.BULK)) for i in range(3)]
+        await sleep(0)
+        tasks.append(create_task(acquire("interactive", RequestPriority.INTERACTIVE)))
+        await gather(*tasks)
+        with self.subTest("interactive requests take tokens ahead of waiting bulk requests"):
+            self.assertEqual(order, ["bulk 0", "interactive", "bulk 1", "bulk 2"])
+        with self.subTest("no waiters are left behind"):
+            self.assertEqual(limiter._waiters, [])
+
+    @does_asyncio
+    async def test_cancelled_waiters_give_up_their_place(self):
+        limiter = RateLimiter(100, timedelta(seconds=1), burst=1)
+        await limiter.acquire()
+        first = create_task(limiter.acquire())
+        second = create_task(limiter.acquire())
+        await sleep(0)
+        first.cancel()
+        await gather(first, second, return_exceptions=True)
+        self.assertTrue(second.done() and not second.cancelled())
+        self.assertEqual(limiter._waiters, [])
+
+    @does_asyncio
+    async def test_try_acquire(self):
+        limiter = RateLimiter(1, timedelta(hours=1), burst=2)
+        self.assertEqual([await limiter.try_acquire() for _ in range(3)], [True, True, False])
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            RateLimiter(0)
+
+
+def _take_tokens(path: str, attempts: int) -> int:
+    async def take() -> int:
+        return sum([await limiter.try_acquire() for _ in range(attempts)])
+
+    limiter = SqliteRateLimiter(path, 1, timedelta(hours=1), burst=10)
+    try:
+        return run(take())
+    finally:
+        limiter.close()
+
+
+class SqliteRateLimiterTests(TestCase):
+    @does_asyncio
+    async def test_limit_is_shared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "limits.db")
+            with self.subTest("between limiters"):
+                first = SqliteRateLimiter(path, 1, timedelta(hours=1), burst=3, key="a")
+                second = SqliteRateLimiter(path, 1, timedelta(hours=1), burst=3, key="a")
+                self.assertEqual(
+                    [
+                        await first.try_acquire(),
+                        await second.try_acquire(),
+                        await first.try_acquire(),
+                    ],
+                    [True, True, True],
+                )
+                self.assertFalse(await second.try_acquire())
+                first.close()
+                second.close()
+
+            with self.subTest("between processes"):
+                with ProcessPoolExecutor(2) as executor:
+                    taken = list(executor.map(_take_tokens, [path] * 4, [5] * 4))
+                self.assertEqual(sum(taken), 10)
+
+    @does_asyncio
+    async def test_acquire_waits_for_tokens(self):
+        with tempfile.TemporaryDirectory() as directory:
+            limiter = SqliteRateLimiter(
+                os.path.join(directory, "limits.db"), 10, timedelta(seconds=0.1), burst=1
+            )
+            started = monotonic()
+            await gather(*(limiter.acquire() for _ in range(3)))
+            self.assertGreaterEqual(monotonic() - started, 0.015)
+            limiter.close()
+
+    @does_asyncio
+    async def test_waits_for_a_locked_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "limits.db")
+            limiter = SqliteRateLimiter(path, 1, timedelta(hours=1), burst=2)
+            other = sqlite3.connect(path, isolation_level=None)
+            other.execute("BEGIN IMMEDIATE")
+            with self.subTest("try_acquire gives up straight away"):
+                self.assertFalse(await limiter.try_acquire())
+            acquire = create_task(limiter.acquire())
+            started = monotonic()
+            await sleep(0.1)
+            with self.subTest("the event loop is not blocked while waiting"):
+                self.assertLess(monotonic() - started, 0.5)
+                self.assertFalse(acquire.done())
+            other.execute("COMMIT")
+            await acquire
+            with self.subTest("the token is taken once the database is released"):
+                self.assertTrue(await limiter.try_acquire())
+                self.assertFalse(await limiter.try_acquire())
+            other.close()
+            limiter.close()
+
+    def test_rejects_invalid_table(self):
+        with self.assertRaises(ValueError):
+            SqliteRateLimiter(":memory:", 1, table="x; DROP TABLE y")
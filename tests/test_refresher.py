@@ -0,0 +1,154 @@
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from unittest import TestCase
+from unittest.mock import AsyncMock, Mock, patch
+
+from freezegun import freeze_time
+
+from octopus_energy import ApiError, CircuitOpenError, FlexibleRateRefresher, TariffRate
+from octopus_energy.periods import local_day_start
+from tests import does_asyncio
+
+
+def _day_of_rates(day: date) -> list:
+    start = local_day_start(day).astimezone(timezone.utc)
+    return [
+        TariffRate(
+            Decimal(i),
+            Decimal(i),
+            start + timedelta(minutes=30 * i),
+            start + timedelta(minutes=30 * (i + 1)),
+        )
+        for i in range(48)
+    ]
+
+
+def _agile_rates(day: date) -> list:
+    """Gets the rates published on a day, which run from 23:00 that day to 23:00 the next."""
+    start = (local_day_start(day) + timedelta(hours=23)).astimezone(timezone.utc)
+    return [
+        TariffRate(
+            Decimal(i),
+            Decimal(i),
+            start + timedelta(minutes=30 * i),
+            start + timedelta(minutes=30 * (i + 1)),
+        )
+        for i in range(48)
+    ]
+
+
+def _mock_client(*published_days) -> Mock:
+    client = Mock()
+    client.get_flexible_rate_pricing_range = AsyncMock(
+        return_value={day: _day_of_rates(day) for day in published_days}
+    )
+    return client
+
+
+class FlexibleRateRefresherTests(TestCase):
+    @freeze_time("2021-01-01 10:15:00")
+    @does_asyncio
+    async def test_lookup(self):
+        client = _mock_client(date(2021, 1, 1))
+        refresher = FlexibleRateRefresher(client, "pc", "tc")
+        published = await refresher.refresh()
+        with self.subTest("loads today and tomorrow"):
+            client.get_flexible_rate_pricing_range.assert_called_once()
+            self.assertEqual(
+                client.get_flexible_rate_pricing_range.call_args.args[-2:],
+                (date(2021, 1, 1), date(2021, 1, 3)),
+            )
+        with self.subTest("reports tomorrow is not published"):
+            self.assertFalse(published)
+        with self.subTest("current rate"):
+            self.assertEqual(refresher.current_rate().cost_inc_vat, Decimal(20))
+        with self.subTest("rate at"):
+            self.assertEqual(
+                refresher.rate_at(datetime(2021, 1, 1, 23, 59, tzinfo=timezone.utc)).cost_inc_vat,
+                Decimal(47),
+            )
+        with self.subTest("rate outside of index"):
+            self.assertIsNone(refresher.rate_at(datetime(2021, 1, 2, tzinfo=timezone.utc)))
+            self.assertIsNone(refresher.rate_at(datetime(2020, 12, 31, tzinfo=timezone.utc)))
+        with self.subTest("upcoming rates"):
+            self.assertEqual(len(refresher.upcoming_rates()), 28)
+
+    @freeze_time("2021-01-01 10:00:00")
+    @does_asyncio
+    async def test_polls_at_publication_time(self):
+        refresher = FlexibleRateRefresher(_mock_client(date(2021, 1, 1)), "pc", "tc")
+        await refresher.refresh()
+        self.assertEqual(refresher._seconds_until_publication(), 6 * 60 * 60)
+
+    @freeze_time("2021-01-01 17:00:00")
+    @does_asyncio
+    async def test_waits_for_next_day_once_published(self):
+        refresher = FlexibleRateRefresher(
+            _mock_client(date(2021, 1, 1), date(2021, 1, 2)), "pc", "tc"
+        )
+        self.assertTrue(await refresher.refresh())
+        self.assertEqual(refresher._seconds_until_publication(), 23 * 60 * 60)
+
+    @freeze_time("2021-01-01 17:00:00")
+    @does_asyncio
+    async def test_rates_published_from_23_00_to_23_00(self):
+        client = Mock()
+        client.get_flexible_rate_pricing_range = AsyncMock(
+            return_value={
+                date(2021, 1, 1): _agile_rates(date(2020, 12, 31)) + _agile_rates(date(2021, 1, 1))
+            }
+        )
+        refresher = FlexibleRateRefresher(client, "pc", "tc")
+        with self.subTest("published once the rates reach 23:00 tomorrow"):
+            self.assertTrue(await refresher.refresh())
+            self.assertEqual(refresher._seconds_until_publication(), 23 * 60 * 60)
+
+        with self.subTest("configurable cutoff"):
+            later = FlexibleRateRefresher(client, "pc", "tc", publish_cutoff=time(23, 30))
+            self.assertFalse(await later.refresh())
+
+        client.get_flexible_rate_pricing_range.return_value = {
+            date(2021, 1, 1): _agile_rates(date(2020, 12, 31))
+        }
+        with self.subTest("not published while the rates end at 23:00 today"):
+            self.assertFalse(await refresher.refresh())
+            self.assertEqual(refresher._seconds_until_publication(), 0)
+
+    @freeze_time("2021-01-01 16:00:00")
+    @does_asyncio
+    @patch("octopus_energy.refresher.sleep", autospec=True)
+    async def test_backs_off_until_published(self, mock_sleep: Mock):
+        client = _mock_client()
+        client.get_flexible_rate_pricing_range.side_effect = [
+            {},
+            ApiError(Mock()),
+            TimeoutError(),
+            CircuitOpenError("/v1/products/{}/", 30),
+            {date(2021, 1, 2): _day_of_rates(date(2021, 1, 2))},
+        ]
+        # stop the refresher once it goes back to waiting for the next publication
+        mock_sleep.side_effect = [None, None, None, None, None, StopAsyncIteration()]
+        refresher = FlexibleRateRefresher(
+            client,
+            "pc",
+            "tc",
+            initial_backoff=timedelta(minutes=1),
+            max_backoff=timedelta(minutes=3),
+        )
+        with self.assertRaises(StopAsyncIteration):
+            await refresher._run()
+        self.assertEqual(
+            [c.args[0] for c in mock_sleep.call_args_list],
+            [0, 60, 120, 180, 180, 24 * 60 * 60],
+        )
+        self.assertTrue(refresher.is_published(date(2021, 1, 2)))
+
+    @freeze_time("2021-01-01 10:00:00")
+    @does_asyncio
+    async def test_start_stop(self):
+        client = _mock_client(date(2021, 1, 1))
+        async with FlexibleRateRefresher(client, "pc", "tc") as refresher:
+            with self.subTest("loads rates on start"):
+                self.assertIsNotNone(refresher.current_rate())
+        with self.subTest("keeps rates after stopping"):
+            self.assertIsNotNone(refresher.current_rate())
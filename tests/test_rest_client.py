@@ -1,7 +1,12 @@
 import re
+from asyncio import create_task, new_event_loop, sleep
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from http import HTTPStatus
 from unittest import TestCase
 
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 from aioresponses import aioresponses
 
 from octopus_energy import (
@@ -10,6 +15,13 @@ from octopus_energy import (
     ApiError,
     ApiNotFoundError,
     ApiBadRequestError,
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    HedgePolicy,
+    RateLimiter,
+    RequestPriority,
+    RequestScheduler,
 )
 from tests import does_asyncio
 
@@ -82,7 +94,152 @@ class ClientTest(TestCase):
                 aiomock.get(re.compile(".*"), status=HTTPStatus.BAD_REQUEST.value)
                 await self.get_gas_consumption_v1()
 
+    @does_asyncio
+    async def test_error_response_body_can_be_read(self):
+        async def reject(request):
+            return web.json_response({"detail": "invalid account"}, status=400)
+
+        app = web.Application()
+        app.router.add_post("/v1/accounts", reject)
+        async with TestServer(app) as server:
+            async with OctopusEnergyRestClient(
+                _MOCK_TOKEN, base_url=str(server.make_url("/"))
+            ) as client:
+                with self.assertRaises(ApiBadRequestError) as raised:
+                    await client.create_account({})
+                self.assertEqual(
+                    await raised.exception.response.json(), {"detail": "invalid account"}
+                )
+
+    @does_asyncio
+    @aioresponses()
+    async def test_decodes_json_in_executor(self, aiomock: aioresponses):
+        aiomock.get(re.compile(".*"), payload={"results": [1, 2]})
+        with ThreadPoolExecutor(1) as executor:
+            async with OctopusEnergyRestClient(_MOCK_TOKEN, executor=executor) as client:
+                response = await client.get_electricity_consumption_v1("mpan", "serial_number")
+        self.assertEqual(response, {"results": [1, 2]})
+
+    @does_asyncio
+    @aioresponses()
+    async def test_raw_response(self, aiomock: aioresponses):
+        aiomock.get(re.compile(".*"), body=b'{"results": [1, 2]}')
+        async with OctopusEnergyRestClient(_MOCK_TOKEN) as client:
+            response = await client.get_electricity_consumption_v1(
+                "mpan", "serial_number", raw=True
+            )
+        self.assertEqual(response, b'{"results": [1, 2]}')
+
     def test_cannot_use_client_without_async(self):
         with self.assertRaises(TypeError):
             with OctopusEnergyRestClient(""):
                 pass
+
+    def test_session_is_created_on_first_use(self):
+        client = OctopusEnergyRestClient(_MOCK_TOKEN)
+        self.assertIsNone(client._session)
+
+        async def use():
+            return client.session
+
+        loop = new_event_loop()
+        try:
+            session = loop.run_until_complete(use())
+            with self.subTest("the session is reused"):
+                self.assertIs(loop.run_until_complete(use()), session)
+            with self.subTest("the session is bound to the loop it was first used in"):
+                other_loop = new_event_loop()
+                try:
+                    with self.assertRaises(RuntimeError):
+                        other_loop.run_until_complete(use())
+                finally:
+                    other_loop.close()
+            loop.run_until_complete(client.close())
+            with self.subTest("the session cannot be used once the client is closed"):
+                self.assertTrue(session.closed)
+                with self.assertRaises(RuntimeError):
+                    loop.run_until_complete(use())
+        finally:
+            loop.close()
+
+    @does_asyncio
+    async def test_close_without_using_the_client(self):
+        client = OctopusEnergyRestClient(_MOCK_TOKEN)
+        await client.close()
+        self.assertIsNone(client._session)
+
+    @does_asyncio
+    @aioresponses()
+    async def test_warmup(self, aiomock: aioresponses):
+        aiomock.head(
+            "https://api.octopus.energy/v1", status=HTTPStatus.NOT_FOUND.value, repeat=True
+        )
+        limiter = RateLimiter(4, timedelta(hours=1))
+        async with OctopusEnergyRestClient(_MOCK_TOKEN, rate_limiter=limiter) as client:
+            await client.warmup(3)
+        with self.subTest("opens each connection with a head request"):
+            self.assertEqual(
+                [
+                    (method, str(url), len(calls))
+                    for (method, url), calls in aiomock.requests.items()
+                ],
+                [("HEAD", "https://api.octopus.energy/v1", 3)],
+            )
+        with self.subTest("takes a token from the rate limiter for each request"):
+            self.assertTrue(await limiter.try_acquire())
+            self.assertFalse(await limiter.try_acquire())
+
+    @does_asyncio
+    @aioresponses()
+    async def test_requests_take_a_token_from_the_rate_limiter(self, aiomock: aioresponses):
+        aiomock.get(re.compile(".*"), payload={}, repeat=True)
+        aiomock.post(re.compile(".*"), payload={}, repeat=True)
+        limiter = RateLimiter(2, timedelta(hours=1))
+        async with OctopusEnergyRestClient(_MOCK_TOKEN, rate_limiter=limiter) as client:
+            await client.get_account_details("A-1234")
+            await client.create_quote({})
+        self.assertFalse(await limiter.try_acquire())
+
+    @does_asyncio
+    @aioresponses()
+    async def test_only_gets_are_hedged(self, aiomock: aioresponses):
+        aiomock.get(re.compile(".*"), payload={"results": []})
+        aiomock.post(re.compile(".*"), payload={})
+        policy = HedgePolicy()
+        async with OctopusEnergyRestClient(_MOCK_TOKEN, hedge_policy=policy) as client:
+            self.assertEqual(await client.get_products_v1(), {"results": []})
+            await client.create_quote({})
+        self.assertEqual(policy.requests, 1)
+
+    @does_asyncio
+    @aioresponses()
+    async def test_circuit_breaker_is_tracked_per_endpoint(self, aiomock: aioresponses):
+        aiomock.get(re.compile(".*/v1/products/.*"), status=HTTPStatus.SERVICE_UNAVAILABLE.value)
+        aiomock.get(re.compile(".*/v1/accounts/.*"), payload={"number": "A-1234"})
+        breaker = CircuitBreaker(failure_threshold=1)
+        async with OctopusEnergyRestClient(_MOCK_TOKEN, circuit_breaker=breaker) as client:
+            with self.assertRaises(ApiError):
+                await client.get_product_v1("AGILE-18-02-21")
+            with self.assertRaises(CircuitOpenError):
+                await client.get_product_v1("GO-21-05-13")
+            self.assertEqual(await client.get_account_details("A-1234"), {"number": "A-1234"})
+        self.assertEqual(
+            breaker.states(),
+            {
+                "v1/products/{product_code}": CircuitState.OPEN,
+                "v1/accounts/{account_number}": CircuitState.CLOSED,
+            },
+        )
+
+    @does_asyncio
+    @aioresponses()
+    async def test_requests_wait_for_the_scheduler(self, aiomock: aioresponses):
+        aiomock.get(re.compile(".*"), payload={}, repeat=True)
+        scheduler = RequestScheduler(concurrency=1, reserved=0)
+        async with OctopusEnergyRestClient(_MOCK_TOKEN, scheduler=scheduler) as client:
+            async with scheduler.slot():
+                request = create_task(client.get_account_details("A-1234"))
+                await sleep(0)
+                self.assertEqual(scheduler.waiting(RequestPriority.NORMAL), 1)
+            self.assertEqual(await request, {})
+        self.assertEqual(scheduler.active, 0)
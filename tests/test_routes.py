@@ -0,0 +1,79 @@
+from unittest import TestCase
+
+from octopus_energy.routes import encode_query, parse_page_link, Route
+
+_BASE = "https://api.octopus.energy"
+
+
+class RouteTests(TestCase):
+    def test_url(self):
+        for description, route, values, query, expected in [
+            ("no values", Route("v1/products"), (), None, f"{_BASE}/v1/products"),
+            (
+                "values",
+                Route("v1/accounts/{account_number}/tariff-renewal"),
+                ("A-1234",),
+                None,
+                f"{_BASE}/v1/accounts/A-1234/tariff-renewal",
+            ),
+            (
+                "values are quoted",
+                Route("v1/products/{product_code}"),
+                ("A B/c%d:e+f",),
+                None,
+                f"{_BASE}/v1/products/A%20B%2Fc%25d:e+f",
+            ),
+            (
+                "query",
+                Route("v1/products"),
+                (),
+                {
+                    "page": 1,
+                    "is_green": True,
+                    "is_variable": None,
+                    "at": "2021-01-01T00:00:00+00:00",
+                },
+                f"{_BASE}/v1/products?page=1&is_green=True&at=2021-01-01T00%3A00%3A00%2B00%3A00",
+            ),
+            (
+                "query with only None values",
+                Route("v1/products"),
+                (),
+                {"page": None},
+                f"{_BASE}/v1/products",
+            ),
+            (
+                "query values are quoted",
+                Route("v1/products"),
+                (),
+                {"s": "x y&z"},
+                f"{_BASE}/v1/products?s=x+y%26z",
+            ),
+            ("leading and trailing slashes", Route("/v1/quotes/"), (), {}, f"{_BASE}/v1/quotes"),
+        ]:
+            with self.subTest(description):
+                self.assertEqual(route.url(_BASE, *values, query=query), expected)
+
+    def test_url_with_wrong_number_of_values(self):
+        route = Route("v1/electricity-meter-points/{mpan}/meters/{serial_number}/consumption")
+        for values in [(), ("mpan",), ("mpan", "serial", "extra")]:
+            with self.subTest(values=values):
+                with self.assertRaises(ValueError):
+                    route.url(_BASE, *values)
+
+    def test_encode_query(self):
+        self.assertEqual(encode_query({"a": 1, "b": None, "c": "d e"}), "a=1&c=d+e")
+
+    def test_parse_page_link(self):
+        for description, url, expected in [
+            ("no query", f"{_BASE}/v1/products", {}),
+            ("query", f"{_BASE}/v1/products?page=3&page_size=10", {"page": "3", "page_size": "10"}),
+            (
+                "quoted values",
+                f"{_BASE}/v1/x?period_from=2021-01-01T00%3A00%3A00%2B00%3A00&s=x+y",
+                {"period_from": "2021-01-01T00:00:00+00:00", "s": "x y"},
+            ),
+            ("repeated and blank values", f"{_BASE}/v1/x?a=1&b=&a=2", {"a": "2", "b": ""}),
+        ]:
+            with self.subTest(description):
+                self.assertEqual(parse_page_link(url), expected)
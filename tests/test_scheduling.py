@@ -0,0 +1,100 @@
+from asyncio import create_task, Event, gather, sleep
+from unittest import TestCase
+
+from octopus_energy import (
+    current_priority,
+    request_priority,
+    RequestPriority,
+    RequestScheduler,
+)
+from tests import does_asyncio
+
+
+class _Requests:
+    """Starts requests through a scheduler that run until they are released."""
+
+    def __init__(self, scheduler: RequestScheduler):
+        self.scheduler = scheduler
+        self.started = []
+        self._release = Event()
+
+    async def request(self, name: str, priority: RequestPriority = None):
+        async with self.scheduler.slot(priority):
+            self.started.append(name)
+            await self._release.wait()
+
+    def release(self):
+        self._release.set()
+
+
+class RequestSchedulerTests(TestCase):
+    @does_asyncio
+    async def test_reserved_concurrency(self):
+        scheduler = RequestScheduler(concurrency=2, reserved=1)
+        requests = _Requests(scheduler)
+        tasks = [
+            create_task(requests.request("bulk 1", RequestPriority.BULK)),
+            create_task(requests.request("bulk 2", RequestPriority.BULK)),
+            create_task(requests.request("interactive", RequestPriority.INTERACTIVE)),
+        ]
+        await sleep(0)
+        with self.subTest("bulk requests cannot use the reserved share"):
+            self.assertEqual(requests.started, ["bulk 1", "interactive"])
+            self.assertEqual(scheduler.waiting(RequestPriority.BULK), 1)
+        requests.release()
+        await gather(*tasks)
+        with self.subTest("every slot is released"):
+            self.assertEqual(requests.started, ["bulk 1", "interactive", "bulk 2"])
+            self.assertEqual(scheduler.active, 0)
+
+    @does_asyncio
+    async def test_weighted_fair_queueing(self):
+        scheduler = RequestScheduler(concurrency=1, reserved=0)
+        order = []
+
+        async def request(priority: RequestPriority):
+            async with scheduler.slot(priority):
+                order.append(priority)
+                await sleep(0)
+
+        tasks = [create_task(request(RequestPriority.BULK)) for _ in range(10)]
+        tasks += [create_task(request(RequestPriority.NORMAL)) for _ in range(10)]
+        await gather(*tasks)
+        # While both are waiting, bulk requests get one start in every five.
+        self.assertEqual(order[:10].count(RequestPriority.BULK), 2)
+        self.assertEqual(order[10:].count(RequestPriority.BULK), 8)
+
+    @does_asyncio
+    async def test_cancelled_requests_release_their_place(self):
+        scheduler = RequestScheduler(concurrency=1, reserved=0)
+        requests = _Requests(scheduler)
+        first = create_task(requests.request("first"))
+        cancelled = create_task(requests.request("cancelled"))
+        last = create_task(requests.request("last"))
+        await sleep(0)
+        cancelled.cancel()
+        requests.release()
+        await gather(first, last, cancelled, return_exceptions=True)
+        self.assertEqual(requests.started, ["first", "last"])
+        self.assertEqual(scheduler.active, 0)
+
+    @does_asyncio
+    async def test_request_priority(self):
+        scheduler = RequestScheduler(concurrency=2, reserved=1)
+        requests = _Requests(scheduler)
+        self.assertEqual(current_priority(), RequestPriority.NORMAL)
+        with request_priority(RequestPriority.INTERACTIVE):
+            self.assertEqual(current_priority(), RequestPriority.INTERACTIVE)
+            # Tasks started within the block are tagged too.
+            tasks = [create_task(requests.request(f"interactive {i}")) for i in range(2)]
+        self.assertEqual(current_priority(), RequestPriority.NORMAL)
+        await sleep(0)
+        self.assertEqual(requests.started, ["interactive 0", "interactive 1"])
+        requests.release()
+        await gather(*tasks)
+
+    def test_invalid_reserved(self):
+        for reserved in [-1, 4]:
+            with self.subTest(reserved=reserved):
+                with self.assertRaises(ValueError):
+                    RequestScheduler(concurrency=4, reserved=reserved)
@@ -0,0 +1,53 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from octopus_energy import MemoryStore, SqliteStore
+
+
+class StoreTests(TestCase):
+    def _check_store(self, store):
+        with self.subTest("missing key"):
+            self.assertIsNone(store.get("a"))
+        store.set("a:1", "one")
+        store.set_many({"a:2": "two", "b:1": "three"})
+        store.set("a:1", "uno")
+        with self.subTest("get"):
+            self.assertEqual(store.get("a:1"), "uno")
+        with self.subTest("items with prefix"):
+            self.assertEqual(sorted(store.items("a:")), [("a:1", "uno"), ("a:2", "two")])
+        with self.subTest("all items"):
+            self.assertEqual(len(list(store.items())), 3)
+
+    def test_memory_store(self):
+        self._check_store(MemoryStore())
+
+    def test_sqlite_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "store.db")
+            store = SqliteStore(path)
+            self._check_store(store)
+            store.close()
+            with self.subTest("persists values"):
+                store = SqliteStore(path)
+                self.assertEqual(store.get("b:1"), "three")
+                store.close()
+            with self.subTest("tables are separate"):
+                store = SqliteStore(path, table="other")
+                self.assertIsNone(store.get("b:1"))
+                store.close()
+
+    def test_sqlite_store_rejects_invalid_table(self):
+        with self.assertRaises(ValueError):
+            SqliteStore(":memory:", table="x; DROP TABLE y")
+
+    def test_sqlite_store_rolls_back_failed_writes(self):
+        store = SqliteStore(":memory:")
+        with self.assertRaises(Exception):
+            store.set_many({"a": "one", "b": object()})
+        with self.subTest("nothing from the failed write is stored"):
+            self.assertIsNone(store.get("a"))
+        with self.subTest("later writes still succeed"):
+            store.set("a", "uno")
+            self.assertEqual(store.get("a"), "uno")
+        store.close()
@@ -0,0 +1,228 @@
+from asyncio import sleep
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import TestCase
+from unittest.mock import AsyncMock, Mock
+
+from octopus_energy import (
+    ApiError,
+    Consumption,
+    ConsumptionSync,
+    MemoryStore,
+    PageReference,
+    UnitType,
+    meter_key,
+)
+from tests import does_asyncio, half_hourly_consumption, mock_meter, START
+
+
+class _CountingStore(MemoryStore):
+    """A store that counts how many times it is written to."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def set(self, key: str, value: str):
+        self.writes += 1
+        super().set(key, value)
+
+    def set_many(self, items):
+        self.writes += 1
+        self._values.update(items)
+
+
+class ConsumptionSyncTests(TestCase):
+    def test_meter_key(self):
+        self.assertEqual(meter_key(mock_meter("123")), "electricity/123/sn")
+
+    @does_asyncio
+    async def test_sync(self):
+        good, bad, paged = mock_meter("good"), mock_meter("bad"), mock_meter("paged")
+        page_2 = PageReference({"page": "2"})
+        running = 0
+        max_running = 0
+
+        async def get_consumption(meter, *args, page_reference=None, **kwargs):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await sleep(0)
+            running -= 1
+            if meter is bad:
+                raise ApiError(Mock())
+            if meter is paged and page_reference is None:
+                return half_hourly_consumption(meter, 0, 2, next_page=page_2)
+            if meter is paged:
+                return half_hourly_consumption(meter, 2, 1)
+            return half_hourly_consumption(meter, 0, 3)
+
+        client = Mock()
+        client.get_consumption = AsyncMock(side_effect=get_consumption)
+        sink = AsyncMock()
+        progress_updates = []
+        sync = ConsumptionSync(
+            client,
+            sink,
+            concurrency=2,
+            page_size=100,
+            on_progress=lambda p: progress_updates.append(p.pages),
+        )
+        report = await sync.run([good, bad, paged], START)
+
+        with self.subTest("bounds concurrency"):
+            self.assertEqual(max_running, 2)
+        with self.subTest("requests using the page size"):
+            client.get_consumption.assert_any_call(good, START, None, page_size=100)
+        with self.subTest("follows pages"):
+            client.get_consumption.assert_any_call(paged, page_reference=page_2)
+        with self.subTest("passes each page to the sink"):
+            self.assertEqual(sink.call_count, 3)
+        with self.subTest("records failures without stopping other meters"):
+            self.assertEqual(list(report.failures), ["electricity/bad/sn"])
+            self.assertEqual(report.progress.meters_failed, 1)
+            self.assertEqual(report.progress.meters_completed, 2)
+        with self.subTest("counts pages and intervals"):
+            self.assertEqual(report.progress.pages, 3)
+            self.assertEqual(report.progress.intervals, 6)
+            self.assertEqual(len(report.progress.page_latencies), 3)
+        with self.subTest("reports progress"):
+            self.assertEqual(progress_updates[-1], 3)
+        with self.subTest("stores checkpoints"):
+            self.assertEqual(sync.get_checkpoint(paged), START + timedelta(hours=1, minutes=30))
+            self.assertIsNone(sync.get_checkpoint(bad))
+
+    @does_asyncio
+    async def test_resumes_from_checkpoint(self):
+        meter = mock_meter("123")
+        checkpoints = MemoryStore()
+        checkpoints.set("consumption-checkpoint:electricity/123/sn", "2021-01-02T00:00:00+00:00")
+        client = Mock()
+        client.get_consumption = AsyncMock(return_value=half_hourly_consumption(meter, 0, 0))
+        sync = ConsumptionSync(client, AsyncMock(), checkpoints)
+
+        with self.subTest("starts from the checkpoint"):
+            await sync.run([meter], START)
+            client.get_consumption.assert_called_once_with(
+                meter, START + timedelta(days=1), None, page_size=25000
+            )
+        with self.subTest("skips meters that are complete"):
+            client.get_consumption.reset_mock()
+            report = await sync.run([meter], START, START + timedelta(hours=1))
+            client.get_consumption.assert_not_called()
+            self.assertEqual(report.progress.meters_completed, 1)
+
+    @does_asyncio
+    async def test_page_timeout(self):
+        async def get_consumption(*args, **kwargs):
+            await sleep(1)
+
+        client = Mock()
+        client.get_consumption = AsyncMock(side_effect=get_consumption)
+        report = await ConsumptionSync(client, AsyncMock(), page_timeout=0.01).run(
+            [mock_meter("slow")], START
+        )
+        self.assertEqual(report.progress.meters_failed, 1)
+
+    @does_asyncio
+    async def test_resync(self):
+        meter = mock_meter("123")
+        # two days of consumption, split across two pages part way through the first day
+        day_1 = half_hourly_consumption(meter, 0, 96)
+        page_1 = Consumption(
+            UnitType.KWH, meter, day_1.intervals[:10], next_page=PageReference({"page": "2"})
+        )
+        page_2 = Consumption(UnitType.KWH, meter, day_1.intervals[10:])
+        client = Mock()
+        client.get_consumption = AsyncMock(side_effect=[page_1, page_2])
+        sink = AsyncMock()
+        sync = ConsumptionSync(client, sink)
+
+        report = await sync.resync([meter], START)
+        with self.subTest("writes every day the first time"):
+            self.assertEqual(
+                [len(c.args[1].intervals) for c in sink.call_args_list],
+                [48, 48],
+            )
+        with self.subTest("new days are not reported as revised"):
+            self.assertEqual(report.revised_days, {"electricity/123/sn": []})
+        with self.subTest("moves the checkpoint forward"):
+            self.assertEqual(sync.get_checkpoint(meter), START + timedelta(days=2))
+
+        sink.reset_mock()
+        revised = half_hourly_consumption(meter, 0, 96)
+        revised.intervals[60].consumed_units = Decimal(2)
+        client.get_consumption = AsyncMock(return_value=revised)
+        report = await sync.resync([meter], START)
+        with self.subTest("only writes revised days"):
+            sink.assert_called_once()
+            self.assertEqual(
+                sink.call_args.args[1].intervals[0].interval_start, START + timedelta(days=1)
+            )
+        with self.subTest("reports revised days"):
+            self.assertEqual(report.revised_days, {"electricity/123/sn": [date(2021, 1, 2)]})
+
+    @does_asyncio
+    async def test_run_stores_day_checksums(self):
+        meter = mock_meter("123")
+        day_1 = half_hourly_consumption(meter, 0, 96)
+        client = Mock()
+        client.get_consumption = AsyncMock(
+            side_effect=[
+                Consumption(
+                    UnitType.KWH,
+                    meter,
+                    day_1.intervals[:10],
+                    next_page=PageReference({"page": "2"}),
+                ),
+                Consumption(UnitType.KWH, meter, day_1.intervals[10:]),
+            ]
+        )
+        sink = AsyncMock()
+        checkpoints = MemoryStore()
+        sync = ConsumptionSync(client, sink, checkpoints)
+        await sync.run([meter], START)
+        with self.subTest("stores a checksum for each day, across pages"):
+            self.assertEqual(
+                [key for key, _ in checkpoints.items("consumption-checksum:")],
+                [
+                    "consumption-checksum:electricity/123/sn:2021-01-01",
+                    "consumption-checksum:electricity/123/sn:2021-01-02",
+                ],
+            )
+
+        sink.reset_mock()
+        client.get_consumption = AsyncMock(return_value=half_hourly_consumption(meter, 0, 96))
+        report = await sync.resync([meter], START)
+        with self.subTest("a resync after a run only writes revised days"):
+            sink.assert_not_called()
+            self.assertEqual(report.revised_days, {"electricity/123/sn": []})
+
+        with self.subTest("a day synchronised from part way through is left to resync"):
+            partial = MemoryStore()
+            client.get_consumption = AsyncMock(return_value=half_hourly_consumption(meter, 24, 72))
+            await ConsumptionSync(client, AsyncMock(), partial).run(
+                [meter], START + timedelta(hours=12)
+            )
+            self.assertEqual(
+                [key for key, _ in partial.items("consumption-checksum:")],
+                ["consumption-checksum:electricity/123/sn:2021-01-02"],
+            )
+
+    @does_asyncio
+    async def test_stores_each_page_in_one_write(self):
+        meter = mock_meter("123")
+        client = Mock()
+        client.get_consumption = AsyncMock(return_value=half_hourly_consumption(meter, 0, 480))
+        for method in ["run", "resync"]:
+            with self.subTest(method):
+                checkpoints = _CountingStore()
+                sync = ConsumptionSync(
+                    client, AsyncMock(), checkpoints, checkpoint_values=lambda: {"size": "1"}
+                )
+                await getattr(sync, method)([meter], START)
+                self.assertEqual(len(list(checkpoints.items("consumption-checksum:"))), 10)
+                # one write for the page, and one for the last day once it is complete
+                self.assertEqual(checkpoints.writes, 2)
+                with self.subTest("stores extra values with the checkpoint"):
+                    self.assertEqual(checkpoints.get("size"), "1")
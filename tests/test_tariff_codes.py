@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+from octopus_energy import (
+    EnergyTariffType,
+    EnergyType,
+    group_meters_by_tariff,
+    Meter,
+    MeterGeneration,
+    parse_tariff_code,
+    Tariff,
+    TariffCode,
+    TariffIndex,
+)
+
+
+class ParseTariffCodeTests(TestCase):
+    def test_parse(self):
+        for code, expected in [
+            (
+                "E-1R-AGILE-18-02-21-C",
+                TariffCode(
+                    "E-1R-AGILE-18-02-21-C", EnergyType.ELECTRICITY, 1, "AGILE-18-02-21", "C"
+                ),
+            ),
+            (
+                "E-2R-VAR-20-09-01-P",
+                TariffCode("E-2R-VAR-20-09-01-P", EnergyType.ELECTRICITY, 2, "VAR-20-09-01", "P"),
+            ),
+            (
+                "G-1R-FIX-12M-20-11-11-A",
+                TariffCode("G-1R-FIX-12M-20-11-11-A", EnergyType.GAS, 1, "FIX-12M-20-11-11", "A"),
+            ),
+        ]:
+            with self.subTest(code):
+                self.assertEqual(parse_tariff_code(code), expected)
+
+    def test_tariff_type(self):
+        self.assertEqual(
+            parse_tariff_code("G-1R-FIX-12M-20-11-11-A").tariff_type, EnergyTariffType.GAS
+        )
+        self.assertEqual(
+            parse_tariff_code("E-1R-AGILE-18-02-21-C").tariff_type, EnergyTariffType.ELECTRICITY
+        )
+
+    def test_invalid(self):
+        for code in ["", "AGILE-18-02-21", "X-1R-AGILE-18-02-21-C", "E-1R-AGILE-18-02-21-Z"]:
+            with self.subTest(code):
+                with self.assertRaises(ValueError):
+                    parse_tariff_code(code)
+
+
+class TariffIndexTests(TestCase):
+    def test_index(self):
+        index = TariffIndex(
+            ["E-1R-AGILE-18-02-21-C", "E-1R-AGILE-18-02-21-A", "G-1R-VAR-20-09-01-C"]
+        )
+        with self.subTest("size"):
+            self.assertEqual(len(index), 3)
+            self.assertIn("G-1R-VAR-20-09-01-C", index)
+        with self.subTest("by product"):
+            self.assertEqual(
+                [t.code for t in index.by_product("AGILE-18-02-21")],
+                ["E-1R-AGILE-18-02-21-A", "E-1R-AGILE-18-02-21-C"],
+            )
+        with self.subTest("by region"):
+            self.assertEqual(
+                [t.code for t in index.by_region("_C")],
+                ["E-1R-AGILE-18-02-21-C", "G-1R-VAR-20-09-01-C"],
+            )
+        with self.subTest("get"):
+            self.assertEqual(index.get("G-1R-VAR-20-09-01-C").product_code, "VAR-20-09-01")
+            self.assertIsNone(index.get("unknown"))
+
+    def test_group_meters_by_tariff(self):
+        now = datetime.utcnow()
+        agile = Tariff("E-1R-AGILE-18-02-21-C", now - timedelta(days=10), None)
+        old = Tariff("E-1R-VAR-20-09-01-C", now - timedelta(days=20), now - timedelta(days=10))
+        meters = [
+            Meter("", str(i), EnergyType.ELECTRICITY, MeterGeneration.SMETS2_ELECTRICITY, tariffs)
+            for i, tariffs in enumerate([[old, agile], [agile], [old], []])
+        ]
+        with self.subTest("index from meters"):
+            self.assertEqual(len(TariffIndex.from_meters(meters)), 2)
+        with self.subTest("group"):
+            groups = group_meters_by_tariff(meters, now)
+            self.assertEqual(
+                {t.code: [m.serial_number for m in ms] for t, ms in groups.items()},
+                {"E-1R-AGILE-18-02-21-C": ["0", "1"]},
+            )
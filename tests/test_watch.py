@@ -0,0 +1,124 @@
+from asyncio import create_task, gather, sleep, TimeoutError, wait_for
+from datetime import timedelta
+from unittest import TestCase
+from unittest.mock import Mock
+
+from octopus_energy import (
+    ApiError,
+    ApiNotFoundError,
+    CircuitOpenError,
+    Consumption,
+    ConsumptionWatcher,
+    UnitType,
+)
+from tests import does_asyncio, half_hour_interval, mock_meter, START
+
+
+def _mock_client(*polls) -> Mock:
+    """Mocks a client whose consumption changes on each poll, repeating the last poll forever."""
+    requests = []
+
+    async def iter_consumption_pages(meter, period_from):
+        requests.append((meter, period_from))
+        poll = polls[min(len(requests), len(polls)) - 1]
+        if isinstance(poll, Exception):
+            raise poll
+        yield Consumption(UnitType.KWH, meter, poll)
+
+    client = Mock()
+    client.iter_consumption_pages = iter_consumption_pages
+    client.requests = requests
+    return client
+
+
+def _watcher(client: Mock) -> ConsumptionWatcher:
+    return ConsumptionWatcher(
+        client,
+        concurrency=2,
+        min_interval=timedelta(milliseconds=1),
+        max_interval=timedelta(milliseconds=8),
+        revision_window=timedelta(hours=1),
+    )
+
+
+class ConsumptionWatcherTests(TestCase):
+    @does_asyncio
+    async def test_yields_new_and_revised_intervals(self):
+        meter = mock_meter("1")
+        client = _mock_client(
+            [half_hour_interval(0), half_hour_interval(1)],
+            ApiError(Mock(), "failed"),
+            TimeoutError(),
+            CircuitOpenError("consumption", 1),
+            ApiNotFoundError(),
+            ValueError("unmappable"),
+            [half_hour_interval(0), half_hour_interval(1)],
+            [half_hour_interval(0), half_hour_interval(1, "2"), half_hour_interval(2)],
+        )
+        async with _watcher(client) as watcher:
+            stream = watcher.watch(meter, START)
+            first = await stream.__anext__()
+            second = await stream.__anext__()
+            await stream.aclose()
+
+        with self.subTest("yields everything on the first poll"):
+            self.assertEqual(first.intervals, [half_hour_interval(0), half_hour_interval(1)])
+            self.assertIs(first.meter, meter)
+        with self.subTest("only yields new and revised intervals"):
+            self.assertEqual(second.intervals, [half_hour_interval(1, "2"), half_hour_interval(2)])
+        with self.subTest("keeps polling after any error"):
+            self.assertGreaterEqual(len(client.requests), 8)
+        with self.subTest("polls from the revision window before the latest interval"):
+            self.assertEqual(client.requests[0][1], START)
+            self.assertEqual(client.requests[-1][1], START)
+        with self.subTest("stops watching once the stream is closed"):
+            self.assertEqual(watcher._meters, {})
+
+    @does_asyncio
+    async def test_shares_polls_between_watchers(self):
+        meter = mock_meter("1")
+        client = _mock_client([half_hour_interval(0)])
+        async with _watcher(client) as watcher:
+            first, second = watcher.watch(meter, START), watcher.watch(meter, START)
+            await first.__anext__()
+            pending = create_task(second.__anext__())
+            await sleep(0)
+            with self.subTest("watches each meter once"):
+                self.assertEqual(len(watcher._meters), 1)
+                self.assertEqual(len(watcher._meters["electricity/1/sn"].subscribers), 2)
+            await first.aclose()
+            with self.subTest("keeps watching while there are subscribers"):
+                self.assertEqual(len(watcher._meters), 1)
+            pending.cancel()
+            await gather(pending, return_exceptions=True)
+            self.assertEqual(watcher._meters, {})
+        with self.subTest("stops the scheduler"):
+            self.assertEqual(watcher._tasks, [])
+
+    @does_asyncio
+    async def test_adapts_pollinghalf_hour_interval(self):
+        meter = mock_meter("1")
+        client = _mock_client([half_hour_interval(0)])
+        async with _watcher(client) as watcher:
+            stream = watcher.watch(meter, START)
+            await stream.__anext__()
+            state = watcher._meters["electricity/1/sn"]
+            with self.subTest("speeds up when consumption arrives"):
+                self.assertEqual(state.interval, 0.004)
+            await sleep(0.05)
+            with self.subTest("slows down when nothing new arrives"):
+                self.assertEqual(state.interval, 0.008)
+            await stream.aclose()
+
+    @does_asyncio
+    async def test_stop_ends_streams(self):
+        meter = mock_meter("1")
+        client = _mock_client([half_hour_interval(0)])
+        watcher = _watcher(client)
+        stream = watcher.watch(meter, START)
+        await stream.__anext__()
+        pending = create_task(stream.__anext__())
+        await sleep(0)
+        await watcher.stop()
+        with self.assertRaises(StopAsyncIteration):
+            await wait_for(pending, 1)
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import TestCase
+
+from octopus_energy import (
+    cheapest_window,
+    cheapest_windows,
+    PriceWindow,
+    TariffRate,
+    WindowRequest,
+)
+
+_START = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+
+def _rates(*prices, start: datetime = _START, slot=timedelta(minutes=30)) -> list:
+    return [
+        TariffRate(Decimal(p), Decimal(p) / 2, start + slot * i, start + slot * (i + 1))
+        for i, p in enumerate(prices)
+    ]
+
+
+class CheapestWindowTests(TestCase):
+    def test_cheapest_window(self):
+        rates = _rates(5, 4, 1, 2, 9, 1, 1, 8)
+        with self.subTest("finds the cheapest block"):
+            self.assertEqual(
+                cheapest_window(list(reversed(rates)), timedelta(hours=1)),
+                PriceWindow(
+                    _START + timedelta(hours=2, minutes=30),
+                    _START + timedelta(hours=3, minutes=30),
+                    Decimal(2),
+                    Decimal(1),
+                ),
+            )
+        with self.subTest("ties return the earliest window"):
+            self.assertEqual(
+                cheapest_window(rates, timedelta(minutes=30)).valid_from,
+                _START + timedelta(hours=1),
+            )
+        with self.subTest("window too long"):
+            self.assertIsNone(cheapest_window(rates, timedelta(hours=5)))
+
+    def test_load_profile(self):
+        rates = _rates(1, 5, 5, 1, 1, 5)
+        window = cheapest_window(rates, timedelta(hours=1), [Decimal(3), Decimal(1)])
+        self.assertEqual(window.valid_from, _START + timedelta(hours=1, minutes=30))
+        self.assertEqual(window.cost_inc_vat, Decimal(4))
+        self.assertEqual(window.cost_exc_vat, Decimal(2))
+
+    def test_longer_rates_are_split_into_half_hours(self):
+        rates = _rates(3, 1, slot=timedelta(hours=2))
+        window = cheapest_window(rates, timedelta(hours=1))
+        self.assertEqual(window.valid_from, _START + timedelta(hours=2))
+        self.assertEqual(window.cost_inc_vat, Decimal(2))
+
+    def test_overlapping_rates(self):
+        rates = _rates(9, slot=timedelta(hours=1))
+        rates += _rates(
+            1, start=_START + timedelta(minutes=30), slot=timedelta(hours=1, minutes=30)
+        )
+        window = cheapest_window(rates, timedelta(hours=1))
+        with self.subTest("the later rate fills the slots after the overlap"):
+            self.assertEqual(window.valid_from, _START + timedelta(hours=1))
+            self.assertEqual(window.cost_inc_vat, Decimal(2))
+
+    def test_windows_do_not_span_gaps(self):
+        rates = _rates(1, 9) + _rates(1, 9, start=_START + timedelta(hours=3))
+        rates += [TariffRate(Decimal(0), Decimal(0), _START + timedelta(hours=4), None)]
+        self.assertEqual(cheapest_window(rates, timedelta(hours=1)).cost_inc_vat, Decimal(10))
+
+    def test_invalid_requests(self):
+        with self.subTest("duration not a multiple of 30 minutes"):
+            with self.assertRaises(ValueError):
+                cheapest_window(_rates(1), timedelta(minutes=45))
+        with self.subTest("load profile does not match duration"):
+            with self.assertRaises(ValueError):
+                cheapest_window(_rates(1, 2), timedelta(hours=1), [Decimal(1)])
+
+    def test_cheapest_windows(self):
+        rates = _rates(5, 4, 1, 2, 9, 1, 1, 8)
+        windows = cheapest_windows(
+            rates,
+            [
+                WindowRequest(timedelta(hours=1)),
+                WindowRequest(timedelta(minutes=30)),
+                WindowRequest(timedelta(hours=1), [Decimal(1), Decimal(0)]),
+                WindowRequest(timedelta(hours=1)),
+                WindowRequest(timedelta(hours=10)),
+            ],
+        )
+        self.assertEqual(
+            [w.cost_inc_vat if w else None for w in windows],
+            [Decimal(2), Decimal(1), Decimal(1), Decimal(2), None],
+        )